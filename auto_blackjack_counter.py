@@ -1,33 +1,45 @@
-import pytesseract
-import cv2
-import numpy as np
-import mss
-import hashlib
-import time
 import re
 
-sct = mss.mss()
+import ocr_pool
+from calibration import calibrated_capture
+from change_detector import ChangeDetector
+from confirmation import CACHED, Confirmer, accept_threshold, ocr_confidence, stability
+from count_feed import get_feed
+from event_log import get_event_log
+from hand_ev import HandEvEngine
+from metrics import get_metrics
+from ocr_cache import get_cache
+from pipeline import Pipeline
+from preprocess import RegionPreprocessors
+from scheduler import PollScheduler, RegionPolicy
+from screen_capture import open_frame_source
+from shoe_state import RANK_CODES, ShoeState
 
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+# Live mss capture by default; set BJ_FRAME_SOURCE=replay:<session.npz> to replay
+source = open_frame_source()
 
 # === UPDATED SCREEN REGIONS ===
 your_hand_region = (1825, 943, 2033, 995)
 dealer_hand_region = (380, 945, 525, 995)
 active_hand_region = (370, 710, 578, 755)
 
-# === HI-LO LOGIC ===
-def get_card_value(card):
-    if card in ['2', '3', '4', '5', '6']:
-        return +1
-    elif card in ['7', '8', '9']:
-        return 0
-    elif card in ['10', 'J', 'Q', 'K', 'A']:
-        return -1
-    return 0
-
-def get_true_count(running, decks_left):
-    return round(running / decks_left, 2) if decks_left > 0 else 0
+REGIONS = {
+    "Your Hand": your_hand_region,
+    "Dealer Hand": dealer_hand_region,
+    "Active Hand": active_hand_region
+}
+
+# Seconds between polls per region: fast after a change, backing off while idle
+POLL_POLICY = RegionPolicy(0.05, 0.25)
+
+# What tesseract reads per region (see preprocess.py): the hands sit on
+# felt of varying colour, so threshold at Otsu's level rather than a fixed one
+PREPROCESS = dict.fromkeys(REGIONS, (("otsu", None), ("pad", 4)))
+# A doubtful read gets a second OCR pass through the other variant: the
+# same pixels thresholded differently are an independent look at them
+RECHECK_PREPROCESS = dict.fromkeys(REGIONS, (("adaptive", (11, 2)), ("pad", 4)))
 
+# === HI-LO LOGIC ===
 def suggest_bet(tc):
     if tc <= 1:
         return "🟢"
@@ -39,20 +51,6 @@ def suggest_bet(tc):
         return "🔴"
 
 # === OCR UTILS ===
-def region_hash(image):
-    return hashlib.md5(image.tobytes()).hexdigest()
-
-def grab_region(region):
-    monitor = {
-        "top": region[1],
-        "left": region[0],
-        "width": region[2] - region[0],
-        "height": region[3] - region[1],
-    }
-    img = np.array(sct.grab(monitor))[:, :, :3]
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    return gray
-
 def clean_text(text):
     cleaned = re.sub(r"[^A-Z0-9\s]", "", text.upper())
     return re.sub(r"\s+", " ", cleaned).strip()
@@ -67,93 +65,242 @@ def extract_cards(text):
                 cards.append("10" if ch == "T" else ch)
     return cards
 
-# === MAIN LOOP ===
-def main():
-    print("🎴 Auto Blackjack Counter v1.11 Running... Press CTRL+C to stop.")
-    total_decks = 6
-    running_count = 0
-    cards_seen = 0
-    buffer_time = 0.3
-
-    regions = {
-        "Your Hand": your_hand_region,
-        "Dealer Hand": dealer_hand_region,
-        "Active Hand": active_hand_region
-    }
-
-    last_hashes = {k: "" for k in regions}
-    stable_since = {k: time.time() for k in regions}
-    last_cards = {k: [] for k in regions}
-    last_count = running_count
-    last_ocr = {k: [] for k in regions}
-    confirm_count = {k: 0 for k in regions}
+# === RECOGNITION STAGE ===
+class RegionReader:
+    """Reads each region once it has been stable for ``buffer_time``.
 
-    try:
-        while True:
-            now = time.time()
+    A read comes back with its confidence: tesseract's, weighted by how
+    long the region had been still when it was read. A settled read is
+    served again on later polls, marked as not fresh; while it is doubtful
+    (see confirmation.py) the region is OCR'd again through the other
+    preprocessing variant instead, and that read is fresh. Only a sure
+    read, or a doubtful one a second opinion agrees with, is cached; a
+    cached read that one contradicts is evicted.
+    """
 
-            for label, region in regions.items():
-                gray = grab_region(region)
-                h = region_hash(gray)
+    def __init__(self, regions, buffer_time=0.1):
+        self.regions = regions
+        self.buffer_time = buffer_time
+        self.ocr_cache = get_cache()
+        self.scheduler = PollScheduler({k: POLL_POLICY for k in regions})
+        # Block-mean signatures: single noisy pixels no longer count as a change
+        self.detector = ChangeDetector(regions)
+        self.stable_since = {k: 0.0 for k in regions}
+        self.preprocess = RegionPreprocessors(regions, PREPROCESS)
+        self.recheck = RegionPreprocessors(regions, RECHECK_PREPROCESS)
+        # Read of each region since it last changed: a settled region is
+        # preprocessed and read once, not on every poll
+        self.settled = {}
+        # Regions whose settled read wants a second opinion, and which
+        # preprocessing made each settled read (0: PREPROCESS, 1: RECHECK_PREPROCESS)
+        self.doubtful = set()
+        self.variant = {}
+        # OCR cache key of the glyph each settled read was made from
+        self.cache_keys = {}
 
-                if h != last_hashes[label]:
-                    last_hashes[label] = h
-                    stable_since[label] = now
+    def read(self, frame):
+        """Return {label: (cards, confidence, fresh)} for every stable region with 2+ cards."""
+        now = frame.timestamp
+        pending = {}
+        reads = {}
+
+        due = [label for label in self.regions if self.scheduler.is_due(label, now)]
+        if not due:
+            return reads
+        with get_metrics().timer("change_detect"):
+            dirty = self.detector.dirty(frame.views, due)
+        self.detector.accept(due)
+
+        for label in due:
+            gray = frame.views[label]
+            self.scheduler.mark_polled(label, now, dirty[label])
+
+            if dirty[label]:
+                self.stable_since[label] = now
+                self.settled.pop(label, None)
+                self.doubtful.discard(label)
+                continue
+
+            still_for = now - self.stable_since[label]
+            if still_for < self.buffer_time:
+                continue
+
+            if label in self.settled:
+                if label not in self.doubtful:
+                    cards, confidence, _ = self.settled[label]
+                    reads[label] = (cards, confidence, False)
                     continue
+                variant = 1 - self.variant[label]
+                with get_metrics().timer("preprocess"):
+                    img = (self.recheck if variant else self.preprocess).run(label, gray)
+                get_metrics().incr("second_opinions")
+                pending[label] = (None, variant, stability(still_for), ocr_pool.submit(img, config='--psm 6'))
+                continue
+            with get_metrics().timer("preprocess"):
+                img = self.preprocess.run(label, gray)
+            cache_key = self.ocr_cache.key(img, "hand")
+            cards = self.ocr_cache.get(cache_key)
+            if cards is None:
+                pending[label] = (cache_key, 0, stability(still_for), ocr_pool.submit(img, config='--psm 6'))
+            else:
+                self.settle(label, cards, CACHED * stability(still_for), 0, cache_key)
+                reads[label] = self.settled[label]
 
-                if (now - stable_since[label]) < buffer_time:
+        for label, (cache_key, variant, weight, future) in pending.items():
+            result = future.result()
+            cleaned = clean_text(result.text)
+            cards = extract_cards(cleaned)
+            if cache_key is None:
+                # A second opinion: agreeing settles the doubt, reading nothing says nothing
+                previous = self.settled[label]
+                if not cards:
+                    reads[label] = (previous[0], previous[1], False)
+                    continue
+                cache_key = self.cache_keys[label]
+                if cards == previous[0]:
+                    self.doubtful.discard(label)
+                    self.ocr_cache.put(cache_key, cards)
+                    reads[label] = (cards, max(previous[1], ocr_confidence(result) * weight), True)
                     continue
+                # The two disagree: whatever was cached for the glyph is in doubt
+                self.ocr_cache.evict(cache_key)
+            else:
+                if cards:
+                    get_event_log().log("hand", label, len(cards), " ".join(cards), ts=now)
+                elif cleaned:
+                    get_event_log().log("misread", label, text=cleaned, ts=now)
+            self.settle(label, cards, ocr_confidence(result) * weight, variant, cache_key)
+            reads[label] = self.settled[label]
 
-                text = pytesseract.image_to_string(gray, config='--psm 6')
-                cleaned = clean_text(text)
-                cards = extract_cards(cleaned)
-                if len(cards) < 2:
-                    continue
+        return {label: read for label, read in reads.items() if len(read[0]) >= 2}
 
-                # === Require 2x match to confirm
-                if cards == last_ocr[label]:
-                    confirm_count[label] += 1
-                else:
-                    confirm_count[label] = 1
-                    last_ocr[label] = cards
+    def settle(self, label, cards, confidence, variant, cache_key):
+        """Record a fresh read of a settled region.
 
-                if confirm_count[label] < 2:
-                    continue
+        A sure read is cached; a doubtful one gets a second opinion.
+        """
+        self.settled[label] = (cards, confidence, True)
+        self.variant[label] = variant
+        self.cache_keys[label] = cache_key
+        if cards and confidence < accept_threshold(cards):
+            self.doubtful.add(label)
+            return
+        self.doubtful.discard(label)
+        if cards:
+            self.ocr_cache.put(cache_key, cards)
 
-                prev_cards = last_cards[label]
 
-                if cards == prev_cards:
-                    continue
+# === COUNTING STAGE ===
+class CountTracker:
+    """Confirms reads and keeps the running count; single-threaded.
 
-                last_cards[label] = cards.copy()
-
-                # === Count Delta
-                count_delta = 0
-                if len(cards) < len(prev_cards) or cards[:len(prev_cards)] != prev_cards:
-                    count_delta = sum(get_card_value(c) for c in cards)
-                    cards_seen += len(cards)
-                    print(f"🔄 {label}: {cards} ➕ {count_delta:+}")
-                elif len(cards) > len(prev_cards) and cards[:len(prev_cards)] == prev_cards:
-                    new_cards = cards[len(prev_cards):]
-                    count_delta = sum(get_card_value(c) for c in new_cards)
-                    cards_seen += len(new_cards)
-                    print(f"➕ {label}: {new_cards} ➕ {count_delta:+}")
-                else:
-                    continue
+    A sure read counts on its first frame; a doubtful one, or one holding
+    an A or a 4, waits for agreeing frames (see confirmation.py).
+    """
+
+    def __init__(self, regions, total_decks=6):
+        self.shoe = ShoeState(total_decks)
+        self.last_cards = {k: [] for k in regions}
+        self.last_count = self.shoe.running_count
+        self.confirmer = Confirmer(regions)
+        # No-op unless BJ_FEED is set
+        self.feed = get_feed()
+        self.ev = HandEvEngine(total_decks)
+        self.last_decision = None
+
+    def update(self, frame, reads):
+        for label, (cards, confidence, fresh) in reads.items():
+            # === Confirm: one sure read, or agreeing recognitions
+            if not self.confirmer.observe(label, tuple(cards), confidence, frame.timestamp, fresh):
+                get_metrics().incr("confirmation_failures")
+                continue
+
+            prev_cards = self.last_cards[label]
+
+            if cards == prev_cards:
+                continue
+
+            self.last_cards[label] = cards.copy()
+            get_metrics().observe("confirm_latency", self.confirmer.latency(label, frame.timestamp))
+
+            # === Count Delta
+            count_delta = 0
+            if len(cards) < len(prev_cards) or cards[:len(prev_cards)] != prev_cards:
+                count_delta = self.shoe.deal(cards)
+                print(f"🔄 {label}: {cards} ➕ {count_delta:+}")
+                get_event_log().log("count", label, count_delta, " ".join(cards), self.shoe, frame.timestamp)
+                self.feed.publish("count", label, count_delta, " ".join(cards), self.shoe, frame.timestamp)
+            elif len(cards) > len(prev_cards) and cards[:len(prev_cards)] == prev_cards:
+                new_cards = cards[len(prev_cards):]
+                count_delta = self.shoe.deal(new_cards)
+                print(f"➕ {label}: {new_cards} ➕ {count_delta:+}")
+                text = " ".join(new_cards)
+                get_event_log().log("count", label, count_delta, text, self.shoe, frame.timestamp)
+                self.feed.publish("count", label, count_delta, text, self.shoe, frame.timestamp)
+            else:
+                continue
+
+            running_count = self.shoe.running_count
+            true_count = self.shoe.true_count()
+
+            if running_count != self.last_count:
+                print(f"📊 Count: {running_count} | TC: {true_count} | Bet: {suggest_bet(true_count)} "
+                      f"| {self.shoe.summary()}")
+                self.last_count = running_count
 
-                running_count += count_delta
-                decks_remaining = max(0.5, total_decks - (cards_seen / 52))
-                true_count = get_true_count(running_count, decks_remaining)
+        self.advise()
 
-                if running_count != last_count:
-                    print(f"📊 Count: {running_count} | TC: {true_count} | Bet: {suggest_bet(true_count)}")
-                    last_count = running_count
+    def advise(self):
+        """Print composition-dependent EVs once per new player decision."""
+        player = self.last_cards.get("Your Hand", [])
+        dealer = self.last_cards.get("Dealer Hand", [])
+        if len(player) < 2 or len(dealer) != 1:
+            return
+        if not all(card.upper() in RANK_CODES for card in player + dealer):
+            return
+        decision = (tuple(player), dealer[0])
+        if decision == self.last_decision:
+            return
+        self.last_decision = decision
 
-            time.sleep(0.25)
+        with get_metrics().timer("hand_ev"):
+            self.ev.sync(self.shoe)
+            advice = self.ev.evaluate(player, dealer[0])
+        double = f" | Double: {advice.double:+.3f}" if advice.double is not None else ""
+        print(f"🧠 {player} vs {dealer[0]} → {advice.best.upper()} "
+              f"(Stand: {advice.stand:+.3f} | Hit: {advice.hit:+.3f}{double} "
+              f"| Dealer bust: {advice.dealer['bust']:.1%})")
 
+
+# === MAIN LOOP ===
+def build_pipeline(capture, total_decks=6):
+    """Wire the reader and tracker for one table onto ``capture``."""
+    reader = RegionReader(capture.regions)
+    tracker = CountTracker(capture.regions, total_decks)
+    pipeline = Pipeline(capture, reader.read, tracker.update,
+                        interval=lambda: reader.scheduler.next_wakeup(capture.now()))
+    return pipeline, reader, tracker
+
+def main():
+    print("🎴 Auto Blackjack Counter v1.11 Running... Press CTRL+C to stop.")
+
+    # Regions follow the cached table layout when one has been calibrated
+    capture = calibrated_capture(REGIONS, source)
+    pipeline, reader, tracker = build_pipeline(capture)
+
+    try:
+        pipeline.run()
     except KeyboardInterrupt:
+        pass
+    finally:
         print("\n🛑 Session ended.")
-        print(f"Final Count: {running_count}, Cards Seen: {cards_seen}")
+        print(f"Final Count: {tracker.shoe.running_count}, Cards Seen: {tracker.shoe.cards_seen}")
+        print(f"📈 Pipeline: {pipeline.stats()}")
+        print(f"🗃️ OCR cache: {get_cache().stats()}")
+        get_metrics().close()
+        get_event_log().close()
+        get_feed().close()
+        capture.close()
 
 if __name__ == "__main__":
     main()
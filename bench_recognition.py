@@ -0,0 +1,322 @@
+"""Stage-level micro-benchmarks for the recognition hot path.
+
+Runs offline against synthetic ROIs (card ranks rendered with cv2.putText
+at the region sizes used by card_2_debug_ocr) and a synthetic replay
+session, so it needs no screen and no table:
+
+    python bench_recognition.py --out bench.json
+    python bench_recognition.py --compare bench.json
+
+OCR stages use the warm OCR pool when tesseract is available. With
+``--ocr null`` (the default when it is not) OCR calls return empty text
+instantly, which isolates everything around OCR, including the buffer
+recovery path.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+
+import ocr_pool
+from ocr_cache import get_cache
+from preprocess import RegionPreprocessors
+
+RANKS = ["A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K"]
+
+
+# === SYNTHETIC INPUT ===
+def render_glyph(text, width, height, rng):
+    """Dark rank on a light card background, with mild capture noise."""
+    img = np.full((height, width), 225, np.uint8)
+    scale = min(width, height) / 40.0
+    (tw, th), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, 2)
+    origin = (max(0, (width - tw) // 2), min(height - 2, (height + th) // 2))
+    cv2.putText(img, text, origin, cv2.FONT_HERSHEY_SIMPLEX, scale, 25, 2, cv2.LINE_AA)
+    noise = rng.integers(-6, 7, img.shape, dtype=np.int16)
+    return np.clip(img.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def region_size(region):
+    return region[2] - region[0], region[3] - region[1]
+
+
+def write_session(path, regions, frames, rng):
+    """Write a replay archive covering every region, one random hand per frame."""
+    left = min(r[0] for r in regions.values())
+    top = min(r[1] for r in regions.values())
+    width = max(r[2] for r in regions.values()) - left
+    height = max(r[3] for r in regions.values()) - top
+    stack = np.full((frames, height, width), 40, np.uint8)
+    for i in range(frames):
+        for region in regions.values():
+            w, h = region_size(region)
+            stack[i, region[1] - top:region[3] - top, region[0] - left:region[2] - left] = \
+                render_glyph(RANKS[rng.integers(len(RANKS))], w, h, rng)
+    np.savez_compressed(path, frames=stack, timestamps=np.arange(frames) * 0.05,
+                        origin=np.array([left, top]))
+
+
+class NullOcrPool:
+    """Stands in for the OCR pool: every ROI reads as empty text, instantly."""
+
+    def submit(self, img, config="--psm 6"):
+        future = Future()
+        future.set_result(ocr_pool.OcrResult("", []))
+        return future
+
+    def recognize(self, img, config="--psm 6"):
+        return ocr_pool.OcrResult("", [])
+
+    def recognize_many(self, imgs, config="--psm 6"):
+        return [ocr_pool.OcrResult("", []) for _ in imgs]
+
+    def image_to_string(self, img, config="--psm 6"):
+        return ""
+
+
+# === MEASUREMENT ===
+def quiet(fn):
+    """Wrap ``fn`` so the trackers' progress prints do not flood the report."""
+    def call(arg):
+        with open(os.devnull, "w") as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                return fn(arg)
+            finally:
+                sys.stdout = stdout
+    return call
+
+
+def measure(name, fn, inputs, repeat, rois_per_call=1, setup=None):
+    """Time ``fn`` over ``inputs`` and report latency percentiles and allocations."""
+    for arg in inputs[:3]:
+        if setup:
+            setup()
+        fn(arg)  # warm-up
+
+    timings = np.empty(repeat, dtype=np.float64)
+    for i in range(repeat):
+        arg = inputs[i % len(inputs)]
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn(arg)
+        timings[i] = time.perf_counter() - start
+
+    # Separate pass so tracing does not distort the timings
+    alloc_runs = min(repeat, 200)
+    alloc_bytes = 0
+    tracemalloc.start()
+    for i in range(alloc_runs):
+        arg = inputs[i % len(inputs)]
+        if setup:
+            setup()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        fn(arg)
+        alloc_bytes += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    us = timings * 1e6
+    total = timings.sum()
+    return {
+        "stage": name,
+        "calls": repeat,
+        "p50_us": round(float(np.percentile(us, 50)), 2),
+        "p90_us": round(float(np.percentile(us, 90)), 2),
+        "p99_us": round(float(np.percentile(us, 99)), 2),
+        "max_us": round(float(us.max()), 2),
+        "rois_per_sec": round(repeat * rois_per_call / total, 1) if total else None,
+        "alloc_bytes_per_call": int(alloc_bytes / alloc_runs),
+    }
+
+
+def run(args):
+    rng = np.random.default_rng(args.seed)
+    tmp = tempfile.mkdtemp(prefix="bjbench_")
+    session = os.path.join(tmp, "session.npz")
+
+    # card_2_debug_ocr opens its frame source at import: point it at a replay
+    import card_2_debug_ocr as c2
+    regions = c2.REGIONS
+    write_session(session, regions, 64, rng)
+
+    from auto_blackjack_counter import extract_cards
+    from change_detector import ChangeDetector
+    from pipeline import Frame
+    from screen_capture import RegionCapture, ReplayFrameSource
+    from glyph_classifier import GlyphClassifier
+    from template_matcher import TemplateBank
+
+    if args.ocr == "null":
+        ocr_pool._pool = NullOcrPool()
+
+    # Templates rendered the same way as the ROIs, unless real ones exist
+    card_bank = c2.card_bank if len(c2.card_bank) else TemplateBank(
+        [(r, render_glyph(r, 40, 30, rng)) for r in RANKS])
+    digit_bank = c2.digit_bank if len(c2.digit_bank) else TemplateBank(
+        [(str(d), render_glyph(str(d), 20, 30, rng)) for d in range(10)])
+    c2.card_bank, c2.digit_bank = card_bank, digit_bank
+    if not len(c2.card_classifier):
+        c2.card_classifier = GlyphClassifier([(r, render_glyph(r, 40, 30, rng)) for r in RANKS])
+    if not len(c2.digit_classifier):
+        digits = [(str(d), render_glyph(str(d), 20, 30, rng)) for d in range(10)]
+        c2.digit_classifier = GlyphClassifier(digits)
+    card_classifier, digit_classifier = c2.card_classifier, c2.digit_classifier
+
+    card_rois = [render_glyph(RANKS[i % 13], *region_size(regions[f"card_{1 + i % 5}"]), rng)
+                 for i in range(65)]
+    bj_rois = [render_glyph(str(t), *region_size(regions["bj_counter"]), rng) for t in range(12, 27)]
+    ocr_texts = ["A", "10", "O", "K", "7", "S", "Z", "?", ""]
+    hands = [[RANKS[j % 13] for j in range(i, i + 2 + i % 4)] for i in range(40)]
+
+    results = []
+    n = args.repeat
+
+    capture = RegionCapture(regions, source=ReplayFrameSource(session, max_speed=True))
+    frame_count = [0]
+
+    def grab(_):
+        if frame_count[0] >= 63:
+            capture.source.index = -1
+            frame_count[0] = 0
+        frame_count[0] += 1
+        return capture.grab()
+
+    results.append(measure("capture_all_regions[replay]", grab, [None], n, rois_per_call=len(regions)))
+    results.append(measure("threshold", lambda g: cv2.threshold(g, 160, 255, cv2.THRESH_BINARY),
+                           card_rois, n))
+
+    # Change detection over all regions: a quiet tick, then a tick where every region moved
+    detector = ChangeDetector(regions)
+    tick_views = [grab(None) for _ in range(8)]
+    detector.update(tick_views[0])
+    detector.accept(detector.labels)
+    results.append(measure("change_detect[unchanged]", detector.update, [tick_views[0]], n,
+                           rois_per_call=len(regions)))
+    results.append(measure("change_detect[changed]", detector.update, tick_views[1:], n,
+                           rois_per_call=len(regions)))
+    results.append(measure("change_detect[2_due]", lambda v: detector.update(v, ("card_1", "bj_counter")),
+                           [tick_views[0]], n, rois_per_call=2))
+    preprocess = RegionPreprocessors(regions, c2.PREPROCESS)
+    results.append(measure("preprocess[card_1]", lambda g: preprocess.run("card_1", g), card_rois[::5], n))
+    results.append(measure("preprocess_all_regions", lambda v: [preprocess.run(k, v[k]) for k in regions],
+                           tick_views, n, rois_per_call=len(regions)))
+    history = c2.RoiRing(card_rois[0].shape, c2.HandTracker.HISTORY_DEPTH)
+    results.append(measure("roi_history_append", lambda g: history.append(g, 0.0), card_rois[::5], n))
+    results.append(measure("ocr_cache_key", lambda g: get_cache().key(g, "card"), card_rois, n))
+    results.append(measure("match_template", lambda g: c2.match_template(g, card_bank), card_rois, n))
+    results.append(measure("match_template_batch5", lambda i: card_bank.match_many(card_rois[i:i + 5]),
+                           list(range(0, 60, 5)), n, rois_per_call=5))
+    results.append(measure("read_digits", digit_bank.read_digits, bj_rois, n))
+    results.append(measure("glyph_classify", card_classifier.classify, card_rois, n))
+    results.append(measure("glyph_classify_batch5",
+                           lambda i: card_classifier.classify_many(card_rois[i:i + 5]),
+                           list(range(0, 60, 5)), n, rois_per_call=5))
+    results.append(measure("glyph_read_digits", digit_classifier.read_digits, bj_rois, n))
+    results.append(measure("extract_card", c2.extract_card, ocr_texts, n))
+    results.append(measure("extract_cards", extract_cards, ["10 4 A", "K Q", "7 8 9 T", ""], n))
+    results.append(measure("get_hand_total", c2.get_hand_total, hands, n))
+
+    ocr_n = max(10, n // 20) if args.ocr == "pool" else n
+    results.append(measure(f"ocr_image_to_string[{args.ocr}]",
+                           lambda g: ocr_pool.image_to_string(g, config="--psm 6"), card_rois, ocr_n))
+
+    # Full recognition stage on a replayed frame, cache cold each call
+    reader = c2.CardReader()
+    frames = [Frame(i, float(i), grab(None)) for i in range(8)]
+
+    def cold_read(frame):
+        reader.detector.reset()
+        reader.scheduler.next_due = dict.fromkeys(reader.scheduler.next_due, 0.0)
+        return reader.read(frame)
+
+    results.append(measure(f"card_reader_tick[{args.ocr}]", quiet(cold_read), frames, ocr_n,
+                           rois_per_call=len(regions), setup=get_cache().entries.clear))
+
+    # Buffer recovery: under-read 3-card hand and bust scan, full 10-deep buffers, cache cold
+    tracker = c2.HandTracker()
+    for i in range(10):
+        for key, ring in tracker.roi_buffers.items():
+            text = str(12 + i) if key == "bj_counter" else RANKS[(i * 7 + len(key)) % len(RANKS)]
+            ring.append(render_glyph(text, *region_size(regions[key]), rng), float(i))
+    blank_bj = np.full(bj_rois[0].shape, 40, np.uint8)
+    recovery_hands = [["5", "6", "2"], ["10", "6", "K"]]
+
+    def recover(hand):
+        tracker.settle_hand(list(hand), blank_bj)
+        tracker.recovery.wait()
+        tracker.recovery.poll()
+
+    results.append(measure(f"buffer_recovery[{args.ocr}]", quiet(recover), recovery_hands, max(4, ocr_n // 4),
+                           rois_per_call=30, setup=get_cache().entries.clear))
+
+    capture.close()
+    shutil.rmtree(tmp, ignore_errors=True)
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "ocr": args.ocr,
+        "repeat": n,
+        "stages": results,
+    }
+
+
+def print_report(report, baseline=None):
+    base = {s["stage"]: s for s in baseline["stages"]} if baseline else {}
+    print(f"{'stage':34} {'p50 µs':>10} {'p90 µs':>10} {'p99 µs':>10} {'ROIs/s':>12} {'alloc B':>10}")
+    for s in report["stages"]:
+        line = (f"{s['stage']:34} {s['p50_us']:>10} {s['p90_us']:>10} {s['p99_us']:>10} "
+                f"{s['rois_per_sec'] or '-':>12} {s['alloc_bytes_per_call']:>10}")
+        old = base.get(s["stage"])
+        if old and old["p50_us"]:
+            line += f"   p50 {100.0 * (s['p50_us'] - old['p50_us']) / old['p50_us']:+.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the recognition hot path offline.")
+    parser.add_argument("--repeat", type=int, default=2000, help="calls per stage")
+    parser.add_argument("--ocr", choices=["pool", "null"], default=None,
+                        help="OCR backend (default: pool if tesseract is found, else null)")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to diff against")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.ocr is None:
+        args.ocr = "pool" if ocr_pool.find_tesseract() else "null"
+
+    # Must be set before card_2_debug_ocr is imported; replaced by a real session in run()
+    placeholder = os.path.join(tempfile.gettempdir(), "bjbench_placeholder.npz")
+    np.savez_compressed(placeholder, frames=np.zeros((1, 1, 1), np.uint8),
+                        timestamps=np.zeros(1), origin=np.zeros(2, np.int32))
+    os.environ["BJ_FRAME_SOURCE"] = f"replay:{placeholder}"
+    os.environ.pop("BJ_RECORD", None)
+
+    report = run(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
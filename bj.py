@@ -0,0 +1,89 @@
+"""One entry point for every tool; each subcommand imports only what it runs.
+
+    python bj.py manual [--stream FILE]      # type cards, or count a token stream
+    python bj.py auto                        # auto counter on the live screen
+    python bj.py card                        # per-card OCR with round summary
+    python bj.py card1                       # single-region OCR probe
+    python bj.py calibrate reference|calibrate|show
+    python bj.py replay session.npz [--mode card|auto] [--realtime]
+    python bj.py bench [--repeat N] [--out bench.json]
+    python bj.py multi tables.json
+    python bj.py sim [--hands N]
+    python bj.py events logs/
+    python bj.py feed unix:/tmp/bj.sock      # print a running counter's count feed
+
+Options before the subcommand set the usual BJ_* environment variables
+for it (e.g. ``--record session.npz``, ``--metrics metrics.jsonl``).
+"""
+import argparse
+import importlib
+import os
+import sys
+
+# subcommand -> (module, help)
+COMMANDS = {
+    "manual": ("blackjack_counter", "manual counter: type the cards you see"),
+    "auto": ("auto_blackjack_counter", "auto counter on the live screen"),
+    "card": ("card_2_debug_ocr", "per-card OCR with round summary"),
+    "card1": ("card_1_debug_ocr", "OCR probe for one card region"),
+    "calibrate": ("calibration", "find and cache the table layout"),
+    "bench": ("bench_recognition", "recognition micro-benchmarks"),
+    "multi": ("multi_table", "several tables from one capture"),
+    "sim": ("shoe_simulator", "Monte Carlo bet-ramp simulator"),
+    "events": ("event_log", "summarize event logs"),
+    "feed": ("count_feed", "print a running counter's count feed"),
+}
+REPLAY_MODES = ("card", "auto")
+
+# global option -> environment variable it sets
+ENV_OPTIONS = {
+    "record": "BJ_RECORD",
+    "metrics": "BJ_METRICS",
+    "event_log": "BJ_EVENT_LOG",
+    "frame_source": "BJ_FRAME_SOURCE",
+    "feed": "BJ_FEED",
+}
+
+
+def run_module(module, prog, argv):
+    """Import ``module`` now and run its main() with ``argv`` as its arguments."""
+    sys.argv = [prog] + list(argv)
+    importlib.import_module(module).main()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="bj", description="Blackjack counting tools.")
+    parser.add_argument("--record", help="record the captured frames to this .npz")
+    parser.add_argument("--metrics", help="append metrics snapshots to this JSON-lines file")
+    parser.add_argument("--event-log", help="write the session event log under this directory")
+    parser.add_argument("--frame-source", help="mss, replay:<path> or ring:<name>")
+    parser.add_argument("--feed", help="publish count events on unix:<path> or tcp:[host:]port")
+    sub = parser.add_subparsers(dest="command", required=True, metavar="command")
+    for name, (_, text) in COMMANDS.items():
+        sub.add_parser(name, help=text, add_help=False)
+    replay = sub.add_parser("replay", help="run a counter on a recorded session")
+    replay.add_argument("session", help=".npz archive or video file")
+    replay.add_argument("--mode", choices=REPLAY_MODES, default="card")
+    replay.add_argument("--realtime", action="store_true", help="pace frames by their timestamps")
+    replay.add_argument("--origin", help="left,top screen offset of a replayed video")
+
+    args, rest = parser.parse_known_args(argv)
+    for option, env in ENV_OPTIONS.items():
+        value = getattr(args, option)
+        if value:
+            os.environ[env] = value
+
+    if args.command == "replay":
+        os.environ["BJ_FRAME_SOURCE"] = f"replay:{args.session}"
+        if not args.realtime:
+            os.environ["BJ_REPLAY_SPEED"] = "max"
+        if args.origin:
+            os.environ["BJ_REPLAY_ORIGIN"] = args.origin
+        module = COMMANDS[args.mode][0]
+        run_module(module, f"bj replay {args.mode}", rest)
+        return
+    run_module(COMMANDS[args.command][0], f"bj {args.command}", rest)
+
+
+if __name__ == "__main__":
+    main()
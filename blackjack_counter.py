@@ -1,18 +1,13 @@
 # blackjack_counter_v1.2.py
 
-def get_card_value(card):
-    card = card.upper()
-    if card in ['2', '3', '4', '5', '6']:
-        return +1
-    elif card in ['7', '8', '9']:
-        return 0
-    elif card in ['10', 'J', 'Q', 'K', 'A']:
-        return -1
-    else:
-        return 0
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
 
-def get_true_count(running_count, decks_remaining):
-    return round(running_count / decks_remaining, 2) if decks_remaining > 0 else 0
+from shoe_state import HI_LO, RANK_CODES, ShoeState, get_true_count, rank_code
 
 def suggest_bet(true_count):
     if true_count <= 1:
@@ -24,21 +19,233 @@ def suggest_bet(true_count):
     else:
         return "🔴 Max bet"
 
-def display_count(running_count, cards_seen, total_decks):
-    decks_remaining = max(0.5, total_decks - (cards_seen / 52))
-    true_count = get_true_count(running_count, decks_remaining)
-    print(f"\n📊 Running Count: {running_count}")
-    print(f"📘 Decks Remaining: {decks_remaining:.2f}")
+def display_count(shoe):
+    decks_remaining = max(0.5, shoe.decks_remaining)
+    true_count = shoe.true_count()
+    print(f"\n📊 Running Count: {shoe.running_count}")
+    print(f"📘 Decks Remaining: {decks_remaining:.2f} ({shoe.penetration:.0%} dealt)")
     print(f"🎯 True Count: {true_count}")
+    print(f"🧮 {shoe.summary()}")
     print(f"💰 Suggested Bet: {suggest_bet(true_count)}")
     return decks_remaining, true_count
 
-def main():
+def deal_cards(shoe, cards):
+    for card in cards:
+        if rank_code(card) is None:
+            print(f"⚠️ Unknown card '{card}' ignored")
+    shoe.deal(cards)
+
+# === STREAMING ===
+# Tokens are separated by whitespace, commas or semicolons; case is ignored.
+# Cards are A 2..9 10 T J Q K; NEXT ends a hand, RESET starts a new shoe and
+# EXIT ends the stream. Everything else is counted as unknown and skipped.
+CHUNK_BYTES = 1 << 22
+SEPARATORS = b" \t\r\n,;"
+NEXT, RESET, EXIT, UNKNOWN = 13, 14, 15, 16
+# suggest_bet() levels by true count: <= 1, <= 2, <= 3, above
+BET_LIMITS = np.array([1, 2, 3])
+BET_LEVELS = np.array(["minimum", "2 units", "4 units", "max"])
+
+# Byte lookup tables: separators, upper case, and the code of a one-byte token
+IS_SEP = np.zeros(256, dtype=bool)
+IS_SEP[list(SEPARATORS)] = True
+UPPER = np.arange(256, dtype=np.uint8)
+UPPER[ord("a"):ord("z") + 1] -= 32
+SINGLE = np.full(256, UNKNOWN, dtype=np.int8)
+for label, code in RANK_CODES.items():
+    if len(label) == 1:
+        SINGLE[ord(label)] = code
+WORDS = {b"10": RANK_CODES["10"], b"NEXT": NEXT, b"RESET": RESET, b"EXIT": EXIT}
+# Per token code: Hi-Lo tag, and whether it is a card
+TAGS = np.zeros(UNKNOWN + 1, dtype=np.int8)
+TAGS[:len(HI_LO)] = HI_LO
+IS_CARD = np.zeros(UNKNOWN + 1, dtype=np.int8)
+IS_CARD[:len(HI_LO)] = 1
+
+RECORD_FIELDS = ("shoe", "hand", "cards", "running_count", "cards_seen", "decks_remaining",
+                 "true_count", "bet")
+NDJSON_RECORD = ('{"shoe":%d,"hand":%d,"cards":%d,"running_count":%d,"cards_seen":%d,'
+                 '"decks_remaining":%.4f,"true_count":%.2f,"bet":"%s"}\n')
+CSV_RECORD = "%d,%d,%d,%d,%d,%.4f,%.2f,%s\n"
+
+
+def round_cents(values):
+    """``round(value, 2)`` for an array, as ShoeState rounds; np.round differs on near-half values."""
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    near_half = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    rounded[near_half] = [round(value, 2) for value in values[near_half].tolist()]
+    return rounded
+
+
+def tokenize(data):
+    """Token codes for a buffer of whole tokens, in one vectorized pass."""
+    buf = UPPER[np.frombuffer(data, dtype=np.uint8)]
+    word = ~IS_SEP[buf]
+    edges = np.diff(word.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    lengths = np.flatnonzero(edges == -1) - starts
+    codes = np.full(len(starts), UNKNOWN, dtype=np.int8)
+    single = lengths == 1
+    codes[single] = SINGLE[buf[starts[single]]]
+    for text, code in WORDS.items():
+        match = np.flatnonzero(lengths == len(text))
+        for offset, byte in enumerate(text):
+            match = match[buf[starts[match] + offset] == byte]
+        codes[match] = code
+    return codes
+
+
+def read_tokens(stream, chunk_bytes=CHUNK_BYTES):
+    """Yield arrays of token codes from a binary stream; tokens split across reads are carried over."""
+    tail = b""
+    while True:
+        data = stream.read(chunk_bytes)
+        if not data:
+            break
+        data = tail + data
+        cut = max(data.rfind(bytes([sep])) for sep in SEPARATORS) + 1
+        data, tail = data[:cut], data[cut:]
+        if data:
+            yield tokenize(data)
+    if tail:
+        yield tokenize(tail)
+
+
+class StreamCounter:
+    """Hi-Lo over token-code chunks, carrying the shoe and hand across chunks.
+
+    A chunk is counted with two cumulative sums (Hi-Lo tags, cards). A hand's
+    running count and cards seen are those sums at its NEXT minus their
+    value at the last RESET (or plus the carried state), looked up only at
+    the NEXT tokens, so a million cards cost a few array passes. Decks
+    remaining and the true count follow ShoeState.
+    """
+
+    def __init__(self, decks=6):
+        self.full_shoe = 13 * round(4 * decks)  # cards in a fresh shoe, as ShoeState counts them
+        self.shoes = 1
+        self.hands = 0
+        self.cards = 0
+        self.unknown = 0
+        self.running_count = 0
+        self.cards_seen = 0
+        self.hand_cards = 0
+        self.done = False
+
+    def _at(self, cum, marks, points, carried, strict=False):
+        """``cum`` at ``points``, restarted at the last mark at (or, ``strict``, before) each point.
+
+        Points with no mark before them continue from ``carried``.
+        """
+        if not len(marks):
+            return cum[points] + carried
+        k = np.searchsorted(marks, points, side="left" if strict else "right") - 1
+        return cum[points] - np.where(k >= 0, cum[marks[np.maximum(k, 0)]], -carried)
+
+    def feed(self, codes):
+        """Count one chunk; returns the hand records (RECORD_FIELDS -> array) it completed."""
+        if self.done:
+            return None
+        exit_at = np.flatnonzero(codes == EXIT)
+        if len(exit_at):
+            codes = codes[:exit_at[0]]
+            self.done = True
+        if not len(codes):
+            return None
+        running_cum = np.cumsum(TAGS[codes], dtype=np.int32)
+        seen_cum = np.cumsum(IS_CARD[codes], dtype=np.int32)
+        is_reset = codes == RESET
+        is_next = codes == NEXT
+        resets = np.flatnonzero(is_reset)
+        ends = np.flatnonzero(is_next)
+        boundaries = np.flatnonzero(is_reset | is_next)
+        last = np.array([len(codes) - 1])
+
+        running = self._at(running_cum, resets, ends, self.running_count)
+        seen = self._at(seen_cum, resets, ends, self.cards_seen)
+        decks = np.maximum(0.5, (self.full_shoe - seen) / 52)
+        true_count = round_cents(running / decks)
+        records = {
+            "shoe": self.shoes + np.searchsorted(resets, ends),
+            "hand": self.hands + 1 + np.arange(len(ends)),
+            # Cards since the boundary before each NEXT (a NEXT is a boundary itself)
+            "cards": self._at(seen_cum, boundaries, ends, self.hand_cards, strict=True),
+            "running_count": running,
+            "cards_seen": seen,
+            "decks_remaining": decks,
+            "true_count": true_count,
+            "bet": BET_LEVELS[np.searchsorted(BET_LIMITS, true_count)],
+        }
+
+        self.running_count = int(self._at(running_cum, resets, last, self.running_count)[0])
+        self.cards_seen = int(self._at(seen_cum, resets, last, self.cards_seen)[0])
+        self.hand_cards = int(self._at(seen_cum, boundaries, last, self.hand_cards)[0])
+        self.shoes += len(resets)
+        self.hands += len(ends)
+        self.cards += int(seen_cum[-1])
+        self.unknown += int(np.count_nonzero(codes == UNKNOWN))
+        return records
+
+    def summary(self):
+        decks = max(0.5, (self.full_shoe - self.cards_seen) / 52)
+        true_count = get_true_count(self.running_count, decks)
+        return {
+            "shoes": self.shoes, "hands": self.hands, "cards": self.cards, "unknown": self.unknown,
+            "running_count": self.running_count, "cards_seen": self.cards_seen,
+            "decks_remaining": round(decks, 4), "true_count": true_count,
+            "bet": str(BET_LEVELS[np.searchsorted(BET_LIMITS, true_count)]),
+        }
+
+
+def format_records(records, fmt):
+    rows = zip(*(records[field].tolist() for field in RECORD_FIELDS))
+    template = NDJSON_RECORD if fmt == "ndjson" else CSV_RECORD
+    return "".join([template % row for row in rows])
+
+
+def stream(source, out, decks=6, fmt="ndjson", summary_only=False, chunk_bytes=CHUNK_BYTES):
+    """Count a token stream from ``source`` (binary), write hand records to ``out``, return the summary."""
+    counter = StreamCounter(decks)
+    if fmt == "csv" and not summary_only:
+        out.write(",".join(RECORD_FIELDS) + "\n")
+    for codes in read_tokens(source, chunk_bytes):
+        records = counter.feed(codes)
+        if records is not None and not summary_only and len(records["hand"]):
+            out.write(format_records(records, fmt))
+        if counter.done:
+            break
+    return counter.summary()
+
+
+def run_stream(args):
+    start = time.perf_counter()
+    source = sys.stdin.buffer if args.stream == "-" else open(args.stream, "rb")
+    out = sys.stdout if not args.out else open(args.out, "w", newline="")
+    try:
+        summary = stream(source, out, args.decks, args.format, args.summary, args.chunk)
+        if args.summary:
+            if args.format == "ndjson":
+                out.write(json.dumps(summary, separators=(",", ":")) + "\n")
+            else:
+                out.write(",".join(summary) + "\n" + ",".join(str(v) for v in summary.values()) + "\n")
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    rate = summary["cards"] / elapsed if elapsed else 0.0
+    print(f"📊 {summary['cards']} cards, {summary['hands']} hands, {summary['shoes']} shoes "
+          f"in {elapsed:.2f}s ({rate / 1e6:.1f}M cards/s) "
+          f"→ Count: {summary['running_count']} | TC: {summary['true_count']}",
+          file=sys.stderr)
+
+def run_interactive():
     print("🎴 Blackjack Counter — Hi-Lo System (v1.2)")
 
     total_decks = float(input("🔢 Total decks in shoe (e.g., 6 or 8): "))
-    running_count = 0
-    cards_seen = 0
+    shoe = ShoeState(total_decks)
 
     while True:
         print("\n🆕 Starting New Hand")
@@ -47,19 +254,16 @@ def main():
         # INITIAL DEAL
         initial = input("🔹 Enter INITIAL deal cards (e.g. '10 4 A K'):\n> ").strip().upper().split()
         if initial == ['EXIT']:
-            print("🛑 Exiting. Final Count:", running_count)
+            print("🛑 Exiting. Final Count:", shoe.running_count)
             break
         if initial == ['RESET']:
-            running_count = 0
-            cards_seen = 0
+            shoe.reset()
             print("♻️ Shoe reset — running count and cards seen cleared.")
             continue
 
-        for card in initial:
-            running_count += get_card_value(card)
-            cards_seen += 1
+        deal_cards(shoe, initial)
 
-        decks_remaining, true_count = display_count(running_count, cards_seen, total_decks)
+        decks_remaining, true_count = display_count(shoe)
 
         # ADDITIONAL CARDS
         while True:
@@ -67,19 +271,33 @@ def main():
             if more == ['NEXT']:
                 break
             if more == ['EXIT']:
-                print("🛑 Exiting. Final Count:", running_count)
+                print("🛑 Exiting. Final Count:", shoe.running_count)
                 return
             if more == ['RESET']:
-                running_count = 0
-                cards_seen = 0
+                shoe.reset()
                 print("♻️ Shoe reset — running count and cards seen cleared.")
                 break
 
-            for card in more:
-                running_count += get_card_value(card)
-                cards_seen += 1
+            deal_cards(shoe, more)
 
-            decks_remaining, true_count = display_count(running_count, cards_seen, total_decks)
+            decks_remaining, true_count = display_count(shoe)
+
+def main():
+    parser = argparse.ArgumentParser(description="Hi-Lo manual counter. With --stream, count card tokens "
+                                                 "from a file, pipe or stdin instead of prompting.")
+    parser.add_argument("--stream", nargs="?", const="-", metavar="PATH",
+                        help="file or named pipe of card / NEXT / RESET tokens (default: stdin)")
+    parser.add_argument("--decks", type=float, default=6, help="decks per shoe (stream mode)")
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson", help="record format")
+    parser.add_argument("--summary", action="store_true", help="only write the end-of-stream summary")
+    parser.add_argument("--out", help="write records to this file instead of stdout")
+    parser.add_argument("--chunk", type=int, default=CHUNK_BYTES, help="bytes read per chunk")
+    args = parser.parse_args()
+
+    if args.stream is None:
+        run_interactive()
+    else:
+        run_stream(args)
 
 if __name__ == "__main__":
     main()
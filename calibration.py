@@ -0,0 +1,331 @@
+"""Table-layout calibration: find the table on screen once, then follow it.
+
+The hard-coded regions in card_2_debug_ocr and auto_blackjack_counter are
+the *reference* layout. ``reference`` picks a small anchor patch near them
+(textured, static over a few seconds of frames and clear of every region
+the counters read) and saves it with the reference screen size.
+
+``calibrate`` searches one full-screen capture for that anchor over a range
+of scales and saves the transform from reference to screen coordinates
+(scale + offset) to a per-resolution file, layouts/layout_<W>x<H>.json.
+The counters map their regions through it at start-up, so capture boxes
+stay as tight as the hand-tuned ones.
+
+While running, AnchorGuard matches the anchor inside a box SEARCH_MARGIN
+pixels larger every tick, which costs microseconds. A moved window
+re-anchors every region in place; losing the anchor for LOST_AFTER ticks
+runs the full search again.
+
+    python calibration.py reference [--frames 40] [--anchor L,T,R,B]
+    python calibration.py calibrate
+    python calibration.py show
+"""
+import argparse
+import json
+import os
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from metrics import get_metrics
+from screen_capture import RegionCapture, open_frame_source, region_bbox
+
+# Layout files; BJ_LAYOUT_DIR overrides the default next to this module
+LAYOUT_DIR = os.environ.get("BJ_LAYOUT_DIR",
+                            os.path.join(os.path.dirname(os.path.abspath(__file__)), "layouts"))
+
+ANCHOR_SIZE = (48, 24)  # (width, height) of the anchor patch
+ANCHOR_NEAR = 64  # px around the regions' bounding box the anchor may come from
+STATIC_STD = 3.0  # max grey-level std over the reference frames for an anchor pixel
+SEARCH_MARGIN = 8  # px of drift the per-tick check can follow
+MATCH_THRESHOLD = 0.8
+LOST_AFTER = 5  # ticks without the anchor before a full search
+SEARCH_BACKOFF = 5.0  # seconds between full searches while the table stays hidden
+SCALES = np.round(np.arange(0.5, 2.001, 0.05), 2)
+
+Reference = namedtuple("Reference", ["patch", "box", "screen"])
+# screen: (width, height); screen coords = offset + scale * reference coords
+Layout = namedtuple("Layout", ["screen", "scale", "offset", "score"])
+
+
+# === FILES ===
+def reference_paths(directory=None):
+    directory = directory or LAYOUT_DIR
+    return os.path.join(directory, "anchor.png"), os.path.join(directory, "reference.json")
+
+
+def save_reference(reference, directory=None):
+    png, meta = reference_paths(directory)
+    os.makedirs(os.path.dirname(png), exist_ok=True)
+    cv2.imwrite(png, reference.patch)
+    with open(meta, "w") as f:
+        json.dump({"box": list(reference.box), "screen": list(reference.screen)}, f)
+
+
+def load_reference(directory=None):
+    png, meta = reference_paths(directory)
+    if not (os.path.exists(png) and os.path.exists(meta)):
+        return None
+    with open(meta) as f:
+        data = json.load(f)
+    return Reference(cv2.imread(png, cv2.IMREAD_GRAYSCALE), tuple(data["box"]), tuple(data["screen"]))
+
+
+def layout_path(screen, directory=None):
+    return os.path.join(directory or LAYOUT_DIR, f"layout_{screen[0]}x{screen[1]}.json")
+
+
+def save_layout(layout, directory=None):
+    os.makedirs(directory or LAYOUT_DIR, exist_ok=True)
+    with open(layout_path(layout.screen, directory), "w") as f:
+        json.dump({**layout._asdict(), "calibrated": time.strftime("%Y-%m-%dT%H:%M:%S")}, f)
+
+
+def load_layout(screen, directory=None):
+    """The cached layout for a screen of ``screen`` = (width, height), or None."""
+    path = layout_path(screen, directory)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        data = json.load(f)
+    return Layout(tuple(data["screen"]), data["scale"], tuple(data["offset"]), data["score"])
+
+
+def screen_size(box):
+    return (box[2] - box[0], box[3] - box[1])
+
+
+# === LAYOUT MATH ===
+def map_region(layout, region):
+    (dx, dy), s = layout.offset, layout.scale
+    return (int(round(dx + s * region[0])), int(round(dy + s * region[1])),
+            int(round(dx + s * region[2])), int(round(dy + s * region[3])))
+
+
+def apply_layout(layout, regions):
+    """Map reference regions onto the screen described by ``layout``."""
+    return {label: map_region(layout, r) for label, r in regions.items()}
+
+
+def reference_regions():
+    """Every region either counter reads, in reference coordinates."""
+    import auto_blackjack_counter
+    import card_2_debug_ocr
+    regions = {f"card:{k}": r for k, r in card_2_debug_ocr.REGIONS.items()}
+    regions.update({f"auto:{k}": r for k, r in auto_blackjack_counter.REGIONS.items()})
+    return regions
+
+
+# === ANCHOR SELECTION ===
+def pick_anchor(frames, area, avoid, size=ANCHOR_SIZE):
+    """Choose the anchor box (screen coords) inside ``area`` from reference frames.
+
+    Scores every window of ``size`` by the texture (grey-level std) of the
+    mean frame, among windows whose pixels never moved by more than
+    STATIC_STD across ``frames`` and that overlap none of ``avoid``.
+    """
+    stack = np.stack([f.astype(np.float32) for f in frames])
+    mean = stack.mean(axis=0)
+    motion = stack.std(axis=0)
+    w, h = size
+    kernel = np.ones((h, w), np.uint8)
+    # Window statistics, centred the same way by blur and dilate
+    local_mean = cv2.blur(mean, (w, h))
+    texture = np.sqrt(np.maximum(cv2.blur(mean * mean, (w, h)) - local_mean ** 2, 0))
+    moving = cv2.dilate(motion, kernel)
+
+    allowed = np.zeros(mean.shape, bool)
+    allowed[h // 2:mean.shape[0] - (h - h // 2) + 1, w // 2:mean.shape[1] - (w - w // 2) + 1] = True
+    allowed &= moving <= STATIC_STD
+    left, top = area[0], area[1]
+    for r in avoid:
+        x0, y0 = r[0] - left - (w - w // 2), r[1] - top - (h - h // 2)
+        x1, y1 = r[2] - left + w // 2, r[3] - top + h // 2
+        allowed[max(0, y0):max(0, y1), max(0, x0):max(0, x1)] = False
+    if not allowed.any():
+        return None
+
+    score = np.where(allowed, texture, -1.0)
+    cy, cx = np.unravel_index(int(score.argmax()), score.shape)
+    x, y = left + cx - w // 2, top + cy - h // 2
+    return (int(x), int(y), int(x + w), int(y + h))
+
+
+def find_anchor(screen, patch, expected_scale=1.0, scales=SCALES):
+    """Best (score, scale, (x, y)) of ``patch`` in ``screen``; tries ``expected_scale`` first."""
+    best = (-1.0, expected_scale, (0, 0))
+    for i, scale in enumerate([expected_scale] + [s for s in scales if abs(s - expected_scale) > 1e-6]):
+        tpl = patch
+        if scale != 1.0:
+            tpl = cv2.resize(patch, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        if tpl.shape[0] > screen.shape[0] or tpl.shape[1] > screen.shape[1] or min(tpl.shape) < 4:
+            continue
+        _, score, _, loc = cv2.minMaxLoc(cv2.matchTemplate(screen, tpl, cv2.TM_CCOEFF_NORMED))
+        if score > best[0]:
+            best = (float(score), float(scale), loc)
+        if i == 0 and score >= MATCH_THRESHOLD:
+            break  # the usual case: same table, same scaling
+    return best
+
+
+def calibrate(source, reference, save=True):
+    """Locate the table on a full-screen capture and (by default) cache the layout."""
+    box = source.screen_box()
+    _, gray = source.grab(box)
+    expected = screen_size(box)[0] / reference.screen[0]
+    with get_metrics().timer("layout_search"):
+        score, scale, (x, y) = find_anchor(gray, reference.patch, expected)
+    get_metrics().incr("layout_searches")
+    if score < MATCH_THRESHOLD:
+        print(f"❌ Table anchor not found on screen (best score {score:.2f})")
+        return None
+    offset = (box[0] + x - scale * reference.box[0], box[1] + y - scale * reference.box[1])
+    layout = Layout(screen_size(box), scale, (round(offset[0], 1), round(offset[1], 1)), round(score, 3))
+    if save:
+        save_layout(layout)
+    print(f"📐 Table found at scale {scale:.2f}, offset {layout.offset} (score {score:.2f})")
+    return layout
+
+
+# === RUNTIME ===
+class AnchorGuard:
+    """Per-tick layout check for a RegionCapture.
+
+    ``box`` is the anchor's expected box grown by SEARCH_MARGIN; the capture
+    grabs it with the regions and hands it to ``check``, which returns the
+    (dx, dy) the regions should move by, or None when nothing moved.
+    """
+
+    def __init__(self, reference, layout, source):
+        self.reference = reference
+        self.layout = layout
+        self.source = source
+        self.patch = reference.patch if layout.scale == 1.0 else cv2.resize(
+            reference.patch, None, fx=layout.scale, fy=layout.scale, interpolation=cv2.INTER_AREA)
+        anchor = map_region(layout, reference.box)
+        h, w = self.patch.shape
+        m = SEARCH_MARGIN
+        self.box = (anchor[0] - m, anchor[1] - m, anchor[0] + w + m, anchor[1] + h + m)
+        self.misses = 0
+        self.next_search = 0.0
+
+    def check(self, view):
+        with get_metrics().timer("anchor_check"):
+            if view.shape[0] >= self.patch.shape[0] and view.shape[1] >= self.patch.shape[1]:
+                _, score, _, (x, y) = cv2.minMaxLoc(cv2.matchTemplate(view, self.patch, cv2.TM_CCOEFF_NORMED))
+            else:
+                score = -1.0  # anchor box clipped by the screen edge
+        if score >= MATCH_THRESHOLD:
+            self.misses = 0
+            dx, dy = x - SEARCH_MARGIN, y - SEARCH_MARGIN
+            if dx or dy:
+                get_metrics().incr("anchor_shifts")
+                print(f"📐 Table moved by ({dx:+}, {dy:+}) px → re-anchored")
+                ox, oy = self.layout.offset
+                self.layout = self.layout._replace(offset=(ox + dx, oy + dy))
+                save_layout(self.layout)
+                return dx, dy
+            return None
+        self.misses += 1
+        if self.misses < LOST_AFTER or self.source.now() < self.next_search:
+            return None
+        self.misses = 0
+        return self.relocate()
+
+    def relocate(self):
+        """Full search after losing the anchor; the shift to apply, or None."""
+        print("🔎 Table anchor lost → searching the whole screen")
+        layout = calibrate(self.source, self.reference)
+        if layout is None:
+            self.next_search = self.source.now() + SEARCH_BACKOFF
+            return None
+        if abs(layout.scale - self.layout.scale) > 0.01:
+            # Regions would change size under a running pipeline: saved for the next start
+            print(f"⚠️ Table rescaled ({self.layout.scale:.2f} → {layout.scale:.2f}); "
+                  "restart to apply the new layout")
+            self.next_search = self.source.now() + SEARCH_BACKOFF
+            return None
+        old, new = map_region(self.layout, self.reference.box), map_region(layout, self.reference.box)
+        self.layout = layout
+        return new[0] - old[0], new[1] - old[1]
+
+
+def calibrated_capture(regions, source):
+    """RegionCapture on the cached layout for this screen, guarded by the anchor.
+
+    Without a saved reference the regions are used as given; without a
+    layout for this resolution one is calibrated first.
+    """
+    reference = load_reference()
+    if reference is None:
+        return RegionCapture(regions, source=source)
+    layout = load_layout(screen_size(source.screen_box())) or calibrate(source, reference)
+    if layout is None:
+        print("⚠️ Using the built-in regions")
+        return RegionCapture(regions, source=source)
+    guard = AnchorGuard(reference, layout, source)
+    return RegionCapture(apply_layout(layout, regions), source=source, guard=guard)
+
+
+# === CLI ===
+def make_reference(source, frames=40, interval=0.1, anchor=None):
+    regions = reference_regions()
+    bbox = region_bbox(regions.values())
+    area = (bbox[0] - ANCHOR_NEAR, bbox[1] - ANCHOR_NEAR, bbox[2] + ANCHOR_NEAR, bbox[3] + ANCHOR_NEAR)
+    screen = source.screen_box()
+    area = (max(area[0], screen[0]), max(area[1], screen[1]),
+            min(area[2], screen[2]), min(area[3], screen[3]))
+    shots = []
+    for _ in range(frames):
+        shots.append(source.grab(area)[1].copy())
+        source.sleep(interval)
+    box = tuple(anchor) if anchor else pick_anchor(shots, area, regions.values())
+    if box is None:
+        print("❌ No static, textured patch near the regions; pass --anchor L,T,R,B")
+        return None
+    patch = shots[-1][box[1] - area[1]:box[3] - area[1], box[0] - area[0]:box[2] - area[0]]
+    reference = Reference(patch.copy(), box, screen_size(screen))
+    save_reference(reference)
+    width, height = reference.screen
+    print(f"⚓ Anchor {box} saved to {reference_paths()[0]} (screen {width}x{height})")
+    return reference
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the table layout.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ref = sub.add_parser("reference", help="pick and save the anchor while the built-in regions are correct")
+    ref.add_argument("--frames", type=int, default=40, help="reference frames to find static pixels in")
+    ref.add_argument("--anchor", help="use this L,T,R,B box as the anchor instead of picking one")
+    sub.add_parser("calibrate", help="find the table on the current screen and cache the layout")
+    sub.add_parser("show", help="print the cached layout and the regions it maps to")
+    args = parser.parse_args()
+
+    source = open_frame_source()
+    try:
+        if args.command == "reference":
+            anchor = [int(v) for v in args.anchor.split(",")] if args.anchor else None
+            make_reference(source, args.frames, anchor=anchor)
+            return
+        reference = load_reference()
+        if reference is None:
+            print("❌ No reference anchor yet: run `python calibration.py reference` first")
+            return
+        if args.command == "calibrate":
+            calibrate(source, reference)
+            return
+        layout = load_layout(screen_size(source.screen_box()))
+        if layout is None:
+            print("❌ No layout cached for this resolution: run `python calibration.py calibrate`")
+            return
+        print(f"📐 {layout}")
+        for label, region in apply_layout(layout, reference_regions()).items():
+            print(f"  {label:<20} {region}")
+    finally:
+        source.close()
+
+
+if __name__ == "__main__":
+    main()
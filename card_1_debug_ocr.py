@@ -1,14 +1,12 @@
-import pytesseract
 import cv2
-import numpy as np
-import mss
-import time
 import re
 
-sct = mss.mss()
+import ocr_pool
+from screen_capture import ReplayFinished, open_frame_source
 
-# Set your Tesseract install path
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+source = open_frame_source()
+
+# Tesseract is looked up on first OCR call: TESSERACT_CMD, then PATH, then ocr_pool.DEFAULT_TESSERACT_CMD
 
 # === REGION: Your First Card ===
 # Using top-left coordinates from you: (1829, 946)
@@ -16,14 +14,8 @@ pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tessera
 card_1_region = (1829, 946, 1870, 986)
 
 def grab_gray(region):
-    monitor = {
-        "top": region[1],
-        "left": region[0],
-        "width": region[2] - region[0],
-        "height": region[3] - region[1],
-    }
-    img = np.array(sct.grab(monitor))[:, :, :3]
-    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    _, gray = source.grab(region)
+    return gray
 
 def clean_text(text):
     text = re.sub(r"[^A-Z0-9]", "", text.upper())
@@ -35,16 +27,18 @@ def main():
         while True:
             gray = grab_gray(card_1_region)
             _, thresh = cv2.threshold(gray, 160, 255, cv2.THRESH_BINARY)
-            raw_text = pytesseract.image_to_string(thresh, config='--psm 6')
+            raw_text = ocr_pool.image_to_string(thresh, config='--psm 6')
             cleaned = clean_text(raw_text)
 
             print(f"\n🂠 Raw OCR: {repr(raw_text)}")
             print(f"✅ Cleaned: {cleaned}")
 
-            time.sleep(1)
+            source.sleep(1)
 
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, ReplayFinished):
         print("\n🛑 Test ended.")
+    finally:
+        source.close()
 
 if __name__ == "__main__":
     main()
@@ -1,18 +1,35 @@
-import pytesseract
-import cv2
-import numpy as np
-import mss
-import time
 import re
 import os
-from collections import deque
-
-sct = mss.mss()
-
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-
-# === CARD ZONES ===
-card_1_region = (1825, 940, 1872, 985)
+
+import ocr_pool
+from calibration import calibrated_capture
+from change_detector import ChangeDetector
+from confirmation import CACHED, Confirmer, accept_threshold, match_confidence, ocr_confidence, stability
+from count_feed import get_feed
+from event_log import get_event_log
+from glyph_classifier import GlyphClassifier
+from metrics import get_metrics
+from ocr_cache import get_cache
+from pipeline import Pipeline
+from preprocess import RegionPreprocessors
+from recovery import RecoveryEngine, Scan
+from roi_ring import RoiRing
+from round_state import RoundState, counter_total
+from scheduler import PollScheduler, RegionPolicy
+from screen_capture import open_frame_source
+from shoe_state import RANK_CODES, ShoeState, get_card_value
+from template_matcher import TemplateBank, load_bundle
+
+# Live mss capture by default; set BJ_FRAME_SOURCE=replay:<session.npz> to replay
+source = open_frame_source()
+
+# No-op unless BJ_METRICS / BJ_METRICS_HTTP is set
+metrics = get_metrics()
+# No-op unless BJ_EVENT_LOG is set
+events = get_event_log()
+
+# === CARD ZONES ===
+card_1_region = (1825, 940, 1872, 985)
 card_2_region = (1867, 946, 1907, 976)
 card_3_region = (1908, 946, 1933, 976)
 card_4_region = (1950, 946, 1973, 976)
@@ -20,58 +37,167 @@ card_5_region = (1826, 964, 1853, 996)
 double_card_region = (1948, 985, 1983, 1013)
 bj_counter_region = (1975, 875, 2016, 905)
 
-# Persist last good blackjack counter total
-last_bj_total = None
+REGIONS = {
+    "card_1": card_1_region,
+    "card_2": card_2_region,
+    "card_3": card_3_region,
+    "card_4": card_4_region,
+    "card_5": card_5_region,
+    "double_card": double_card_region,
+    "bj_counter": bj_counter_region,
+}
+
+CARD_KEYS = ("card_1", "card_2", "card_3", "card_4", "card_5")
+# What each region holds, which also namespaces its OCR cache keys
+REGION_KINDS = dict.fromkeys(CARD_KEYS, "card")
+REGION_KINDS.update(bj_counter="digits", double_card="double")
+
+# === PREPROCESSING ===
+# Steps per region (see preprocess.py). The cache key, glyph classifier,
+# template match, tesseract and buffer recovery all read this output, so
+# a step changed here changes what every recognizer sees.
+GLYPH_STEPS = (("threshold", 160), ("pad", 4))
+PREPROCESS = dict.fromkeys(CARD_KEYS + ("bj_counter",), GLYPH_STEPS)
+PREPROCESS["double_card"] = (("rotate", "cw"),) + GLYPH_STEPS  # the double-down card lies sideways
+
+# === POLLING ===
+# Seconds between polls per region: fast right after a change, backing off
+# to the max while quiet. "hand" applies while cards are on the table.
+# Card maxima stay short: a quiet poll costs ~0.1 ms, while a late one
+# delays the count as much as a slow confirmation would
+POLL_POLICIES = {
+    key: RegionPolicy(0.05, 0.15, phases={"idle": (0.1, 0.2)}) for key in CARD_KEYS
+}
+POLL_POLICIES["double_card"] = RegionPolicy(0.1, 0.5, phases={"idle": (0.5, 2.0)})
+POLL_POLICIES["bj_counter"] = RegionPolicy(0.05, 0.5, ocr_per_sec=10, phases={"idle": (1.0, 2.0)})
+
+# === CHANGE DETECTION ===
+# A region is re-read when at least min_blocks of its 4x4 block means moved
+# by more than delta grey levels. Per-region overrides: label -> (delta, min_blocks)
+CHANGE_THRESHOLDS = {}
 
 # === TEMPLATE LOADING ===
+# Rank templates live in templates/, counter digits in templates/digits/.
+# Extra font variants can be added as e.g. K_alt.png. Both are read from the
+# memory-mapped templates/bundle.npz, recompiled when a PNG changes.
 template_dir = os.path.join(os.path.dirname(__file__), "templates")
-card_templates = {
-    "A": cv2.imread(os.path.join(template_dir, "A.png"), 0),
-    "10": cv2.imread(os.path.join(template_dir, "10.png"), 0),
-    "J": cv2.imread(os.path.join(template_dir, "J.png"), 0),
-    "Q": cv2.imread(os.path.join(template_dir, "Q.png"), 0),
-    "K": cv2.imread(os.path.join(template_dir, "K.png"), 0),
-}
-digit_templates = {
-    str(i): cv2.imread(os.path.join(template_dir, "digits", f"{i}.png"), 0)
-    for i in range(10)
-}
+templates = load_bundle(template_dir)
+card_bank = TemplateBank.from_vectors(*templates["cards"])
+digit_bank = TemplateBank.from_vectors(*templates["digits"])
+
+# === GLYPH CLASSIFIER ===
+# Bootstrapped from the same templates, then grows from confirmed hands;
+# harvested samples persist in templates/harvested/ between sessions
+RANK_LABELS = ("A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K")
+harvest_dir = os.path.join(template_dir, "harvested")
+card_classifier = GlyphClassifier.from_vectors(*templates["cards"], os.path.join(harvest_dir, "cards.npz"))
+digit_classifier = GlyphClassifier.from_vectors(*templates["digits"], os.path.join(harvest_dir, "digits.npz"))
+CLASSIFIERS = {"cards": card_classifier, "digits": digit_classifier}
+
+
+def harvested_samples():
+    """This process's harvested glyphs per classifier, for multi_table's parent to merge."""
+    return {name: classifier.harvested_samples() for name, classifier in CLASSIFIERS.items()}
+
+
+def merge_harvested(samples):
+    for name, (labels, vectors) in samples.items():
+        CLASSIFIERS[name].merge(labels, vectors)
+
+
+def save_classifiers():
+    for classifier in CLASSIFIERS.values():
+        classifier.save()
+
+
+def suggest_bet(tc):
+    if tc <= 1:
+        return "🟢"
+    elif tc <= 2:
+        return "🟡"
+    elif tc <= 3:
+        return "🟠"
+    else:
+        return "🔴"
 
-
-def grab_gray(region):
-    monitor = {
-        "top": region[1],
-        "left": region[0],
-        "width": region[2] - region[0],
-        "height": region[3] - region[1],
-    }
-    img = np.array(sct.grab(monitor))[:, :, :3]
-    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-
 def clean_text(text):
     return re.sub(r"[^A-Z0-9]", "", text.upper()).strip()
 
 def clean_digits(text):
     return re.sub(r"\D", "", text)
 
-def match_template(gray_img, templates, threshold=0.8):
-    """Return the label of the first template that exceeds the threshold."""
-    for label, tmpl in templates.items():
-        if tmpl is None:
-            continue
-        res = cv2.matchTemplate(gray_img, tmpl, cv2.TM_CCOEFF_NORMED)
-        _, max_val, _, _ = cv2.minMaxLoc(res)
-        if max_val >= threshold:
-            return label
-    return None
-
-def has_changed(prev_img, curr_img, threshold=25, min_change_pixels=50):
-    """Return True if the difference between images exceeds the threshold."""
-    diff = cv2.absdiff(prev_img, curr_img)
-    _, thresh = cv2.threshold(diff, threshold, 255, cv2.THRESH_BINARY)
-    changed_pixels = cv2.countNonZero(thresh)
-    return changed_pixels > min_change_pixels
-
+def match_template(gray_img, bank, threshold=0.8):
+    """Return the best-scoring template label, or None below the threshold."""
+    with metrics.timer("template_match"):
+        match = bank.match(gray_img, threshold)
+    if match:
+        metrics.incr("template_fallbacks")
+    return match.label if match else None
+
+def ocr_read(kind, text):
+    """The read tesseract's text makes as it stands, with no fallback."""
+    return extract_card(clean_text(text)) if kind == "card" else clean_digits(text)
+
+def interpret_read(kind, text, img):
+    """Turn raw OCR text for a buffered ROI into a read, with template fallback."""
+    if kind == "card":
+        return extract_card(clean_text(text)) or match_template(img, card_bank) or ""
+    read = clean_digits(text)
+    if len(read) < 2:
+        with metrics.timer("template_match"):
+            read = digit_bank.read_digits(img) or read
+    return read
+
+def is_bust_total(cleaned):
+    try:
+        return 22 <= int(cleaned) <= 26
+    except ValueError:
+        return False
+
+def classify_regions(inputs, keys):
+    """Confident classifier Matches for ``keys`` as {key: Match}; the rest need OCR."""
+    reads = {}
+    glyph_keys = [key for key in keys if REGION_KINDS[key] != "digits"]
+    if glyph_keys:
+        matches = card_classifier.classify_many([inputs[key] for key in glyph_keys])
+        for key, match in zip(glyph_keys, matches):
+            if card_classifier.confident(match):
+                reads[key] = match
+    if "bj_counter" in keys:
+        match = digit_classifier.read_digits(inputs["bj_counter"])
+        if digit_classifier.confident(match):
+            reads["bj_counter"] = match
+    return reads
+
+def read_buffered(imgs, kind, sources=None):
+    """Read buffered ROIs ("card" or "digits"), serving repeats from the OCR cache.
+
+    ``sources``, a list, is filled with what made each read: "cache", "ocr" or "template".
+    Only reads tesseract made as they stand are cached: a template guess is no surer
+    for having been needed.
+    """
+    cache = get_cache()
+    keys = [cache.key(img, kind) for img in imgs]
+    reads = [cache.get(k) for k in keys]
+    if sources is not None:
+        sources[:] = ["cache"] * len(reads)
+    misses = [i for i, r in enumerate(reads) if r is None]
+    results = ocr_pool.get_pool().recognize_many([imgs[i] for i in misses], config='--psm 6')
+    for i, result in zip(misses, results):
+        reads[i] = interpret_read(kind, result.text, imgs[i])
+        text = ocr_read(kind, result.text)
+        if reads[i] and reads[i] == text:
+            cache.put(keys[i], reads[i])
+        if sources is not None:
+            sources[i] = "ocr" if reads[i] and reads[i] == text else "template"
+    return reads
+
+def ocr_card(result):
+    """(read, confidence) of a card OCR result; a read that had to be normalized (O → 10) is never sure."""
+    cleaned = clean_text(result.text)
+    read = extract_card(cleaned)
+    return read, ocr_confidence(result) if read == cleaned else 0.0
+
 def extract_card(text):
     text = text.strip().upper()
 
@@ -93,15 +219,6 @@ def extract_card(text):
         return text
 
     return ""
-
-def get_card_value(card):
-    if card in ['2', '3', '4', '5', '6']:
-        return +1
-    elif card in ['7', '8', '9']:
-        return 0
-    elif card in ['10', 'J', 'Q', 'K', 'A']:
-        return -1
-    return 0
 
 def get_hand_total(cards):
     """Return blackjack total with soft-to-hard Ace adjustment."""
@@ -125,343 +242,616 @@ def get_hand_total(cards):
         aces -= 1
 
     return total
-
-def main():
-    print("🔍 Card OCR with Round Summary... Press CTRL+C to stop.")
-    global last_bj_total
-    last_hand = []
-    last_cleaned = []  # last OCR'd hand
-    last_seen_valid_hand = []
-    hand_confirm_count = 0
-    running_count = 0
-    hand_was_cleared = False
-    hand_cleared_timer = None
-    CLEAR_DELAY = 5.0  # seconds before confirmed clear
-    a_visible_since = None
-    last_a_hand = None
-
-    # === Burst OCR Mode Settings ===
-    burst_mode_active = False
-    burst_mode_start = None
-    BURST_DURATION = 4.0  # More time to capture final hits
-    prev_card_regions = {
-        "card_1": None,
-        "card_2": None,
-        "card_3": None,
-        "card_4": None,
-        "card_5": None,
-        "bj_counter": None,
-    }
-
-    roi_buffers = {
-        "card_1": deque(maxlen=10),
-        "card_2": deque(maxlen=10),
-        "card_3": deque(maxlen=10),
-        "card_4": deque(maxlen=10),
-        "card_5": deque(maxlen=10),
-        "bj_counter": deque(maxlen=10),
-    }
-
-    try:
-        while True:
-            now = time.time()
-
-            if burst_mode_active and (time.time() - burst_mode_start > BURST_DURATION):
-                burst_mode_active = False
-                print("🧯 Exiting burst OCR mode")
-            gray1 = grab_gray(card_1_region)
-            roi_buffers["card_1"].append(gray1)
-            gray2 = grab_gray(card_2_region)
-            roi_buffers["card_2"].append(gray2)
-            gray3 = grab_gray(card_3_region)
-            roi_buffers["card_3"].append(gray3)
-            gray4 = grab_gray(card_4_region)
-            roi_buffers["card_4"].append(gray4)
-            gray5 = grab_gray(card_5_region)
-            roi_buffers["card_5"].append(gray5)
-            bj_gray = grab_gray(bj_counter_region)
-            roi_buffers["bj_counter"].append(bj_gray)
-
-            if prev_card_regions["card_1"] is None or has_changed(prev_card_regions["card_1"], gray1):
-                print("🔄 Change detected in card_1 → triggering OCR")
-                _, thresh1 = cv2.threshold(gray1, 160, 255, cv2.THRESH_BINARY)
-                raw1 = pytesseract.image_to_string(thresh1, config='--psm 6')
-                c1 = extract_card(clean_text(raw1))
-                if not c1:
-                    match = match_template(gray1, card_templates)
-                    if match:
-                        c1 = match
-                        print(f"🔁 Template matched card_1: {c1}")
-                prev_card_regions["card_1"] = gray1
-            else:
-                c1 = ""
-
-            if prev_card_regions["card_2"] is None or has_changed(prev_card_regions["card_2"], gray2):
-                print("🔄 Change detected in card_2 → triggering OCR")
-                _, thresh2 = cv2.threshold(gray2, 160, 255, cv2.THRESH_BINARY)
-                raw2 = pytesseract.image_to_string(thresh2, config='--psm 6')
-                c2 = extract_card(clean_text(raw2))
-                if not c2:
-                    match = match_template(gray2, card_templates)
-                    if match:
-                        c2 = match
-                        print(f"🔁 Template matched card_2: {c2}")
-                prev_card_regions["card_2"] = gray2
-            else:
-                c2 = ""
-
-            if prev_card_regions["card_3"] is None or has_changed(prev_card_regions["card_3"], gray3):
-                print("🔄 Change detected in card_3 → triggering OCR")
-                _, thresh3 = cv2.threshold(gray3, 160, 255, cv2.THRESH_BINARY)
-                raw3 = pytesseract.image_to_string(thresh3, config='--psm 6')
-                regular_c3 = extract_card(clean_text(raw3))
-                if not regular_c3:
-                    match = match_template(gray3, card_templates)
-                    if match:
-                        regular_c3 = match
-                        print(f"🔁 Template matched card_3: {regular_c3}")
-                prev_card_regions["card_3"] = gray3
-            else:
-                regular_c3 = ""
-
-            if prev_card_regions["card_4"] is None or has_changed(prev_card_regions["card_4"], gray4):
-                print("🔄 Change detected in card_4 → triggering OCR")
-                _, thresh4 = cv2.threshold(gray4, 160, 255, cv2.THRESH_BINARY)
-                raw4 = pytesseract.image_to_string(thresh4, config='--psm 6')
-                c4 = extract_card(clean_text(raw4))
-                if not c4:
-                    match = match_template(gray4, card_templates)
-                    if match:
-                        c4 = match
-                        print(f"🔁 Template matched card_4: {c4}")
-                prev_card_regions["card_4"] = gray4
-            else:
-                c4 = ""
-
-            if prev_card_regions["card_5"] is None or has_changed(prev_card_regions["card_5"], gray5):
-                print("🔄 Change detected in card_5 → triggering OCR")
-                _, thresh5 = cv2.threshold(gray5, 160, 255, cv2.THRESH_BINARY)
-                raw5 = pytesseract.image_to_string(thresh5, config='--psm 6')
-                c5 = extract_card(clean_text(raw5))
-                if not c5:
-                    match = match_template(gray5, card_templates)
-                    if match:
-                        c5 = match
-                        print(f"🔁 Template matched card_5: {c5}")
-                prev_card_regions["card_5"] = gray5
+
+class CardReader:
+    """Recognition stage: turns one captured frame into per-region reads.
+
+    A changed region is recognized afresh. A still region keeps its last
+    read; while that read is doubtful (below its accept threshold, see
+    confirmation.py) the region is recognized again on each new poll,
+    preferably by the other recognizer: the glyph classifier for a read
+    tesseract made, tesseract for one the classifier or the cache made.
+    Only sure reads go in the OCR cache, and a doubtful one once a second
+    opinion agrees; a cached read that one contradicts is evicted.
+    """
+
+    def __init__(self, policies=POLL_POLICIES, regions=REGIONS):
+        self.ocr_cache = get_cache()
+        self.scheduler = PollScheduler(policies)
+        self.detector = ChangeDetector(regions, thresholds=CHANGE_THRESHOLDS)
+        self.preprocess = RegionPreprocessors(regions, PREPROCESS)
+        # Unchanged regions keep their last read instead of reading blank
+        self.last_reads = {key: "" for key in REGION_KINDS}
+        # What made each last read: "cache", "classifier", "ocr" or "template"
+        self.sources = {key: None for key in REGION_KINDS}
+        # Card regions whose last read still wants a second opinion
+        self.doubtful = set()
+        # OCR cache key of the glyph each region's last read was made from
+        self.cache_keys = {}
+        # When each region last changed, for the stability part of a read's confidence
+        self.changed_at = {}
+
+    def read(self, frame):
+        now = frame.timestamp
+        views = frame.views
+        ocr_cache = self.ocr_cache
+        scheduler = self.scheduler
+        detector = self.detector
+        preprocess = self.preprocess
+
+        # Only regions the scheduler says are due get looked at, and only
+        # changed ones (or still ones with a doubtful read) are
+        # preprocessed, once. Serve glyphs seen before from the cache; hand
+        # every other ROI to the warm OCR pool at once, then collect.
+        # Inputs live in the preprocessor's buffers until the next read,
+        # by which time every OCR call has returned
+        inputs = {}
+        pending = {}
+        cached = {}
+        cache_keys = {}
+        changes = {}
+        confidence = {}
+        sources = {}
+        weights = {}
+        unknown = []
+        rechecks = []
+        due = [key for key in REGION_KINDS if scheduler.is_due(key, now)]
+        with metrics.timer("change_detect"):
+            dirty = detector.dirty(views, due) if due else {}
+        accepted = []
+        for key in due:
+            changed = dirty[key]
+            scheduler.mark_polled(key, now, changed)
+            if not changed:
+                if key in self.doubtful:
+                    rechecks.append(key)
+                continue
+            changes[key] = detector.change(key)
+            previous = self.changed_at.get(key)
+            self.changed_at[key] = now
+            # A region that moved again right away is likely mid-animation
+            weights[key] = stability(now - previous if previous is not None else float("inf"))
+            with metrics.timer("preprocess"):
+                inputs[key] = preprocess.run(key, views[key])
+            cache_keys[key] = ocr_cache.key(inputs[key], REGION_KINDS[key])
+            hit = ocr_cache.get(cache_keys[key])
+            if hit is not None:
+                accepted.append(key)
+                cached[key] = hit
+                sources[key] = "cache"
+                confidence[key] = CACHED * weights[key]
+                continue
+            unknown.append(key)
+
+        # A second opinion on a still region comes from this frame, through
+        # the recognizer that did not make the read when one can give it
+        second_opinion = []
+        for key in rechecks:
+            weights[key] = stability(now - self.changed_at.get(key, float("-inf")))
+            with metrics.timer("preprocess"):
+                inputs[key] = preprocess.run(key, views[key])
+            if self.sources[key] in ("ocr", "template"):
+                second_opinion.append(key)
+
+        # A rank is one of 13 glyphs: the classifier settles most changed
+        # ROIs in microseconds, and only doubtful ones go to tesseract
+        with metrics.timer("glyph_classify"):
+            to_classify = unknown + second_opinion
+            classified = classify_regions(inputs, to_classify) if to_classify else {}
+        for key in unknown:
+            if key in classified:
+                match = classified[key]
+                metrics.incr("classifier_reads")
+                accepted.append(key)
+                cached[key] = match.label
+                sources[key] = "classifier"
+                confidence[key] = match_confidence(match) * weights[key]
+                if confidence[key] >= accept_threshold(match.label):
+                    ocr_cache.put(cache_keys[key], match.label)
+                if key != "bj_counter":
+                    events.log("card", key, RANK_CODES.get(match.label, -1), match.label, ts=now)
+                continue
+            if not scheduler.allow_ocr(key, now):
+                continue  # over budget: still "changed" on the next poll
+            accepted.append(key)
+            print(f"🔄 Change detected in {key} (Δ{detector.change(key):.0f}) → triggering OCR")
+            pending[key] = ocr_pool.submit(inputs[key], config='--psm 6')
+        for key in rechecks:
+            if key in second_opinion and key in classified:
+                cached[key] = classified[key].label
+                sources[key] = "classifier"
+                confidence[key] = match_confidence(classified[key]) * weights[key]
+            elif scheduler.allow_ocr(key, now):
+                metrics.incr("second_opinions")
+                pending[key] = ocr_pool.submit(inputs[key], config='--psm 6')
+        detector.accept(accepted)
+        # Regions whose read matches this frame: polled and still, or read just now
+        current = [key for key in due if not dirty[key] or key in accepted]
+
+        reads = {}
+        raw = {}
+        needs_template = []
+        for key in CARD_KEYS:
+            if key in cached:
+                reads[key] = cached[key]
+            elif key in pending:
+                result = pending[key].result()
+                raw[key] = result.text.strip()
+                reads[key], conf = ocr_card(result)
+                confidence[key] = conf * weights[key]
+                sources[key] = "ocr"
+                if not reads[key]:
+                    needs_template.append(key)
             else:
-                c5 = ""
-
-            if prev_card_regions["bj_counter"] is None or has_changed(prev_card_regions["bj_counter"], bj_gray):
-                print("🔄 Change detected in bj_counter → triggering OCR")
-                _, bj_thresh = cv2.threshold(bj_gray, 160, 255, cv2.THRESH_BINARY)
-                bj_raw = pytesseract.image_to_string(bj_thresh, config='--psm 6')
-                bj_counter = clean_digits(bj_raw)
-                if not bj_counter or len(bj_counter) < 2:
-                    matched = match_template(bj_gray, digit_templates)
-                    if matched:
-                        bj_counter = matched
-                        print(f"🔁 Template matched bj_total: {bj_counter}")
-                prev_card_regions["bj_counter"] = bj_gray
+                reads[key] = self.last_reads[key]
+
+        # Score every OCR miss against the whole template bank in one pass
+        with metrics.timer("template_match"):
+            matches = card_bank.match_many([inputs[key] for key in needs_template])
+        for key, match in zip(needs_template, matches):
+            if match:
+                metrics.incr("template_fallbacks")
+                reads[key] = match.label
+                confidence[key] = match_confidence(match) * weights[key]
+                sources[key] = "template"
+                print(f"🔁 Template matched {key}: {match.label} "
+                      f"(score {match.score:.2f}, margin {match.margin:.2f})")
+        for key in raw:
+            if key not in cache_keys:
+                continue  # a second opinion: the region's read was logged when it changed
+            if reads[key] and confidence[key] >= accept_threshold(reads[key]):
+                ocr_cache.put(cache_keys[key], reads[key])
+            if reads[key]:
+                events.log("card", key, RANK_CODES.get(reads[key], -1), reads[key], ts=now)
+            elif raw[key]:
+                events.log("misread", key, text=raw[key], ts=now)
+
+        if "bj_counter" in cached:
+            bj_counter = cached["bj_counter"]
+        elif "bj_counter" in pending:
+            bj_counter = clean_digits(pending["bj_counter"].result().text)
+            sources["bj_counter"] = "ocr"
+            if not bj_counter or len(bj_counter) < 2:
+                with metrics.timer("template_match"):
+                    matched = digit_bank.read_digits(inputs["bj_counter"])
+                if matched:
+                    metrics.incr("template_fallbacks")
+                    bj_counter = matched
+                    sources["bj_counter"] = "template"
+                    print(f"🔁 Template matched bj_total: {bj_counter}")
             else:
-                bj_counter = ""
-
-            # === Double-Down Card Support ===
-            double_gray = grab_gray(double_card_region)
-            rotated = cv2.rotate(double_gray, cv2.ROTATE_90_CLOCKWISE)
-            raw_double = pytesseract.image_to_string(rotated, config='--psm 6')
-            double_card = extract_card(clean_text(raw_double))
-
-            third_card = double_card if double_card else regular_c3
-
-            cards = [c1, c2, third_card, c4, c5]
-            hand = [c for c in cards if c]
-
-            if len(hand) >= 3 and get_hand_total(hand) < 18:
-                print(f"⚠️ Low-value hand with 3+ cards: {hand} → possible OCR miss")
-
-            if len(hand) == 3 and not burst_mode_active:
-                burst_mode_active = True
-                burst_mode_start = time.time()
-                print("🚀 Entering burst OCR mode after 3rd card")
-
-            if len(hand) >= 2:
-                last_seen_valid_hand = hand.copy()
-
-            # === Fallback Blackjack detection using on-screen counter
-            if bj_counter == "21" and len(hand) == 1:
-                hand = ['A', '10']
-                print("♠ Blackjack inferred from counter → Hand: ['A', '10']")
-                last_hand = hand.copy()
-                last_cleaned = hand.copy()
-                hand_confirm_count = 2  # force confirmation bypass
-
-            # === Discard incomplete reads
-            if len(hand) == 1:
-                # Optional debug output for skipped hands
-                # print(f"Skipping 1-card hand: {hand}")
-                continue  # skip phantom or incomplete hand
-
-            # === Handle delayed hand clear
-            if not hand:
-                hand_confirm_count = 0
-                last_cleaned = []
-                if last_hand and hand_cleared_timer is None:
-                    hand_cleared_timer = time.time()
-                elif hand_cleared_timer and time.time() - hand_cleared_timer >= CLEAR_DELAY:
-                    hand_to_count = last_hand if last_hand else last_seen_valid_hand
-                    if hand_to_count:
-                        delta = sum(get_card_value(c) for c in hand_to_count)
-                        print(f"🧾 Last Hand: {hand_to_count} → Count: {delta:+}")
-
-                        running_count += delta
-
-                        bj_img = grab_gray(bj_counter_region)
-                        bj_raw = pytesseract.image_to_string(bj_img, config='--psm 6')
-                        bj_counter = re.sub(r"[^0-9]", "", bj_raw).strip()
-
-                        try:
-                            parsed = int(bj_counter)
-                            if 12 <= parsed <= 26:
-                                bj_total = parsed
-                                last_bj_total = bj_total  # persist good value
-                            else:
-                                print(f"🚫 Discarding invalid bj_total: {parsed}")
-                                bj_total = None
-                        except ValueError:
-                            bj_total = None
-
-
-                        hand_total = get_hand_total(hand_to_count)
-
-                        # 🔁 Retry OCR from snapshot buffer if hand seems under-read
-                        if bj_total is None and len(hand_to_count) in [3, 4] and hand_total < 18:
-                            print(f"📦 Attempting to recover missed cards from buffer...")
-
-                            for card_key in ["card_3", "card_4", "card_5"]:
-                                if card_key not in roi_buffers:
-                                    continue
-                                for img in reversed(roi_buffers[card_key]):
-                                    raw = pytesseract.image_to_string(img, config='--psm 6')
-                                    cleaned = clean_text(raw)
-                                    extracted = extract_card(cleaned)
-                                    if not extracted:
-                                        match = match_template(img, card_templates)
-                                        if match:
-                                            extracted = match
-                                            print(f"🔁 Template matched {card_key} from buffer: {extracted}")
-                                    if extracted and extracted not in hand_to_count:
-                                        hand_to_count.append(extracted)
-                                        print(f"🧩 Added recovered card from buffer: {extracted}")
-                                        break  # only take one candidate per slot
-
-                        # ✅ Bust inference when bj_total is unreadable
-                        if bj_total is None and hand_total >= 22:
-                            print("🔁 bj_total is None — scanning snapshot buffer for possible counter")
-                            for buffered_img in reversed(roi_buffers["bj_counter"]):
-                                raw = pytesseract.image_to_string(buffered_img, config='--psm 6')
-                                cleaned = re.sub(r"[^0-9]", "", raw)
-                                try:
-                                    parsed = int(cleaned)
-                                    if 22 <= parsed <= 26:
-                                        bj_total = parsed
-                                        print(f"📦 Snapshot OCR recovered bj_total = {bj_total}")
-                                        break
-                                except ValueError:
-                                    continue
-
-                            if bj_total is None:
-                                print(f"🛡️ Inferring bust due to hand_total = {hand_total} (bj_total OCR failed)")
-                                bj_total = hand_total  # force phantom correction path
-
-                        if bj_total is None and last_bj_total and 22 <= last_bj_total <= 26:
-                            bj_total = last_bj_total
-                            print(f"♻️ Reusing last bj_total = {bj_total} due to OCR failure")
-
-                        if bj_total is not None and 22 <= bj_total <= 26 and bj_total - hand_total >= 2:
-                            # Remove the previously added raw hand delta before applying phantom card logic
-                            running_count -= delta
-                            phantom_card_value = bj_total - hand_total
-                            if 'A' in hand_to_count and phantom_card_value == 3:
-                                print("🧐 POSSIBLE OCR SLIP: 'A' might actually be a 4 — review image manually")
-
-                            # Map the difference to a likely card rank
-                            if phantom_card_value == 10:
-                                phantom_card = '10'
-                            elif phantom_card_value == 11:
-                                phantom_card = 'A'
-                            elif 2 <= phantom_card_value <= 6:
-                                phantom_card = str(phantom_card_value)
-                            else:
-                                phantom_card = '10'
-
-                            phantom_hi_lo_value = get_card_value(phantom_card)
-
-                            running_count += phantom_hi_lo_value
-                            print(
-                                f"⚠️ Bust mismatch detected: Hand value = {hand_total}, Counter = {bj_total} → Phantom {phantom_card} added (Hi-Lo: {phantom_hi_lo_value:+})"
-                            )
-
-                        last_bj_total = None
-                        print(
-                            f"🧪 bj_total: {bj_total}, hand_total: {hand_total}, delta: {bj_total - hand_total if bj_total else 'N/A'}"
-                        )
-
-                    print("🧼 Hand cleared after 5s blank.")
-                    last_hand = []
-                    last_cleaned = []
-                    last_seen_valid_hand = []
-                    hand_confirm_count = 0
-                    hand_was_cleared = True
-                    hand_cleared_timer = None
-                a_visible_since = None
-                last_a_hand = None
+                # Cache a total only when the digit classifier reads it the same way
+                match = digit_classifier.read_digits(inputs["bj_counter"])
+                if match is not None and match.label == bj_counter:
+                    ocr_cache.put(cache_keys["bj_counter"], bj_counter)
+        else:
+            bj_counter = self.last_reads["bj_counter"]
+        reads["bj_counter"] = bj_counter
+
+        if "double_card" in cached:
+            double_card = cached["double_card"]
+        elif "double_card" in pending:
+            double_card, conf = ocr_card(pending["double_card"].result())
+            confidence["double_card"] = conf * weights["double_card"]
+            sources["double_card"] = "ocr"
+            if double_card and confidence["double_card"] >= accept_threshold(double_card):
+                ocr_cache.put(cache_keys["double_card"], double_card)
+        else:
+            double_card = self.last_reads["double_card"]
+        reads["double_card"] = double_card
+
+        # A second opinion that reads nothing is no opinion: keep the read
+        for key in rechecks:
+            if not reads[key]:
+                reads[key] = self.last_reads[key]
+                sources.pop(key, None)
+                confidence.pop(key, None)
+        self.cache_keys.update(cache_keys)
+        for key, source in sources.items():
+            self.sources[key] = source
+            if key == "bj_counter":
                 continue
+            if key in rechecks and reads[key] == self.last_reads[key]:
+                self.doubtful.discard(key)  # two recognitions agree
+                ocr_cache.put(self.cache_keys[key], reads[key])
+                continue
+            if key in rechecks:
+                # Two recognitions disagree: whatever was cached for the glyph is in doubt
+                ocr_cache.evict(self.cache_keys[key])
+                if confidence[key] >= accept_threshold(reads[key]):
+                    ocr_cache.put(self.cache_keys[key], reads[key])
+            if reads[key] and confidence.get(key, 0.0) < accept_threshold(reads[key]):
+                self.doubtful.add(key)
             else:
-                hand_cleared_timer = None
-
-            # === Track visibility for hands containing 'A'
-            if 'A' in hand:
-                if last_a_hand == hand:
-                    if a_visible_since is None:
-                        a_visible_since = now
-                else:
-                    last_a_hand = hand.copy()
-                    a_visible_since = now
+                self.doubtful.discard(key)
+
+        self.last_reads.update(reads)
+        # Regions the detector saw change this frame, with their magnitude,
+        # which regions were recognized on this frame and how sure each of
+        # those reads is (see confirmation.py)
+        reads["changes"] = changes
+        reads["confidence"] = confidence
+        reads["fresh"] = list(sources)
+        reads["sources"] = sources
+        reads["current"] = current
+
+        return reads
+
+
+class HandTracker:
+    """Counting stage: hand confirmation, delayed clear and count updates.
+
+    Runs single-threaded on every recognized frame, in capture order. A
+    hand is confirmed once each of its cards is, per ``Confirmer``: a sure
+    read on its first frame, a doubtful one (A vs 4, 10 read as O) after
+    agreeing frames. ``RoundState`` decides when the round is over; the
+    hand is counted right then, and a counter read that only shows up
+    afterwards still corrects it.
+    """
+
+    HISTORY_DEPTH = 64  # changed ROIs kept per region (~3 s at 20 changes/s)
+    RECOVERY_MAX_FRAMES = 8  # unique ROIs OCR'd per buffer when recovering
+    RECOVERY_TIMEOUT = 2.0  # seconds before a recovery gives up
+
+    def __init__(self, decks=6, regions=REGIONS):
+        self.last_hand = []
+        self.last_seen_valid_hand = []
+        self.confirmer = Confirmer(CARD_KEYS + ("double_card",))
+        self.shoe = ShoeState(decks)
+        self.now = None  # capture time of the frame being counted
+        self.hand_was_cleared = False
+        self.round = RoundState()
+        # No-op unless BJ_FEED is set; looked up here so forked table workers serve their own
+        self.feed = get_feed()
+        # Settled hand still waiting for a readable counter: (hand, hand_total)
+        self.awaiting_bj = None
+        # Persist last good blackjack counter total
+        self.last_bj_total = None
+        # Game phase for the poll scheduler: "hand" while a round is on
+        self.phase = "idle"
+
+        # Only ROIs that changed are stored, so the history spans whole hands
+        self.roi_buffers = {}
+        for key in CARD_KEYS + ("bj_counter",):
+            left, top, right, bottom = regions[key]
+            self.roi_buffers[key] = RoiRing((bottom - top, right - left), self.HISTORY_DEPTH)
+        # The tracker's own buffers: harvests and recoveries see what the reader saw
+        self.preprocess = RegionPreprocessors(regions, PREPROCESS)
+        self.recovery = RecoveryEngine(interpret_read, self.RECOVERY_MAX_FRAMES, self.RECOVERY_TIMEOUT,
+                                       prepare=self.preprocess.run, ocr_read=ocr_read)
+
+    def update(self, frame, reads):
+        now = self.now = frame.timestamp
+        views = frame.views
+
+        # Buffer recoveries that finished since the last frame
+        for job in self.recovery.poll():
+            self.reconcile(job)
+
+        changes = reads["changes"]
+        for key, ring in self.roi_buffers.items():
+            if key in changes:
+                ring.append(views[key], now, changes[key])
+
+        # A region recognized on this frame brings a vote and its confidence;
+        # one that kept its earlier read says nothing new
+        confidence = reads["confidence"]
+        for key in reads["current"]:
+            if key in self.confirmer.reads:
+                self.confirmer.observe(key, reads[key], confidence.get(key, 0.0), now,
+                                       key in reads["fresh"], reads["sources"].get(key))
+
+        c1, c2, regular_c3, c4, c5 = (reads[key] for key in CARD_KEYS)
+        bj_counter = reads["bj_counter"]
+        double_card = reads["double_card"]
+
+        third_card = double_card if double_card else regular_c3
+
+        cards = [c1, c2, third_card, c4, c5]
+        hand = [c for c in cards if c]
+        slots = list(CARD_KEYS)
+        if double_card:
+            slots[2] = "double_card"
+        hand_keys = [key for key in slots if reads[key]]
+        inferred = False
+
+        # === Round boundaries: count the hand the moment its round settles
+        round_phase = self.round.update(now, hand, bj_counter, bool(double_card))
+        if round_phase in ("settled", "cleared") and self.last_hand:
+            self.settle_round(views["bj_counter"])
+        if round_phase in ("dealing", "cleared"):
+            self.awaiting_bj = None
+        self.phase = "hand" if hand or self.round.active else "idle"
+        if self.round.phase == "settled":
+            self.late_bj_total(bj_counter, reads)
+            return  # whatever is still on the table belongs to a counted round
+
+        if len(hand) >= 3 and get_hand_total(hand) < 18:
+            print(f"⚠️ Low-value hand with 3+ cards: {hand} → possible OCR miss")
+
+        if len(hand) >= 2:
+            self.last_seen_valid_hand = hand.copy()
+
+        # === Fallback Blackjack detection using on-screen counter
+        if bj_counter == "21" and len(hand) == 1:
+            hand = ['A', '10']
+            print("♠ Blackjack inferred from counter → Hand: ['A', '10']")
+            self.last_hand = hand.copy()
+            inferred = True  # the counter vouches for it: no confirmation needed
+
+        # === Discard incomplete reads
+        if len(hand) == 1:
+            # Optional debug output for skipped hands
+            # print(f"Skipping 1-card hand: {hand}")
+            return  # skip phantom or incomplete hand
+
+        if not hand:
+            return
+
+        # === Confirmation before printing (aces need a surer read than most)
+        if not inferred and not all(self.confirmer.confirmed(key) for key in hand_keys):
+            metrics.incr("confirmation_failures")
+            return
+
+        # Avoid duplicate prints
+        if hand == self.last_hand:
+            return
+
+        # Card-to-count latency: from the newest card's first read to here
+        metrics.observe("confirm_latency", min(self.confirmer.latency(key, now) for key in hand_keys))
+        print(f"🂠 Card 1: {c1}, Card 2: {c2}, Card 3: {third_card}, Card 4: {c4}, Card 5: {c5} "
+              f"→ ✅ Hand: {hand}")
+        events.log("hand", value=get_hand_total(hand), text=" ".join(hand), ts=now)
+        self.feed.publish("hand", value=get_hand_total(hand), text=" ".join(hand), ts=now)
+        self.last_hand = hand.copy()
+        self.hand_was_cleared = False
+        self.harvest(views, reads)
+
+    def harvest(self, views, reads):
+        """Teach the glyph classifier the cards of a confirmed hand it did not read alone.
+
+        Only regions read or re-checked this frame (another region's read
+        may predate what its pixels show now), and only reads confirmed
+        by a recognizer besides the classifier (Confirmer.harvestable).
+        """
+        keys = list(CARD_KEYS)
+        if reads["double_card"]:
+            keys[2] = "double_card"
+        with metrics.timer("glyph_harvest"):
+            for key in keys:
+                if key not in reads["current"] or reads[key] not in RANK_LABELS:
+                    continue
+                if not self.confirmer.harvestable(key):
+                    continue
+                if card_classifier.harvest(self.preprocess.run(key, views[key]), reads[key]):
+                    metrics.incr("glyphs_harvested")
+
+    def round_rois(self, key):
+        """Buffered ROIs of ``key`` since this round was dealt, newest first: older ones show other hands."""
+        ring = self.roi_buffers[key]
+        return ring.latest() if self.round.started is None else ring.since(self.round.started)
+
+    def settle_round(self, bj_img):
+        """Count the round's hand now that it is over."""
+        hand_to_count = self.last_hand if self.last_hand else self.last_seen_valid_hand
+        print(f"🏁 Round settled → counting {hand_to_count}")
+        self.settle_hand(hand_to_count, bj_img)
+        self.last_hand = []
+        self.last_seen_valid_hand = []
+        self.hand_was_cleared = True
+
+    def late_bj_total(self, bj_counter, reads):
+        """A counter read after the round settled corrects its count as an adjustment."""
+        if self.awaiting_bj is None or "bj_counter" not in reads["current"]:
+            return
+        bj_total = counter_total(bj_counter)
+        if bj_total is None or not 12 <= bj_total <= 26:
+            return
+        hand, hand_total = self.awaiting_bj
+        self.awaiting_bj = None
+        print(f"⏱️ Late bj_total = {bj_total} for {hand} → adjusting the count")
+        metrics.incr("late_adjustments")
+        events.log("adjustment", "bj_counter", bj_total, " ".join(hand), shoe=self.shoe, ts=self.now)
+        self.feed.publish("adjustment", "bj_counter", bj_total, " ".join(hand), shoe=self.shoe, ts=self.now)
+        self.apply_bj_total(hand, hand_total, bj_total)
+
+    def settle_hand(self, hand_to_count, bj_img):
+        """Apply a finished hand to the count, with bust/phantom-card correction.
+
+        If the counter is unreadable, the buffer search runs in the background
+        and ``reconcile`` corrects this hand's count when it comes back.
+        """
+        delta = self.shoe.deal(hand_to_count)
+        print(f"🧾 Last Hand: {hand_to_count} → Count: {delta:+}")
+        events.log("count", value=delta, text=" ".join(hand_to_count), shoe=self.shoe, ts=self.now)
+        self.feed.publish("count", value=delta, text=" ".join(hand_to_count), shoe=self.shoe, ts=self.now)
+
+        bj_img = self.preprocess.run("bj_counter", bj_img)
+        sources = []
+        bj_counter = read_buffered([bj_img], "digits", sources)[0]
+
+        try:
+            parsed = int(bj_counter)
+            if 12 <= parsed <= 26:
+                bj_total = parsed
+                self.last_bj_total = bj_total  # persist good value
+                # Learn the digits only where tesseract and the classifier agree on them
+                match = digit_classifier.read_digits(bj_img)
+                if sources[0] == "ocr" and match is not None and match.label == bj_counter:
+                    digit_classifier.harvest_digits(bj_img, bj_counter)
+                events.log("bj_total", "bj_counter", bj_total, ts=self.now)
             else:
-                last_a_hand = None
-                a_visible_since = None
-
-            # === Stability check before printing
-            if hand == last_cleaned:
-                hand_confirm_count += 1
+                print(f"🚫 Discarding invalid bj_total: {parsed}")
+                events.log("misread", "bj_counter", parsed, bj_counter, ts=self.now)
+                bj_total = None
+        except ValueError:
+            bj_total = None
+
+        last_bj_total = self.last_bj_total
+        self.last_bj_total = None
+        hand = list(hand_to_count)
+        hand_total = get_hand_total(hand)
+
+        # 🔁 Retry OCR from snapshot buffer if hand seems under-read
+        if bj_total is None and len(hand) in [3, 4] and hand_total < 18:
+            print(f"📦 Recovering missed cards from buffer in the background...")
+            metrics.incr("buffer_recoveries")
+            known = list(hand)
+
+            def new_card(extracted):
+                # only take one candidate per slot, and never a card already in the hand
+                if extracted and extracted not in known:
+                    known.append(extracted)
+                    return True
+                return False
+
+            self.recovery.submit(("cards", hand, hand_total), [
+                Scan(key, self.round_rois(key), "card", new_card)
+                for key in ("card_3", "card_4", "card_5")
+            ])
+            self.report(None, hand_total)
+            return
+
+        # ✅ Bust inference when bj_total is unreadable
+        if bj_total is None and hand_total >= 22:
+            print("🔁 bj_total is None — scanning snapshot buffer for possible counter in the background")
+            metrics.incr("buffer_recoveries")
+            self.recovery.submit(("bj_total", hand, hand_total), [
+                Scan("bj_counter", self.round_rois("bj_counter"), "digits", is_bust_total)
+            ])
+            return
+
+        if bj_total is None and last_bj_total and 22 <= last_bj_total <= 26:
+            bj_total = last_bj_total
+            print(f"♻️ Reusing last bj_total = {bj_total} due to OCR failure")
+
+        if bj_total is None:
+            self.awaiting_bj = (hand, hand_total)
+        self.apply_bj_total(hand, hand_total, bj_total)
+
+    def apply_bj_total(self, hand, hand_total, bj_total):
+        """Replace a busted hand's count with the phantom card the counter implies."""
+        if bj_total is not None and 22 <= bj_total <= 26 and bj_total - hand_total >= 2:
+            # Take the hand back out of the count before applying phantom card logic
+            self.shoe.undeal(hand)
+            phantom_card_value = bj_total - hand_total
+            if 'A' in hand and phantom_card_value == 3:
+                print("🧐 POSSIBLE OCR SLIP: 'A' might actually be a 4 — review image manually")
+
+            # Map the difference to a likely card rank
+            if phantom_card_value == 10:
+                phantom_card = '10'
+            elif phantom_card_value == 11:
+                phantom_card = 'A'
+            elif 2 <= phantom_card_value <= 6:
+                phantom_card = str(phantom_card_value)
             else:
-                hand_confirm_count = 1
-                last_cleaned = hand.copy()
+                phantom_card = '10'
+
+            phantom_hi_lo_value = get_card_value(phantom_card)
+            metrics.incr("phantom_corrections")
+
+            self.shoe.deal(phantom_card)
+            correction = f"{' '.join(hand)} → {phantom_card} (bj_total {bj_total})"
+            code = RANK_CODES[phantom_card]
+            events.log("correction", value=code, text=correction, shoe=self.shoe, ts=self.now)
+            self.feed.publish("correction", value=code, text=correction, shoe=self.shoe, ts=self.now)
+            print(
+                f"⚠️ Bust mismatch detected: Hand value = {hand_total}, Counter = {bj_total} "
+                f"→ Phantom {phantom_card} added (Hi-Lo: {phantom_hi_lo_value:+})"
+            )
+
+        self.report(bj_total, hand_total)
+
+    def report(self, bj_total, hand_total):
+        delta = bj_total - hand_total if bj_total else 'N/A'
+        print(f"🧪 bj_total: {bj_total}, hand_total: {hand_total}, delta: {delta}")
+        true_count = self.shoe.true_count()
+        print(f"📊 Count: {self.shoe.running_count} | TC: {true_count} | Bet: {suggest_bet(true_count)} "
+              f"| {self.shoe.summary()}")
+
+    def reconcile(self, job):
+        """Fold a finished background recovery into the count."""
+        kind, hand, hand_total = job.tag
+        print(f"📬 Buffer recovery for {hand} done in {job.seconds * 1000:.0f} ms "
+              f"({job.ocr_calls} OCR calls)")
+        if kind == "cards":
+            for key in ("card_3", "card_4", "card_5"):
+                card = job.found.get(key)
+                if card:
+                    print(f"🧩 Added recovered card from buffer: {card} (Hi-Lo: {self.shoe.deal(card):+})")
+                    code = RANK_CODES.get(card, -1)
+                    events.log("recovery", key, code, card, shoe=self.shoe, ts=self.now)
+                    self.feed.publish("recovery", key, code, card, shoe=self.shoe, ts=self.now)
+            print(f"📊 Count: {self.shoe.running_count} | TC: {self.shoe.true_count()} "
+                  f"| {self.shoe.summary()}")
+            return
+
+        found = job.found.get("bj_counter")
+        if found:
+            bj_total = int(found)
+            print(f"📦 Snapshot OCR recovered bj_total = {bj_total}")
+            events.log("recovery", "bj_counter", bj_total, found, shoe=self.shoe, ts=self.now)
+            self.feed.publish("recovery", "bj_counter", bj_total, found, shoe=self.shoe, ts=self.now)
+        else:
+            print(f"🛡️ Inferring bust due to hand_total = {hand_total} (bj_total OCR failed)")
+            bj_total = hand_total  # force phantom correction path
+        self.apply_bj_total(hand, hand_total, bj_total)
 
-            if hand_confirm_count < 2:
-                continue
+    def finish(self, save=True):
+        """Wait for background recoveries and apply them (end of session).
 
-            # Avoid duplicate prints
-            if hand == last_hand:
-                continue
+        ``save=False`` leaves the harvested glyphs unsaved, for a caller that
+        gathers them from several processes (multi_table).
+        """
+        self.recovery.wait(self.recovery.timeout * 4)
+        for job in self.recovery.poll():
+            self.reconcile(job)
+        self.recovery.shutdown()
+        if save:
+            save_classifiers()
+        print(f"🔤 Glyph classifier: cards {card_classifier.stats()}, digits {digit_classifier.stats()}")
+
+
+def build_pipeline(capture, decks=6):
+    """Wire the reader and tracker for one table onto ``capture``.
+
+    Capture, OCR and counting run as separate stages. The poll scheduler
+    decides when the next frame is needed and which regions it covers;
+    the tracker's game phase speeds up or slows down each region.
+    """
+    reader = CardReader(regions=capture.regions)
+    tracker = HandTracker(decks, capture.regions)
 
-            # === Valid hand update with optional delay for 'A'
-            should_print = True
-            if 'A' in hand:
-                if last_a_hand == hand and a_visible_since and now - a_visible_since >= 1:
-                    should_print = True
-                else:
-                    should_print = False
-            if should_print:
-                print(f"🂠 Card 1: {c1}, Card 2: {c2}, Card 3: {third_card}, Card 4: {c4}, Card 5: {c5} → ✅ Hand: {hand}")
-                last_hand = hand.copy()
-                hand_was_cleared = False
-
-            time.sleep(0.05 if burst_mode_active else 0.5)
-
-    except KeyboardInterrupt:
-        print("\n🛑 Test ended.")
-
-if __name__ == "__main__":
-    main()
+    def count(frame, reads):
+        tracker.update(frame, reads)
+        reader.scheduler.set_phase(tracker.phase, frame.timestamp)
+
+    pipeline = Pipeline(capture, reader.read, count,
+                        interval=lambda: reader.scheduler.next_wakeup(capture.now()))
+    return pipeline, reader, tracker
+
+
+def main():
+    print("🔍 Card OCR with Round Summary... Press CTRL+C to stop.")
+    # Regions follow the cached table layout when one has been calibrated
+    capture = calibrated_capture(REGIONS, source)
+    pipeline, reader, tracker = build_pipeline(capture)
+
+    try:
+        pipeline.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        tracker.finish()
+        print("\n🛑 Test ended.")
+        print(f"📈 Pipeline: {pipeline.stats()}")
+        print(f"⏱️ Scheduler: {reader.scheduler.stats()}")
+        print(f"🗃️ OCR cache: {get_cache().stats()}")
+        metrics.close()
+        events.close()
+        get_feed().close()
+        capture.close()
+
+if __name__ == "__main__":
+    main()
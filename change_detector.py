@@ -0,0 +1,92 @@
+import cv2
+import numpy as np
+
+
+class ChangeDetector:
+    """Block-mean change detection for a fixed set of screen regions.
+
+    Each region is reduced to a grid of ``block`` x ``block`` pixel means, and
+    all grids live side by side in one flat signature. ``update`` compares
+    every region against its reference in a single vectorized pass. A block
+    counts as changed when its mean moves by more than ``delta`` grey levels;
+    a region is dirty when at least ``min_blocks`` of its blocks changed.
+    Averaging means one flipped pixel moves a 4x4 block by at most 16 levels,
+    so noise and anti-aliasing stay under the default threshold while a new
+    glyph does not.
+
+    ``thresholds`` maps a label to its own (delta, min_blocks). References
+    only move when ``accept`` is called, so a region that was dirty but not
+    read (e.g. over its OCR budget) stays dirty on the next poll.
+    """
+
+    def __init__(self, regions, block=4, delta=24, min_blocks=2, thresholds=None):
+        thresholds = thresholds or {}
+        self.labels = list(regions)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.block = block
+
+        grids, starts = {}, []
+        total = 0
+        for label, (left, top, right, bottom) in regions.items():
+            grid = (max(1, (right - left) // block), max(1, (bottom - top) // block))
+            grids[label] = grid
+            starts.append(total)
+            total += grid[0] * grid[1]
+        sizes = np.diff(starts + [total])
+
+        self.current = np.zeros(total, dtype=np.uint8)
+        self.reference = np.zeros(total, dtype=np.uint8)
+        self.diff = np.zeros(total, dtype=np.uint8)
+        self.spans = {label: (s, s + n) for label, s, n in zip(self.labels, starts, sizes)}
+        # cv2.resize writes each region's block means straight into its span
+        self.targets = [
+            (label, grids[label], self.current[s:e].reshape(grids[label][1], grids[label][0]))
+            for label, (s, e) in self.spans.items()
+        ]
+        self.starts = np.array(starts, dtype=np.intp)
+        self.block_delta = np.repeat(
+            [thresholds.get(label, (delta, min_blocks))[0] for label in self.labels], sizes).astype(np.uint8)
+        self.min_blocks = np.array([thresholds.get(label, (delta, min_blocks))[1] for label in self.labels])
+        self.seen = np.zeros(len(self.labels), dtype=bool)
+
+    def signature(self, views, labels=None):
+        """Refresh the block-mean signature of ``labels`` (default: all) from ``views``."""
+        for label, grid, dst in self.targets:
+            if labels is None or label in labels:
+                cv2.resize(views[label], grid, dst=dst, interpolation=cv2.INTER_AREA)
+
+    def update(self, views, labels=None):
+        """Return a dirty mask over all regions, in ``labels`` order.
+
+        Only the regions in ``labels`` are re-sampled (e.g. the ones the poll
+        scheduler says are due); the rest keep their previous signature.
+        Regions never accepted are always dirty.
+        """
+        self.signature(views, labels)
+        cv2.absdiff(self.current, self.reference, dst=self.diff)
+        changed_blocks = np.add.reduceat(self.diff > self.block_delta, self.starts, dtype=np.int32)
+        return (changed_blocks >= self.min_blocks) | ~self.seen
+
+    def dirty(self, views, labels=None):
+        """``update`` as a {label: bool} dict."""
+        return dict(zip(self.labels, self.update(views, labels).tolist()))
+
+    def accept(self, labels):
+        """Make the latest signature the reference for ``labels``."""
+        for label in labels:
+            start, end = self.spans[label]
+            self.reference[start:end] = self.current[start:end]
+            self.seen[self.index[label]] = True
+
+    def reset(self, labels=None):
+        """Forget references so the next update reports the regions dirty."""
+        if labels is None:
+            self.seen[:] = False
+        else:
+            for label in labels:
+                self.seen[self.index[label]] = False
+
+    def change(self, label):
+        """Mean absolute block change of ``label`` at the last update, in grey levels."""
+        start, end = self.spans[label]
+        return float(self.diff[start:end].mean())
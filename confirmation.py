@@ -0,0 +1,123 @@
+"""Confidence-scored confirmation of per-region reads.
+
+Every read comes with a confidence in [0, 1]. It is built from whatever
+produced the read (``match_confidence`` for the glyph classifier and the
+template banks, ``ocr_confidence`` for tesseract, CACHED for an OCR cache
+hit) and weighted by ``stability``, i.e. how long the region had been
+still. A read at or above ACCEPT is confirmed on the frame it was made.
+A weaker one waits for VOTES agreeing recognitions, as every read used
+to. Ranks that are easily mistaken for each other (CONFUSABLE: A and 4)
+need ACCEPT_CONFUSABLE to skip the vote.
+
+Only a fresh recognition votes: a new frame run through a recognizer
+again (the readers prefer a different recognizer or preprocessing for
+the second opinion). An earlier read served again for a region that has
+not changed is not fresh and counts for nothing, since agreeing with
+itself says nothing about whether it was right.
+
+The glyph classifier learns only from ``harvestable`` reads: confirmed by
+VOTES recognitions, at least one of them not the classifier's own (nor
+the cache's, which may hold one). Learning from its own guesses would
+only make it surer of its mistakes.
+"""
+from metrics import get_metrics
+
+ACCEPT = 0.85
+ACCEPT_CONFUSABLE = 0.97
+VOTES = 2
+CONFUSABLE = frozenset({"A", "4"})
+# An OCR cache hit repeats an earlier confirmed read of the same quantized glyph
+CACHED = 0.9
+# Margin over the runner-up label at which a match counts as unambiguous
+FULL_MARGIN = 0.15
+# A region still for SETTLE_SECONDS gets full weight; one that has just
+# moved again (a card still sliding in) gets STABILITY_FLOOR
+SETTLE_SECONDS = 0.15
+STABILITY_FLOOR = 0.8
+# Recognizers whose agreement alone does not make a read worth learning from
+SELF_TRAINED = frozenset({"classifier", "cache"})
+
+
+def match_confidence(match):
+    """Confidence of a template / classifier Match: its score, scaled down by a thin margin."""
+    if match is None:
+        return 0.0
+    return max(0.0, float(match.score)) * min(1.0, max(0.0, float(match.margin)) / FULL_MARGIN)
+
+
+def ocr_confidence(result):
+    """Weakest character confidence of an OcrResult, as 0..1 (0 when tesseract gave none)."""
+    confidences = [conf for _, conf in result.confidences if conf >= 0]
+    return min(confidences) / 100.0 if confidences else 0.0
+
+
+def stability(still_for):
+    """Weight of a read whose region had been still for ``still_for`` seconds."""
+    return STABILITY_FLOOR + (1.0 - STABILITY_FLOOR) * min(1.0, max(0.0, still_for) / SETTLE_SECONDS)
+
+
+def accept_threshold(read):
+    """ACCEPT, or ACCEPT_CONFUSABLE if ``read`` (a rank or a sequence of ranks) holds a confusable rank."""
+    ranks = (read,) if isinstance(read, str) else read
+    return ACCEPT_CONFUSABLE if any(rank in CONFUSABLE for rank in ranks) else ACCEPT
+
+
+class Confirmer:
+    """Confirmation state per label: the standing read, its best confidence and its votes."""
+
+    def __init__(self, labels=()):
+        self.reads = {}
+        self.scores = {}
+        self.votes = {}
+        self.since = {}
+        self.sources = {}
+        self.metrics = get_metrics()
+        for label in labels:
+            self.reset(label)
+
+    def reset(self, label):
+        self.reads[label] = None
+        self.scores[label] = 0.0
+        self.votes[label] = 0
+        self.since[label] = None
+        self.sources[label] = set()
+
+    def observe(self, label, read, confidence=0.0, now=None, fresh=True, source=None):
+        """Add one observation of ``label``; True once confirmed.
+
+        ``fresh``: ``read`` was recognized on this frame, by ``source`` (e.g.
+        "ocr", "classifier"). A stale read (the last one, served again)
+        neither votes nor raises the score.
+        """
+        was_confirmed = self.confirmed(label)
+        if read != self.reads.get(label):
+            self.reads[label] = read
+            self.scores[label] = confidence if fresh else 0.0
+            self.votes[label] = 1 if fresh else 0
+            self.since[label] = now
+            self.sources[label] = {source} if fresh and source else set()
+            was_confirmed = False
+        elif fresh:
+            self.votes[label] += 1
+            self.scores[label] = max(self.scores[label], confidence)
+            if source:
+                self.sources[label].add(source)
+        confirmed = self.confirmed(label)
+        if confirmed and not was_confirmed and read:
+            self.metrics.incr("confirmed_first_frame" if self.votes[label] == 1 else "confirmed_by_vote")
+        return confirmed
+
+    def confirmed(self, label):
+        read = self.reads.get(label)
+        if read is None:
+            return False
+        return self.scores[label] >= accept_threshold(read) or self.votes[label] >= VOTES
+
+    def harvestable(self, label):
+        """True when ``label``'s read is confirmed independently of the classifier it would teach."""
+        return self.votes.get(label, 0) >= VOTES and bool(self.sources.get(label, set()) - SELF_TRAINED)
+
+    def latency(self, label, now):
+        """Seconds since ``label``'s standing read was first observed."""
+        since = self.since.get(label)
+        return 0.0 if since is None or now is None else now - since
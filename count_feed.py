@@ -0,0 +1,289 @@
+"""Local pub/sub feed of count events for overlays, loggers and trackers.
+
+The counters publish the same count / hand / correction events they write
+to the event log, and any number of local subscribers can connect to:
+
+    BJ_FEED=unix:/tmp/bj.sock        Unix-domain socket (a bare path works too)
+    BJ_FEED=tcp:127.0.0.1:8765       TCP; ``tcp:8765`` listens on localhost
+
+An asyncio loop on its own thread owns the server and every connection.
+``publish`` packs one frame and hands it to that loop with
+``call_soon_threadsafe``, so the recognition loop never waits on a socket
+or a subscriber. The loop writes each frame to every subscriber's transport
+without awaiting. A subscriber whose unread backlog passes MAX_BUFFERED is
+dropped, so it cannot hold frames, or memory, for everyone else.
+
+Every frame is little-endian: the u16 length of what follows, then FRAME,
+then the region and text as UTF-8:
+
+    kind u1 (event_log.EVENT_KINDS index)   region_len u1   text_len u2
+    ts f8   value i4   running_count i4   true_count f4   cards_seen i4
+
+As in the event log, running_count and cards_seen are -1 and true_count
+is NaN for events that carry no count. A new subscriber first gets the
+last event that carried one, so it starts from the current count.
+
+    python count_feed.py unix:/tmp/bj.sock [--json]     # print the feed
+"""
+import argparse
+import asyncio
+import atexit
+import json
+import math
+import os
+import socket
+import struct
+import threading
+import time
+
+from event_log import EVENT_KINDS, KIND_CODES
+from metrics import get_metrics
+
+LENGTH = struct.Struct("<H")
+FRAME = struct.Struct("<BBHdiifi")
+MAX_TEXT = 1024  # bytes of text kept per event
+MAX_BUFFERED = 1 << 16  # unread bytes before a subscriber is dropped
+DEFAULT_HOST = "127.0.0.1"
+
+
+def parse_address(address):
+    """("unix", path) or ("tcp", (host, port)) for a BJ_FEED address."""
+    if address.startswith("tcp:"):
+        host, _, port = address[4:].rpartition(":")
+        return "tcp", (host or DEFAULT_HOST, int(port))
+    if address.startswith("unix:"):
+        address = address[5:]
+    return "unix", address
+
+
+def table_address(address, index, name):
+    """The address of one table's feed in multi_table: a socket per table name, or the port plus its index."""
+    kind, where = parse_address(address)
+    if kind == "tcp":
+        return f"tcp:{where[0]}:{where[1] + index}"
+    root, ext = os.path.splitext(where)
+    return f"unix:{root}.{name}{ext}"
+
+
+def encode_event(kind, region=None, value=0, text=None, shoe=None, ts=None):
+    """One frame for an event; the arguments are those of EventLog.log."""
+    region = (region or "").encode()[:255]
+    text = (text or "").encode()[:MAX_TEXT]
+    if shoe is not None:
+        count = (shoe.running_count, shoe.true_count(), shoe.cards_seen)
+    else:
+        count = (-1, math.nan, -1)
+    ts = time.time() if ts is None else ts
+    body = FRAME.pack(KIND_CODES[kind], len(region), len(text), ts, value, *count)
+    return LENGTH.pack(len(body) + len(region) + len(text)) + body + region + text
+
+
+def decode_event(payload):
+    """The event dict of one frame's payload (the bytes after its length)."""
+    kind, region_len, text_len, ts, value, running_count, true_count, cards_seen = FRAME.unpack_from(payload)
+    region = payload[FRAME.size:FRAME.size + region_len].decode()
+    text = payload[FRAME.size + region_len:FRAME.size + region_len + text_len].decode()
+    counted = cards_seen >= 0
+    return {
+        "kind": EVENT_KINDS[kind] if kind < len(EVENT_KINDS) else kind,
+        "ts": ts,
+        "region": region or None,
+        "value": value,
+        "running_count": running_count if counted else None,
+        "true_count": round(true_count, 2) if counted else None,
+        "cards_seen": cards_seen if counted else None,
+        "text": text or None,
+    }
+
+
+# === PUBLISHER ===
+class _Subscriber(asyncio.Protocol):
+    """One connected subscriber; lives on the feed's loop."""
+
+    def __init__(self, feed):
+        self.feed = feed
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        # Bound the kernel's share of the backlog too, or it hides a stalled reader
+        sock = transport.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.feed.max_buffered)
+        transport.set_write_buffer_limits(high=self.feed.max_buffered)
+        self.feed.subscribers.add(self)
+        self.feed.metrics.incr("feed_subscribers")
+        if self.feed.last_count is not None:
+            transport.write(self.feed.last_count)
+
+    def data_received(self, data):
+        pass  # subscribers only listen
+
+    def pause_writing(self):
+        # The subscriber is MAX_BUFFERED behind: drop it rather than buffer for it
+        self.feed.subscribers.discard(self)
+        self.feed.metrics.incr("feed_dropped")
+        self.transport.abort()
+
+    def connection_lost(self, exc):
+        self.feed.subscribers.discard(self)
+
+
+class CountFeed:
+    """Publishes event frames to every subscriber of one local address."""
+
+    enabled = True
+
+    def __init__(self, address, max_buffered=MAX_BUFFERED):
+        self.address = address
+        self.max_buffered = max_buffered
+        self.pid = os.getpid()
+        self.metrics = get_metrics()
+        self.subscribers = set()
+        self.last_count = None  # latest frame that carried a count; sent on connect
+        self.closed = False
+        self.server = None
+        self.error = None
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="count-feed", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(self._listen())
+        except OSError as e:
+            self.error = e
+            self.ready.set()
+            self.loop.close()
+            return
+        self.ready.set()
+        self.loop.run_forever()
+        # Stopped by close()
+        self.server.close()
+        for subscriber in list(self.subscribers):
+            subscriber.transport.abort()
+        self.loop.run_until_complete(asyncio.sleep(0))  # let the aborts run
+        self.loop.close()
+        kind, where = parse_address(self.address)
+        if kind == "unix" and os.path.exists(where):
+            os.unlink(where)
+
+    async def _listen(self):
+        kind, where = parse_address(self.address)
+        if kind == "tcp":
+            return await self.loop.create_server(lambda: _Subscriber(self), *where)
+        if os.path.exists(where):
+            os.unlink(where)  # left by a process that did not close its feed
+        return await self.loop.create_unix_server(lambda: _Subscriber(self), where)
+
+    def publish(self, kind, region=None, value=0, text=None, shoe=None, ts=None):
+        """Queue one event for every subscriber; takes EventLog.log's arguments and never blocks."""
+        if self.closed:
+            return
+        frame = encode_event(kind, region, value, text, shoe, ts)
+        self.loop.call_soon_threadsafe(self._fanout, frame, shoe is not None, time.perf_counter())
+
+    def _fanout(self, frame, counted, queued):
+        if counted:
+            self.last_count = frame
+        for subscriber in list(self.subscribers):
+            subscriber.transport.write(frame)
+        self.metrics.observe("feed_fanout", time.perf_counter() - queued)
+
+    def close(self):
+        if self.closed or self.pid != os.getpid():
+            return
+        self.closed = True
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=2.0)
+
+
+class NullFeed:
+    """No feed configured: every call is a no-op."""
+
+    enabled = False
+
+    def publish(self, kind, region=None, value=0, text=None, shoe=None, ts=None):
+        pass
+
+    def close(self):
+        pass
+
+
+_feed = None
+
+
+def get_feed():
+    """Return the process-wide count feed; ``BJ_FEED`` is the address to serve it on."""
+    global _feed
+    # A forked worker does not inherit the parent's loop thread
+    if _feed is None or (_feed.enabled and _feed.pid != os.getpid()):
+        address = os.environ.get("BJ_FEED")
+        if address:
+            _feed = CountFeed(address)
+            atexit.register(_feed.close)
+            print(f"📡 Count feed on {address}")
+        else:
+            _feed = NullFeed()
+    return _feed
+
+
+# === SUBSCRIBER ===
+async def subscribe(address):
+    """Yield the events of the feed at ``address`` until the publisher goes away."""
+    kind, where = parse_address(address)
+    if kind == "tcp":
+        reader, writer = await asyncio.open_connection(*where)
+    else:
+        reader, writer = await asyncio.open_unix_connection(where)
+    try:
+        while True:
+            try:
+                (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+                payload = await reader.readexactly(length)
+            except asyncio.IncompleteReadError:
+                return
+            yield decode_event(payload)
+    finally:
+        writer.close()
+
+
+def format_event(event):
+    region = f" {event['region']}" if event["region"] else ""
+    text = f" {event['text']}" if event["text"] else ""
+    count = ""
+    if event["running_count"] is not None:
+        count = (f" → Count: {event['running_count']} | TC: {event['true_count']} "
+                 f"| Seen: {event['cards_seen']}")
+    return f"📡 {event['kind']}{region}: {event['value']}{text}{count}"
+
+
+async def print_feed(address, as_json=False):
+    async for event in subscribe(address):
+        print(json.dumps(event) if as_json else format_event(event), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the live count feed of a running counter.")
+    parser.add_argument("address", nargs="?", default=os.environ.get("BJ_FEED"),
+                        help="unix:PATH or tcp:[HOST:]PORT (default: BJ_FEED)")
+    parser.add_argument("--json", action="store_true", help="one JSON object per event")
+    args = parser.parse_args()
+    if not args.address:
+        parser.error("no feed address (pass one or set BJ_FEED)")
+
+    try:
+        asyncio.run(print_feed(args.address, args.json))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"❌ Cannot subscribe to {args.address}: {e}")
+
+
+if __name__ == "__main__":
+    main()
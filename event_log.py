@@ -0,0 +1,280 @@
+"""Append-only columnar log of what the counters saw.
+
+Each process writes one session directory under the log root, created on
+its first flush (a forked worker starts its own rather than sharing the
+parent's files):
+
+    <root>/<YYYYmmdd-HHMMSS>-<pid>/
+        meta.json         program, pid, start time
+        ts.f8 kind.u1 …   one raw little-endian file per column (COLUMNS)
+        strings.jsonl     interned region names / hands / raw OCR text
+
+Rows are buffered in preallocated column arrays and appended to the column
+files every FLUSH_ROWS rows or FLUSH_SECONDS, so ``log`` costs a few
+array stores in the hot loop. Strings are interned per session and stored
+as an index (-1 for none). A crash can only lose the unflushed tail; the
+loader trims columns to their common length.
+
+``load_events`` memory-maps the column files of many sessions and builds
+one DataFrame, remapping string indices through a shared table so region
+and text come back as categoricals without touching every row in Python.
+
+    python event_log.py logs/            # per-session event counts
+"""
+import argparse
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+EVENT_KINDS = ("card", "hand", "count", "correction", "bj_total", "misread", "recovery", "adjustment")
+KIND_CODES = {kind: i for i, kind in enumerate(EVENT_KINDS)}
+
+# Column name -> on-disk dtype
+COLUMNS = {
+    "ts": "<f8",
+    "kind": "u1",
+    "region": "<i4",
+    "value": "<i4",
+    "running_count": "<i4",
+    "true_count": "<f4",
+    "cards_seen": "<i4",
+    "text": "<i4",
+}
+FLUSH_ROWS = 1024
+FLUSH_SECONDS = 5.0
+
+
+class EventLog:
+    """Buffered writer for one session directory per process."""
+
+    enabled = True
+
+    def __init__(self, root, program=None):
+        self.root = root
+        self.program = program or os.path.basename(sys.argv[0])
+        self.buffers = {name: np.zeros(FLUSH_ROWS, dtype) for name, dtype in COLUMNS.items()}
+        self.lock = threading.Lock()
+        self._start()
+
+    def _start(self):
+        self.pid = os.getpid()
+        self.path = None
+        self.files = None
+        self.strings_file = None
+        self.strings = {}
+        self.new_strings = []
+        self.rows = 0
+        self.written = 0
+        self.last_flush = time.monotonic()
+
+    def _open(self):
+        self.path = os.path.join(self.root, f"{time.strftime('%Y%m%d-%H%M%S')}-{self.pid}")
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump({"program": self.program, "pid": self.pid, "started": time.time()}, f)
+        self.files = {name: open(os.path.join(self.path, f"{name}.{dtype[-2:]}"), "ab")
+                      for name, dtype in COLUMNS.items()}
+        self.strings_file = open(os.path.join(self.path, "strings.jsonl"), "a")
+
+    def intern(self, text):
+        if text is None:
+            return -1
+        index = self.strings.get(text)
+        if index is None:
+            index = self.strings[text] = len(self.strings)
+            self.new_strings.append(text)
+        return index
+
+    def log(self, kind, region=None, value=0, text=None, shoe=None, ts=None):
+        """Record one event; ``shoe`` (a ShoeState) stamps the count it left behind."""
+        with self.lock:
+            if self.pid != os.getpid():
+                self._start()  # forked: the parent's rows and files are not ours
+            i = self.rows
+            b = self.buffers
+            b["ts"][i] = time.time() if ts is None else ts
+            b["kind"][i] = KIND_CODES[kind]
+            b["region"][i] = self.intern(region)
+            b["value"][i] = value
+            b["text"][i] = self.intern(text)
+            if shoe is not None:
+                b["running_count"][i] = shoe.running_count
+                b["true_count"][i] = shoe.true_count()
+                b["cards_seen"][i] = shoe.cards_seen
+            else:
+                b["running_count"][i] = b["cards_seen"][i] = -1
+                b["true_count"][i] = np.nan
+            self.rows = i + 1
+            if self.rows == FLUSH_ROWS or time.monotonic() - self.last_flush >= FLUSH_SECONDS:
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if not self.rows and not self.new_strings:
+            return
+        if self.files is None:
+            self._open()
+        # Strings first, so every index on disk resolves
+        for text in self.new_strings:
+            self.strings_file.write(json.dumps(text) + "\n")
+        self.strings_file.flush()
+        self.new_strings.clear()
+        for name, f in self.files.items():
+            f.write(self.buffers[name][:self.rows].tobytes())
+            f.flush()
+        self.written += self.rows
+        self.rows = 0
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            if self.pid != os.getpid():
+                return
+            self._flush()
+            if self.files is None:
+                return
+            for f in self.files.values():
+                f.close()
+            self.strings_file.close()
+            self._start()  # anything logged later goes to a new session
+
+
+class NullEventLog:
+    """Event logging turned off: every call is a no-op."""
+
+    enabled = False
+
+    def log(self, kind, region=None, value=0, text=None, shoe=None, ts=None):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+_event_log = None
+
+
+def get_event_log():
+    """Return the process-wide event log; ``BJ_EVENT_LOG`` names the log root."""
+    global _event_log
+    if _event_log is None:
+        root = os.environ.get("BJ_EVENT_LOG")
+        if root:
+            _event_log = EventLog(root)
+            atexit.register(_event_log.close)
+        else:
+            _event_log = NullEventLog()
+    return _event_log
+
+
+# === LOADING ===
+def _map_column(path, name, dtype):
+    file = os.path.join(path, f"{name}.{dtype[-2:]}")
+    if not os.path.exists(file) or os.path.getsize(file) < np.dtype(dtype).itemsize:
+        return np.zeros(0, dtype)
+    return np.memmap(file, dtype=dtype, mode="r")
+
+
+def read_session(path):
+    """Memory-map one session: (column arrays trimmed to a common length, strings, meta)."""
+    columns = {name: _map_column(path, name, dtype) for name, dtype in COLUMNS.items()}
+    rows = min(len(col) for col in columns.values())
+    columns = {name: col[:rows] for name, col in columns.items()}
+    strings = []
+    strings_path = os.path.join(path, "strings.jsonl")
+    if os.path.exists(strings_path):
+        with open(strings_path) as f:
+            strings = [json.loads(line) for line in f if line.endswith("\n")]
+    meta = {}
+    meta_path = os.path.join(path, "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+    return columns, strings, meta
+
+
+def list_sessions(root, since=None):
+    """Session directories under ``root``, oldest first; ``since`` is a YYYYmmdd prefix bound."""
+    names = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+    if since:
+        names = [d for d in names if d >= since]
+    return [os.path.join(root, d) for d in names]
+
+
+def load_events(root, since=None):
+    """Load every session under ``root`` into one DataFrame.
+
+    Columns: session, time, kind, region, value, running_count, true_count,
+    cards_seen, text, and ``shoe`` (shoe number within the session, bumped
+    whenever cards_seen drops). Numeric columns come straight from the
+    memory-mapped files; strings are categoricals over one shared table.
+    """
+    import pandas as pd
+
+    sessions = list_sessions(root, since) if os.path.isdir(root) else []
+    table = {}
+    parts = {name: [] for name in COLUMNS}
+    session_codes, shoe_parts = [], []
+    for s, path in enumerate(sessions):
+        columns, strings, _ = read_session(path)
+        remap = np.array([table.setdefault(text, len(table)) for text in strings] + [-1], dtype=np.int32)
+        for name, col in columns.items():
+            if name in ("region", "text"):
+                # -1 picks remap's trailing -1, so "none" stays -1
+                col = remap[col]
+            parts[name].append(col)
+        session_codes.append(np.full(len(columns["ts"]), s, dtype=np.int32))
+        seen = np.asarray(columns["cards_seen"])
+        known = seen >= 0
+        drops = np.diff(seen[known], prepend=seen[known][:1]) < 0
+        shoe = np.zeros(len(seen), dtype=np.int32)
+        shoe[known] = np.cumsum(drops)
+        # Rows without a count carry the previous shoe number forward
+        shoe_parts.append(np.maximum.accumulate(shoe) if len(shoe) else shoe)
+
+    data = {name: np.concatenate(parts[name]) if parts[name] else np.zeros(0, dtype)
+            for name, dtype in COLUMNS.items()}
+    categories = list(table)
+    session_names = [os.path.basename(p) for p in sessions]
+    return pd.DataFrame({
+        "session": pd.Categorical.from_codes(
+            np.concatenate(session_codes) if session_codes else [], session_names),
+        "time": pd.to_datetime(data["ts"], unit="s"),
+        "kind": pd.Categorical.from_codes(data["kind"], EVENT_KINDS),
+        "region": pd.Categorical.from_codes(data["region"], categories),
+        "value": data["value"],
+        "running_count": data["running_count"],
+        "true_count": data["true_count"],
+        "cards_seen": data["cards_seen"],
+        "shoe": np.concatenate(shoe_parts) if shoe_parts else np.zeros(0, np.int32),
+        "text": pd.Categorical.from_codes(data["text"], categories),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize counter event logs.")
+    parser.add_argument("root", help="log root (BJ_EVENT_LOG)")
+    parser.add_argument("--since", help="only sessions at or after this YYYYmmdd[-HHMMSS] prefix")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    events = load_events(args.root, args.since)
+    print(f"📂 {len(events)} events from {events['session'].nunique()} sessions "
+          f"in {time.perf_counter() - start:.2f}s")
+    if len(events):
+        print(events.groupby(["session", "kind"], observed=True).size().unstack(fill_value=0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from screen_capture import ReplayFinished
+
+# Header fields (int64) at the start of the ring
+HEIGHT, WIDTH, LEFT, TOP, SLOTS, LATEST, CLOSED = range(7)
+HEADER_FIELDS = 8
+
+
+class SharedFrameRing:
+    """Fixed-size ring of grayscale frames in shared memory.
+
+    One writer (the capture process) publishes frames; any number of
+    readers in other processes attach by name and copy out the part of the
+    newest frame they need. Each slot carries the sequence number of the
+    frame in it, set to -1 while it is being written, so a reader that
+    raced the writer simply retries.
+
+    Layout: int64 header, float64 clock offset, int64 seq per slot,
+    float64 timestamp per slot, then ``slots`` frames of (height, width).
+    """
+
+    def __init__(self, name=None, shape=None, origin=(0, 0), slots=4):
+        if shape is not None:
+            height, width = shape
+            size = self._size(height, width, slots)
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.name = self.shm.name
+
+        buf = self.shm.buf
+        self.header = np.ndarray((HEADER_FIELDS,), np.int64, buf, 0)
+        if self.owner:
+            self.header[:] = 0
+            self.header[[HEIGHT, WIDTH, LEFT, TOP, SLOTS]] = (height, width, origin[0], origin[1], slots)
+        height, width, slots = (int(v) for v in self.header[[HEIGHT, WIDTH, SLOTS]])
+        self.shape = (height, width)
+        self.origin = (int(self.header[LEFT]), int(self.header[TOP]))
+        self.slots = slots
+
+        offset = HEADER_FIELDS * 8
+        # Source clock minus wall clock at the last publish (0 for live capture)
+        self.clock_offset = np.ndarray((1,), np.float64, buf, offset)
+        offset += 8
+        self.slot_seq = np.ndarray((slots,), np.int64, buf, offset)
+        offset += slots * 8
+        self.slot_time = np.ndarray((slots,), np.float64, buf, offset)
+        offset += slots * 8
+        self.frames = np.ndarray((slots, height, width), np.uint8, buf, offset)
+
+    @staticmethod
+    def _size(height, width, slots):
+        return HEADER_FIELDS * 8 + 8 + slots * 16 + slots * height * width
+
+    # === WRITER ===
+    def publish(self, timestamp, gray):
+        seq = int(self.header[LATEST]) + 1
+        slot = seq % self.slots
+        self.slot_seq[slot] = -1
+        h, w = gray.shape[:2]
+        self.frames[slot, :h, :w] = gray
+        self.slot_time[slot] = timestamp
+        self.clock_offset[0] = timestamp - time.time()
+        self.slot_seq[slot] = seq
+        self.header[LATEST] = seq
+        return seq
+
+    def mark_closed(self):
+        self.header[CLOSED] = 1
+
+    # === READERS ===
+    @property
+    def latest(self):
+        return int(self.header[LATEST])
+
+    @property
+    def closed(self):
+        return bool(self.header[CLOSED])
+
+    def read(self, bbox, after=0):
+        """Copy ``bbox`` (screen coords) out of the newest frame with seq > ``after``.
+
+        Returns (seq, timestamp, gray), or None if no such frame exists yet.
+        """
+        left, top = bbox[0] - self.origin[0], bbox[1] - self.origin[1]
+        right, bottom = bbox[2] - self.origin[0], bbox[3] - self.origin[1]
+        while True:
+            seq = self.latest
+            if seq <= after:
+                return None
+            slot = seq % self.slots
+            if self.slot_seq[slot] != seq:
+                continue  # overwritten since we read LATEST
+            timestamp = float(self.slot_time[slot])
+            gray = self.frames[slot, top:bottom, left:right].copy()
+            if self.slot_seq[slot] == seq:
+                return seq, timestamp, gray
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class RingFrameSource:
+    """Frame source backed by a SharedFrameRing written by another process.
+
+    ``grab`` waits for a frame newer than the last one returned, so a
+    tracker never processes the same capture twice; it raises
+    ReplayFinished once the writer has closed the ring and every frame
+    has been seen.
+    """
+
+    def __init__(self, name, poll=0.002):
+        self.ring = SharedFrameRing(name)
+        self.poll = poll
+        self.seq = 0
+
+    def grab(self, bbox):
+        while True:
+            item = self.ring.read(bbox, after=self.seq)
+            if item is not None:
+                self.seq, timestamp, gray = item
+                return timestamp, gray
+            if self.ring.closed:
+                raise ReplayFinished(self.ring.name)
+            time.sleep(self.poll)
+
+    def screen_box(self):
+        (left, top), (height, width) = self.ring.origin, self.ring.shape
+        return (left, top, left + width, top + height)
+
+    def now(self):
+        return time.time() + float(self.ring.clock_offset[0])
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def close(self):
+        self.ring.close()
@@ -0,0 +1,197 @@
+import os
+import threading
+
+import numpy as np
+
+from template_matcher import GLYPH_SIZE, Match, load_templates, normalize_glyph, split_glyphs
+
+DIM = GLYPH_SIZE[0] * GLYPH_SIZE[1]
+
+
+class GlyphClassifier:
+    """Nearest-neighbour glyph classifier that learns from confirmed reads.
+
+    Every label owns ``per_label`` slots of normalized glyph vectors in one
+    slot-major (per_label, labels, DIM) array, so a batch of ROIs is scored
+    against the filled slots of every label with a single matrix product
+    over a contiguous view. The first slots hold the PNG
+    templates and are never replaced; the rest fill up with ``harvest``ed
+    ROIs and are recycled round-robin once full. Near-duplicates of an
+    existing sample, and glyphs that look like another label's sample, are
+    not harvested.
+
+    A read counts as ``confident`` when its best cosine similarity is at
+    least MIN_SCORE and beats every other label by MIN_MARGIN; anything
+    else is left to OCR.
+    """
+
+    MIN_SCORE = 0.9
+    MIN_MARGIN = 0.08
+    DUPLICATE = 0.98
+
+    def __init__(self, templates=(), per_label=32, path=None):
+        self.per_label = per_label
+        self.path = path
+        self.labels = []
+        self.samples = np.zeros((per_label, 0, DIM), np.float32)
+        self.filled = np.zeros(0, np.intp)
+        self.pinned = np.zeros(0, np.intp)
+        self.next_slot = np.zeros(0, np.intp)
+        self.harvested = 0
+        self.lock = threading.Lock()
+        for label, img in templates:
+            vec = normalize_glyph(img)
+            if vec is not None:
+                self._store(label, vec, pin=True)
+        self._load_harvested()
+
+    def _load_harvested(self):
+        if self.path and os.path.exists(self.path):
+            data = np.load(self.path)
+            for label, vec in zip(data["labels"], data["vectors"]):
+                self._store(str(label), vec)
+
+    @classmethod
+    def from_dir(cls, directory, path=None, per_label=32):
+        """Bootstrap from the PNG templates in ``directory`` plus samples saved at ``path``."""
+        return cls(load_templates(directory), per_label, path)
+
+    @classmethod
+    def from_vectors(cls, labels, vectors, path=None, per_label=32):
+        """Bootstrap from pre-normalized template vectors (a template bundle bank)."""
+        classifier = cls(per_label=per_label)
+        for label, vec in zip(labels, vectors):
+            classifier._store(label, vec, pin=True)
+        classifier.path = path
+        classifier._load_harvested()
+        return classifier
+
+    def __len__(self):
+        return int(self.filled.sum())
+
+    def _label_index(self, label):
+        if label in self.labels:
+            return self.labels.index(label)
+        self.labels.append(label)
+        self.samples = np.concatenate([self.samples, np.zeros((self.per_label, 1, DIM), np.float32)], axis=1)
+        self.filled = np.append(self.filled, 0)
+        self.pinned = np.append(self.pinned, 0)
+        self.next_slot = np.append(self.next_slot, 0)
+        return len(self.labels) - 1
+
+    def _store(self, label, vec, pin=False):
+        j = self._label_index(label)
+        if self.filled[j] < self.per_label:
+            slot = self.filled[j]
+            self.filled[j] += 1
+            if pin:
+                self.pinned[j] += 1
+        elif self.pinned[j] < self.per_label:
+            # Full: recycle the oldest harvested slot
+            free = self.per_label - self.pinned[j]
+            slot = self.pinned[j] + self.next_slot[j] % free
+            self.next_slot[j] += 1
+        else:
+            return False
+        self.samples[slot, j] = vec
+        return True
+
+    # === CLASSIFY ===
+    def _scores(self, vectors):
+        """(n, labels) best similarity per label; empty slots are zero vectors."""
+        depth = int(self.filled.max())
+        flat = self.samples[:depth].reshape(-1, DIM)
+        return (vectors @ flat.T).reshape(len(vectors), depth, len(self.labels)).max(axis=1)
+
+    def classify_many(self, rois):
+        """One Match (or None for a blank ROI / empty model) per ROI."""
+        vectors = [normalize_glyph(r) for r in rois]
+        valid = [i for i, v in enumerate(vectors) if v is not None]
+        results = [None] * len(rois)
+        with self.lock:
+            if not valid or not len(self.labels):
+                return results
+            scores = self._scores(np.stack([vectors[i] for i in valid]))
+            labels = list(self.labels)
+        for i, row in zip(valid, scores):
+            best = int(row.argmax())
+            runner_up = float(np.delete(row, best).max()) if len(row) > 1 else -1.0
+            results[i] = Match(labels[best], float(row[best]), float(row[best]) - runner_up)
+        return results
+
+    def classify(self, roi):
+        return self.classify_many([roi])[0]
+
+    def confident(self, match):
+        return match is not None and match.score >= self.MIN_SCORE and match.margin >= self.MIN_MARGIN
+
+    def read_digits(self, roi):
+        """Read a multi-digit ROI; the Match carries the weakest glyph's score and margin."""
+        matches = self.classify_many(split_glyphs(roi))
+        if not matches or any(m is None for m in matches):
+            return None
+        return Match("".join(m.label for m in matches),
+                     min(m.score for m in matches), min(m.margin for m in matches))
+
+    # === HARVEST ===
+    def harvest(self, roi, label):
+        """Learn ``roi`` as ``label`` (a read that passed confirmation). Returns True if stored."""
+        vec = normalize_glyph(roi)
+        if vec is None:
+            return False
+        return self._learn(vec, label)
+
+    def _learn(self, vec, label):
+        with self.lock:
+            if self.labels:
+                scores = self._scores(vec[None])[0]
+                j = self.labels.index(label) if label in self.labels else None
+                if j is not None and scores[j] >= self.DUPLICATE:
+                    return False
+                # A confirmed read that matches another label's sample this
+                # closely is more likely a misread than a new font
+                others = scores if j is None else np.delete(scores, j)
+                if others.max(initial=-1.0) >= self.DUPLICATE:
+                    return False
+            stored = self._store(label, vec)
+            self.harvested += stored
+            return stored
+
+    def harvest_digits(self, roi, text):
+        glyphs = split_glyphs(roi)
+        if len(glyphs) != len(text):
+            return 0
+        return sum(self.harvest(glyph, digit) for glyph, digit in zip(glyphs, text))
+
+    def harvested_samples(self):
+        """(labels, vectors) of the harvested (non-template) samples, as ``save`` writes them."""
+        with self.lock:
+            labels, vectors = [], []
+            for j, label in enumerate(self.labels):
+                rows = self.samples[self.pinned[j]:self.filled[j], j]
+                labels += [label] * len(rows)
+                vectors.append(rows.copy())
+        vectors = np.concatenate(vectors) if vectors else np.zeros((0, DIM), np.float32)
+        return np.array(labels, dtype=str), vectors
+
+    def merge(self, labels, vectors):
+        """Learn another classifier's ``harvested_samples``, skipping ones already known. Returns how many."""
+        return sum(self._learn(vec, str(label)) for label, vec in zip(labels, vectors))
+
+    def save(self, path=None):
+        """Write the harvested (non-template) samples to ``path`` (default: the one loaded).
+
+        Processes sharing a path must not each save: the last write wins. Have
+        one gather the others' ``harvested_samples``, ``merge`` them and save.
+        """
+        path = path or self.path
+        if not path or not self.harvested:
+            return
+        labels, vectors = self.harvested_samples()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez_compressed(tmp, labels=labels, vectors=vectors)
+        os.replace(tmp, path)
+
+    def stats(self):
+        return {"labels": len(self.labels), "samples": len(self), "harvested": self.harvested}
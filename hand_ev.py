@@ -0,0 +1,231 @@
+"""Composition-dependent dealer probabilities and stand/hit/double EVs.
+
+Card values are indexed 0..9 (A, 2..9, ten-valued). A composition is the
+number of cards of each value still in the shoe.
+
+Dealer outcomes are exact for the composition. The dealer's drawing rules
+are enumerated once per up-card into every multiset of drawn cards that
+ends a dealer hand, together with how many draw orders reach it. The
+probability of a multiset under a composition is then a product of
+falling factorials, so a new composition costs a single vectorized pass
+over at most ~2000 rows per up-card. Removing one card from the shoe only
+changes one row of the factorial table (``remove`` / ``add`` / ``sync``).
+
+Player EVs recurse over the player's own draws, memoized on the drawn
+multiset. The first PLAYER_DEPLETION draws are taken out of the shoe
+exactly; past that (a rare, already-small branch) draws come from the
+decision-point composition. The dealer distribution is held at the one
+computed for the decision point.
+"""
+from collections import OrderedDict, defaultdict, namedtuple
+
+import numpy as np
+
+from shoe_state import RANK_CODES
+
+VALUE_LABELS = ("A", "2", "3", "4", "5", "6", "7", "8", "9", "10")
+# shoe_state rank code (A, 2..9, 10, J, Q, K) -> value index
+RANK_TO_VALUE = np.array([0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 9, 9, 9])
+
+# Dealer final outcomes, in array order
+OUTCOMES = ("17", "18", "19", "20", "21", "bust", "blackjack")
+BUST, BLACKJACK = 5, 6
+MAX_DRAWS = 12
+# Player draws taken out of the shoe exactly; deeper draws use the decision-point composition
+PLAYER_DEPLETION = 3
+
+Advice = namedtuple("Advice", ["stand", "hit", "double", "best", "dealer"])
+
+
+def value_index(card):
+    """Value index (0..9) of a card label such as 'A', '7', '10', 'K'."""
+    return int(RANK_TO_VALUE[RANK_CODES[card.upper()]])
+
+
+def composition_from_ranks(remaining):
+    """Collapse 13 per-rank counts (ShoeState.remaining) to 10 value counts."""
+    counts = np.zeros(10, dtype=np.int64)
+    np.add.at(counts, RANK_TO_VALUE, np.asarray(remaining, dtype=np.int64))
+    return counts
+
+
+def enumerate_dealer(upcard, dealer_hits_soft_17=False):
+    """Every multiset of dealer draws that ends the hand, with its order count and outcome."""
+    rows = defaultdict(int)
+
+    def draw(hard, ace, counts, n):
+        best = hard + 10 if ace and hard + 10 <= 21 else hard
+        if hard > 21:
+            rows[(counts, BUST)] += 1
+            return
+        soft_17 = dealer_hits_soft_17 and best == 17 and ace and hard + 10 == 17
+        if best >= 17 and not soft_17:
+            rows[(counts, BLACKJACK if n == 1 and best == 21 else best - 17)] += 1
+            return
+        for v in range(10):
+            nxt = list(counts)
+            nxt[v] += 1
+            draw(hard + v + 1, ace or v == 0, tuple(nxt), n + 1)
+
+    draw(upcard + 1, upcard == 0, (0,) * 10, 0)
+    keys = list(rows)
+    counts = np.array([k[0] for k in keys], dtype=np.intp)
+    outcome = np.array([k[1] for k in keys], dtype=np.intp)
+    orders = np.array([rows[k] for k in keys], dtype=np.float64)
+    return counts, outcome, orders
+
+
+class HandEvEngine:
+    """Dealer outcome probabilities and hand EVs for the live shoe.
+
+    Results are cached per (composition, up-card) in an LRU of
+    ``cache_size`` entries, keyed on the composition's raw bytes.
+    ``peek``: the dealer checks for blackjack under an ace or ten, so
+    probabilities are conditioned on the dealer not having one.
+    """
+
+    def __init__(self, decks=6, dealer_hits_soft_17=False, peek=True, cache_size=512):
+        self.dealer_hits_soft_17 = dealer_hits_soft_17
+        self.peek = peek
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.advice = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.tables = [enumerate_dealer(up, dealer_hits_soft_17) for up in range(10)]
+        self.counts = np.zeros(10, dtype=np.int64)
+        self.falling = np.zeros((10, MAX_DRAWS + 1), dtype=np.float64)
+        self.set_composition(np.array([4] * 9 + [16]) * decks)
+
+    # === COMPOSITION ===
+    def _refresh_row(self, v):
+        n = self.counts[v]
+        self.falling[v] = np.concatenate(([1.0], np.cumprod(np.maximum(n - np.arange(MAX_DRAWS), 0))))
+
+    def set_composition(self, counts):
+        self.counts = np.array(counts, dtype=np.int64)
+        for v in range(10):
+            self._refresh_row(v)
+
+    def remove(self, card, n=1):
+        """A card left the shoe: only its value's factorial row is recomputed."""
+        v = value_index(card)
+        self.counts[v] -= n
+        self._refresh_row(v)
+
+    def add(self, card, n=1):
+        self.remove(card, -n)
+
+    def sync(self, shoe):
+        """Follow a ShoeState, touching only the values whose count moved."""
+        counts = composition_from_ranks(shoe.remaining)
+        for v in np.nonzero(counts != self.counts)[0]:
+            self.counts[v] = counts[v]
+            self._refresh_row(v)
+
+    # === DEALER ===
+    def dealer_probabilities(self, upcard):
+        """Probabilities of OUTCOMES for the dealer showing ``upcard`` (label or index)."""
+        up = value_index(upcard) if isinstance(upcard, str) else upcard
+        key = (self.counts.tobytes(), up)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return cached
+        self.misses += 1
+
+        counts, outcome, orders = self.tables[up]
+        total = int(self.counts.sum())
+        drawn = counts.sum(axis=1)
+        shoe_falling = np.concatenate(([1.0], np.cumprod(np.maximum(total - np.arange(MAX_DRAWS), 0))))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            p = orders * self.falling[np.arange(10), counts].prod(axis=1) / shoe_falling[drawn]
+        p = np.nan_to_num(p)
+        probs = np.bincount(outcome, weights=p, minlength=len(OUTCOMES))
+        if self.peek and probs[BLACKJACK] < 1:
+            probs[BLACKJACK] = 0.0
+            probs /= probs.sum()
+
+        self._store(self.cache, key, probs)
+        return probs
+
+    def _store(self, cache, key, value):
+        cache[key] = value
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    # === PLAYER ===
+    def evaluate(self, player_cards, upcard):
+        """Stand / hit / double EVs (per unit bet) for a player hand vs ``upcard``.
+
+        Cards must already be out of the engine's composition (as they are
+        once the counter has dealt them into its ShoeState).
+        """
+        values = [value_index(c) for c in player_cards]
+        up = value_index(upcard) if isinstance(upcard, str) else upcard
+        key = (self.counts.tobytes(), up, tuple(sorted(values)))
+        cached = self.advice.get(key)
+        if cached is not None:
+            self.advice.move_to_end(key)
+            self.hits += 1
+            return cached
+
+        dealer = self.dealer_probabilities(up)
+        # EV of standing on each total: win vs lower/bust, lose vs higher/blackjack
+        finals = np.arange(17, 22)
+        stand_ev = [-1.0] * 32
+        for t in range(4, 22):
+            stand_ev[t] = float(dealer[BUST] + dealer[:5][finals < t].sum()
+                                - dealer[:5][finals > t].sum() - dealer[BLACKJACK])
+
+        hard = sum(v + 1 for v in values)
+        ace = 0 in values
+        counts = self.counts.tolist()
+        total = sum(counts)
+        memo = {}
+
+        def best_total(h, a):
+            return h + 10 if a and h + 10 <= 21 else h
+
+        def draw_probs(drawn):
+            left = total - sum(drawn)
+            if left <= 0:
+                return []
+            return [(v, (counts[v] - drawn[v]) / left) for v in range(10) if counts[v] > drawn[v]]
+
+        def hit(h, a, drawn):
+            depleted = sum(drawn) < PLAYER_DEPLETION
+            key = (h, a, drawn if depleted else None)
+            if key in memo:
+                return memo[key]
+            ev = 0.0
+            for v, p in draw_probs(drawn if depleted else base):
+                nh, na = h + v + 1, a or v == 0
+                if nh > 21:
+                    ev -= p
+                    continue
+                nxt = drawn[:v] + (drawn[v] + 1,) + drawn[v + 1:] if depleted else drawn
+                ev += p * max(stand_ev[best_total(nh, na)], hit(nh, na, nxt))
+            memo[key] = ev
+            return ev
+
+        base = (0,) * 10
+        stand = stand_ev[best_total(hard, ace)] if hard <= 21 else -1.0
+        hit_ev = hit(hard, ace, base) if hard <= 21 else -1.0
+        double = None
+        if len(values) == 2:
+            double = 2 * sum(
+                p * (-1.0 if hard + v + 1 > 21 else stand_ev[best_total(hard + v + 1, ace or v == 0)])
+                for v, p in draw_probs(base))
+
+        options = {"stand": stand, "hit": hit_ev, "double": double}
+        best = max((k for k in options if options[k] is not None), key=options.get)
+        result = Advice(stand, hit_ev, double, best, dict(zip(OUTCOMES, dealer.tolist())))
+        self._store(self.advice, key, result)
+        return result
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"entries": len(self.cache) + len(self.advice), "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0}
@@ -0,0 +1,210 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+# Histogram bucket upper bounds in microseconds: 16 µs … ~16 s, doubling
+BUCKET_BOUNDS_US = [2 ** i for i in range(4, 25)]
+
+
+class Histogram:
+    """Fixed log2-bucket latency histogram; O(log buckets) per observation."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_US) + 1)
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        us = seconds * 1e6
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_US, us)] += 1
+        self.n += 1
+        self.total += us
+        if us > self.max:
+            self.max = us
+
+    def percentile(self, q):
+        """Upper bound (µs) of the bucket holding the q-th percentile."""
+        if not self.n:
+            return 0
+        rank = q / 100.0 * self.n
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return BUCKET_BOUNDS_US[i] if i < len(BUCKET_BOUNDS_US) else round(self.max)
+        return round(self.max)
+
+    def snapshot(self):
+        return {
+            "count": self.n,
+            "mean_us": round(self.total / self.n, 1) if self.n else 0,
+            "p50_us": self.percentile(50),
+            "p90_us": self.percentile(90),
+            "p99_us": self.percentile(99),
+            "max_us": round(self.max, 1),
+        }
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """Per-stage latency histograms, event counters and tick jitter.
+
+    Updates are in-memory increments, under ``lock``, from whichever stage
+    thread records them; a daemon thread periodically appends a JSON
+    snapshot (taken under the same lock) to ``path`` and/or serves the
+    latest one over HTTP on ``http_port``.
+    """
+
+    enabled = True
+
+    def __init__(self, path=None, http_port=None, interval=10.0):
+        self.path = path
+        self.interval = interval
+        self.histograms = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.last_tick = None
+        self.stop_event = threading.Event()
+        self.server = None
+
+        if path:
+            threading.Thread(target=self._dump_loop, name="metrics-dump", daemon=True).start()
+        if http_port:
+            self._serve(http_port)
+
+    def histogram(self, stage):
+        """The histogram of ``stage``; call with ``lock`` held."""
+        hist = self.histograms.get(stage)
+        if hist is None:
+            hist = self.histograms[stage] = Histogram()
+        return hist
+
+    def timer(self, stage):
+        """Context manager timing one call of ``stage``."""
+        return _Timer(self, stage)
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            self.histogram(stage).observe(seconds)
+
+    def incr(self, counter, n=1):
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def tick(self, now, expected_interval):
+        """Record one capture tick; jitter is how late it came versus plan."""
+        if self.last_tick is not None:
+            self.observe("tick_jitter", abs(now - self.last_tick - expected_interval))
+        self.last_tick = now
+
+    def snapshot(self):
+        with self.lock:
+            stages = {name: h.snapshot() for name, h in self.histograms.items()}
+            counters = dict(self.counters)
+        return {
+            "time": round(time.time(), 3),
+            "uptime_s": round(time.time() - self.started, 1),
+            "stages": stages,
+            "counters": counters,
+        }
+
+    def dump(self):
+        if not self.path:
+            return
+        with open(self.path, "a") as f:
+            f.write(json.dumps(self.snapshot()) + "\n")
+
+    def _dump_loop(self):
+        while not self.stop_event.wait(self.interval):
+            self.dump()
+
+    def _serve(self, port):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(metrics.snapshot()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+
+    def close(self):
+        self.stop_event.set()
+        self.dump()
+        if self.server is not None:
+            self.server.shutdown()
+
+
+class NullMetrics:
+    """Instrumentation turned off: every call is a no-op."""
+
+    enabled = False
+    _timer = nullcontext()
+
+    def timer(self, stage):
+        return self._timer
+
+    def observe(self, stage, seconds):
+        pass
+
+    def incr(self, counter, n=1):
+        pass
+
+    def tick(self, now, expected_interval):
+        pass
+
+    def snapshot(self):
+        return {}
+
+    def close(self):
+        pass
+
+
+_metrics = None
+
+
+def get_metrics():
+    """Return the process-wide metrics sink.
+
+    ``BJ_METRICS``: JSON-lines file to append a snapshot to every
+    ``BJ_METRICS_INTERVAL`` seconds (default 10). ``BJ_METRICS_HTTP``: local
+    port serving the latest snapshot. With neither set, a no-op sink.
+    """
+    global _metrics
+    if _metrics is None:
+        path = os.environ.get("BJ_METRICS")
+        port = int(os.environ.get("BJ_METRICS_HTTP", "0"))
+        if path or port:
+            _metrics = Metrics(path, port, float(os.environ.get("BJ_METRICS_INTERVAL", "10")))
+        else:
+            _metrics = NullMetrics()
+    return _metrics
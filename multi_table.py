@@ -0,0 +1,210 @@
+"""Run several tables from one screen capture.
+
+The parent process is the only one that touches the screen: every tick it
+grabs the box enclosing all tables' regions once and publishes it to a
+shared-memory frame ring. Each table runs in its own worker process with
+its own region layout, pipeline and ShoeState, reading its regions out of
+the ring. Workers post their counts to a shared board that the parent
+prints as one view. Tables share the harvested glyph files, so workers
+hand their harvested samples back and the parent merges and saves them.
+
+Tables are listed in a JSON file:
+
+    [
+      {"name": "left",  "kind": "card", "offset": [0, 0]},
+      {"name": "right", "kind": "card", "offset": [-1280, 0], "decks": 8},
+      {"name": "lobby", "kind": "auto", "regions": {"Your Hand": [1825, 943, 2033, 995]}}
+    ]
+
+``kind`` is ``card`` (card_2_debug_ocr) or ``auto`` (auto_blackjack_counter).
+``offset`` shifts that module's default regions; ``regions`` replaces them.
+With BJ_FEED set, each table serves its own count feed (count_feed.table_address).
+
+    python multi_table.py tables.json
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from count_feed import get_feed, table_address
+from event_log import get_event_log
+from frame_ring import RingFrameSource, SharedFrameRing
+from screen_capture import RegionCapture, ReplayFinished, open_frame_source, region_bbox, shift_region
+
+KINDS = {"card": "card_2_debug_ocr", "auto": "auto_blackjack_counter"}
+
+# One row per table on the shared board
+BOARD_FIELDS = ("running_count", "true_count", "cards_seen", "decks_remaining", "frames", "lag_s", "updated")
+
+
+# === TABLE CONFIG ===
+def load_tables(path):
+    with open(path) as f:
+        tables = json.load(f)
+    for i, table in enumerate(tables):
+        table.setdefault("name", f"table_{i + 1}")
+        table.setdefault("kind", "card")
+        table.setdefault("decks", 6)
+        if table["kind"] not in KINDS:
+            raise ValueError(f"Unknown table kind {table['kind']!r} (expected one of {sorted(KINDS)})")
+    return tables
+
+
+def table_regions(table):
+    """Screen regions of one table: explicit ``regions`` or the module default shifted by ``offset``."""
+    if "regions" in table:
+        return {label: tuple(r) for label, r in table["regions"].items()}
+    module = __import__(KINDS[table["kind"]])
+    dx, dy = table.get("offset", (0, 0))
+    return {label: shift_region(r, dx, dy) for label, r in module.REGIONS.items()}
+
+
+# === SHARED BOARD ===
+class TableBoard:
+    """(tables x BOARD_FIELDS) float64 array in shared memory; one writer per row."""
+
+    def __init__(self, name=None, tables=None):
+        if tables is not None:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=tables * len(BOARD_FIELDS) * 8)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+            tables = self.shm.size // (len(BOARD_FIELDS) * 8)
+        self.name = self.shm.name
+        self.rows = np.ndarray((tables, len(BOARD_FIELDS)), np.float64, self.shm.buf)
+        if self.owner:
+            self.rows[:] = 0
+
+    def post(self, index, shoe, frames, lag):
+        self.rows[index] = (shoe.running_count, shoe.true_count(), shoe.cards_seen,
+                            shoe.decks_remaining, frames, lag, time.time())
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def print_board(board, tables):
+    print(f"\n{'table':<12}{'RC':>6}{'TC':>8}{'seen':>7}{'decks':>7}{'frames':>8}{'lag s':>7}")
+    for table, row in zip(tables, board.rows):
+        rc, tc, seen, decks, frames, lag, updated = row
+        stale = " ⏳" if not updated or time.time() - updated > 5 else ""
+        print(f"{table['name']:<12}{rc:>+6.0f}{tc:>8.2f}{seen:>7.0f}{decks:>7.2f}"
+              f"{frames:>8.0f}{lag:>7.2f}{stale}")
+
+
+# === TABLE WORKER ===
+def run_table(index, table, ring_name, board_name):
+    """Worker process: run one table's pipeline on frames from the ring.
+
+    Returns the pipeline stats and the table module's harvested glyphs (or None).
+    """
+    if os.environ.get("BJ_FEED"):
+        # Tables cannot share one listening address: each serves its own
+        os.environ["BJ_FEED"] = table_address(os.environ["BJ_FEED"], index, table["name"])
+    module = __import__(KINDS[table["kind"]])
+    # Replace the module's own frame source so every read comes from the ring
+    module.source = RingFrameSource(ring_name)
+
+    board = TableBoard(board_name)
+    capture = RegionCapture(table_regions(table), source=module.source)
+    pipeline, reader, tracker = module.build_pipeline(capture, table["decks"])
+
+    count = pipeline.count
+
+    def count_and_post(frame, result):
+        count(frame, result)
+        board.post(index, tracker.shoe, pipeline.recognized, pipeline.last_lag)
+
+    pipeline.count = count_and_post
+    try:
+        pipeline.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        finish = getattr(tracker, "finish", None)
+        if finish:
+            finish(save=False)  # the parent saves every table's harvest at once
+        board.post(index, tracker.shoe, pipeline.recognized, pipeline.last_lag)
+        # Pool workers skip atexit, so close this table's event log and feed here
+        get_event_log().close()
+        get_feed().close()
+        capture.close()
+        board.close()
+    harvested = getattr(module, "harvested_samples", None)
+    return {"table": table["name"], **pipeline.stats()}, harvested() if harvested else None
+
+
+# === CAPTURE PROCESS ===
+def main():
+    parser = argparse.ArgumentParser(description="Count several tables from one screen capture.")
+    parser.add_argument("tables", help="JSON file listing the tables")
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between screen grabs")
+    parser.add_argument("--slots", type=int, default=4, help="frames kept in the shared ring")
+    parser.add_argument("--board-every", type=float, default=2.0, help="seconds between board prints")
+    args = parser.parse_args()
+
+    # Only this process captures. The table modules open a frame source at
+    # import; a lazy mss one never touches the screen because workers swap
+    # it for the ring.
+    source = open_frame_source()
+    os.environ["BJ_FRAME_SOURCE"] = "mss"
+    os.environ.pop("BJ_RECORD", None)
+
+    tables = load_tables(args.tables)
+    bbox = region_bbox([r for table in tables for r in table_regions(table).values()])
+    width, height = bbox[2] - bbox[0], bbox[3] - bbox[1]
+    print(f"🎴 Multi-table: {len(tables)} tables, one capture of {width}x{height} px")
+
+    # Each table gets its own tracker process; keep OCR pools small unless configured
+    os.environ.setdefault("BJ_OCR_WORKERS", str(max(1, (os.cpu_count() or 1) // (2 * len(tables)))))
+
+    ring = SharedFrameRing(shape=(bbox[3] - bbox[1], bbox[2] - bbox[0]), origin=bbox[:2], slots=args.slots)
+    board = TableBoard(tables=len(tables))
+    pool = ProcessPoolExecutor(max_workers=len(tables))
+    futures = [pool.submit(run_table, i, table, ring.name, board.name) for i, table in enumerate(tables)]
+
+    last_print = time.time()
+    try:
+        while not all(f.done() for f in futures):
+            timestamp, gray = source.grab(bbox)
+            ring.publish(timestamp, gray)
+            if time.time() - last_print >= args.board_every:
+                print_board(board, tables)
+                last_print = time.time()
+            source.sleep(args.interval)
+    except (KeyboardInterrupt, ReplayFinished):
+        pass
+    finally:
+        ring.mark_closed()
+        merged = {}
+        for table, future in zip(tables, futures):
+            try:
+                stats, harvested = future.result()
+            except KeyboardInterrupt:
+                continue
+            except Exception as e:
+                print(f"❌ Table worker failed: {e!r}")
+                continue
+            print(f"📈 {stats}")
+            if harvested:
+                module = merged.setdefault(table["kind"], __import__(KINDS[table["kind"]]))
+                module.merge_harvested(harvested)
+        for module in merged.values():
+            module.save_classifiers()
+        pool.shutdown()
+        print_board(board, tables)
+        board.close()
+        ring.close()
+        source.close()
+
+
+if __name__ == "__main__":
+    main()
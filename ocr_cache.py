@@ -0,0 +1,171 @@
+"""OCR cache: glyph hash → confirmed read, so a glyph seen before skips OCR.
+
+Only reads the recognizers are sure of go in (see confirmation.py): a
+cached misread would otherwise be served, and persisted, as a sure read.
+A read that a later recognition contradicts is evicted.
+
+    python ocr_cache.py cache.json                     # stats per kind
+    python ocr_cache.py cache.json --invalidate card   # drop every card read
+"""
+import argparse
+import atexit
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from metrics import get_metrics
+
+# ROIs are thresholded and averaged over KEY_CELL x KEY_CELL pixel blocks
+# before hashing, so anti-aliasing and single-pixel noise land on the same key.
+KEY_CELL = 3
+
+
+def glyph_key(gray, kind, threshold=160, cell=KEY_CELL):
+    """Return a quantized perceptual hash of a thresholded ROI.
+
+    ``kind`` namespaces the key ("card", "digits", ...) because the same
+    pixels mean different things to different readers.
+    """
+    _, thresh = cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY)
+    height, width = gray.shape[:2]
+    grid = (max(1, width // cell), max(1, height // cell))
+    small = cv2.resize(thresh, grid, interpolation=cv2.INTER_AREA)
+    bits = np.packbits(small > 127)
+    digest = hashlib.blake2b(bits.tobytes(), digest_size=8)
+    digest.update(np.asarray(gray.shape, dtype=np.int32).tobytes())
+    return f"{kind}:{digest.hexdigest()}"
+
+
+class OcrCache:
+    """Bounded LRU map from glyph keys to recognized values, with hit stats."""
+
+    def __init__(self, max_entries=4096, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.metrics = get_metrics()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def key(self, gray, kind):
+        return glyph_key(gray, kind)
+
+    def get(self, key):
+        """Return the cached value, or None on a miss."""
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        self.metrics.incr("cache_hits")
+        return value
+
+    def put(self, key, value):
+        """Cache a confirmed read; a read nobody is sure of must not go in."""
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def evict(self, key):
+        """Forget one glyph, e.g. when a fresh recognition contradicts its read; True if it was cached."""
+        if self.entries.pop(key, None) is None:
+            return False
+        self.evictions += 1
+        self.metrics.incr("cache_evictions")
+        return True
+
+    def invalidate(self, kind=None):
+        """Forget every read of one kind ("card", "digits", "hand"), or all of them; returns how many."""
+        if kind is None:
+            dropped = len(self.entries)
+            self.entries.clear()
+        else:
+            stale = [key for key in self.entries if key.startswith(f"{kind}:")]
+            for key in stale:
+                del self.entries[key]
+            dropped = len(stale)
+        self.evictions += dropped
+        return dropped
+
+    def clear(self):
+        self.invalidate()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def kinds(self):
+        counts = {}
+        for key in self.entries:
+            kind = key.partition(":")[0]
+            counts[kind] = counts.get(kind, 0) + 1
+        return counts
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def save(self, path=None):
+        path = path or self.path
+        if not path:
+            return
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(list(self.entries.items()), f)
+        os.replace(tmp, path)
+
+    def load(self, path):
+        with open(path) as f:
+            for key, value in json.load(f):
+                self.put(key, value)
+
+
+_cache = None
+
+
+def get_cache():
+    """Return the process-wide cache; BJ_OCR_CACHE names a file to start warm from."""
+    global _cache
+    if _cache is None:
+        path = os.environ.get("BJ_OCR_CACHE")
+        _cache = OcrCache(int(os.environ.get("BJ_OCR_CACHE_SIZE", "4096")), path)
+        if path:
+            atexit.register(_cache.save)
+    return _cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or invalidate a persisted OCR cache.")
+    parser.add_argument("path", nargs="?", default=os.environ.get("BJ_OCR_CACHE"),
+                        help="cache file (default: BJ_OCR_CACHE)")
+    parser.add_argument("--invalidate", metavar="KIND", action="append", default=[],
+                        help="drop every read of KIND (card, digits, hand); repeatable")
+    parser.add_argument("--clear", action="store_true", help="drop every read")
+    args = parser.parse_args()
+    if not args.path or not os.path.exists(args.path):
+        parser.error("no cache file (pass one or set BJ_OCR_CACHE)")
+
+    cache = OcrCache(max_entries=1 << 30, path=args.path)
+    dropped = cache.invalidate() if args.clear else sum(cache.invalidate(kind) for kind in args.invalidate)
+    if args.clear or args.invalidate:
+        cache.save()
+        print(f"🗑️ Dropped {dropped} cached reads from {args.path}")
+    print(f"🗃️ OCR cache {args.path}: {len(cache)} reads {cache.kinds()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import atexit
+import importlib.util
+import os
+import re
+import shutil
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from metrics import get_metrics
+
+OcrResult = namedtuple("OcrResult", ["text", "confidences"])
+
+DEFAULT_TESSERACT_CMD = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+
+
+def find_tesseract():
+    """Resolve the tesseract binary when OCR is first needed.
+
+    TESSERACT_CMD wins, then ``tesseract`` on PATH, then the default Windows
+    install; None lets pytesseract use its own default.
+    """
+    for cmd in (os.environ.get("TESSERACT_CMD"), shutil.which("tesseract"), DEFAULT_TESSERACT_CMD):
+        if cmd and os.path.exists(cmd):
+            return cmd
+    return None
+
+
+class OcrError(RuntimeError):
+    """An OCR engine failure, re-raised in a form that pickles back to the caller."""
+
+
+# === WORKER SIDE ===
+# Each worker process loads one OCR engine at startup and keeps it for its
+# whole life. With tesserocr (libtesseract bindings, in requirements.txt)
+# that engine is resident and no process is spawned per call. Without it
+# the worker falls back to pytesseract, which still writes a temp file and
+# starts the tesseract binary on every call; the pool then only saves the
+# caller from waiting on it.
+
+_engine = None
+_tesseract_cmd = None
+
+
+def _parse_psm(config):
+    found = re.search(r"--psm\s+(\d+)", config or "")
+    return int(found.group(1)) if found else 3
+
+
+def _init_worker(tesseract_cmd):
+    global _engine, _tesseract_cmd
+    _tesseract_cmd = tesseract_cmd
+    try:
+        import tesserocr
+        _engine = tesserocr.PyTessBaseAPI()
+    except (ImportError, RuntimeError):
+        _engine = None
+
+
+def _recognize_tesserocr(img, config):
+    import tesserocr
+    _engine.SetPageSegMode(_parse_psm(config))
+    height, width = img.shape
+    _engine.SetImageBytes(img.tobytes(), width, height, 1, width)
+    text = _engine.GetUTF8Text()
+    confidences = []
+    it = _engine.GetIterator()
+    level = tesserocr.RIL.SYMBOL
+    if it is not None:
+        for symbol in tesserocr.iterate_level(it, level):
+            char = symbol.GetUTF8Text(level)
+            if char:
+                confidences.append((char, symbol.Confidence(level)))
+    return OcrResult(text, confidences)
+
+
+def _recognize_pytesseract(img, config):
+    import pytesseract
+    if _tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = _tesseract_cmd
+    data = pytesseract.image_to_data(img, config=config, output_type=pytesseract.Output.DICT)
+    words = []
+    confidences = []
+    for word, conf in zip(data["text"], data["conf"]):
+        word = word.strip()
+        if not word:
+            continue
+        words.append(word)
+        # Only word-level confidence is available here
+        confidences.extend((char, float(conf)) for char in word)
+    return OcrResult(" ".join(words), confidences)
+
+
+def _recognize(img, config):
+    img = np.ascontiguousarray(img, dtype=np.uint8)
+    try:
+        if _engine is not None:
+            return _recognize_tesserocr(img, config)
+        return _recognize_pytesseract(img, config)
+    except Exception as e:
+        # Some engine exceptions cannot be unpickled and would break the pool
+        raise OcrError(f"{type(e).__name__}: {e}") from None
+
+
+# === POOL ===
+
+class OcrPool:
+    """N long-lived OCR workers fed image arrays over pipes.
+
+    Images are pickled as raw bytes straight to a warm worker. With tesserocr
+    installed each worker keeps one resident engine, so there is no temp
+    file and no tesseract start-up per call. The pytesseract fallback still
+    pays both on every call, plus the pipe. Every call returns the text plus
+    a list of (char, confidence) pairs.
+    """
+
+    def __init__(self, workers=None, tesseract_cmd=None):
+        self.workers = workers or os.cpu_count() or 1
+        if importlib.util.find_spec("tesserocr") is None:
+            print("⚠️ tesserocr not installed: every OCR call starts tesseract (pip install tesserocr)")
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(tesseract_cmd,),
+        )
+
+    def submit(self, img, config="--psm 6"):
+        """Queue one ROI and return a Future of its OcrResult."""
+        future = self.executor.submit(_recognize, img, config)
+        metrics = get_metrics()
+        if metrics.enabled:
+            metrics.incr("ocr_calls")
+            start = time.perf_counter()
+            future.add_done_callback(lambda f: metrics.observe("ocr", time.perf_counter() - start))
+        return future
+
+    def recognize(self, img, config="--psm 6"):
+        return self.submit(img, config).result()
+
+    def recognize_many(self, imgs, config="--psm 6"):
+        """Recognize several ROIs in parallel, preserving order."""
+        futures = [self.submit(img, config) for img in imgs]
+        return [f.result() for f in futures]
+
+    def image_to_string(self, img, config="--psm 6"):
+        return self.recognize(img, config).text
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool = None
+
+
+def get_pool():
+    """Return the process-wide pool, starting it on first use."""
+    global _pool
+    if _pool is None:
+        workers = int(os.environ.get("BJ_OCR_WORKERS", "0")) or None
+        _pool = OcrPool(workers, find_tesseract())
+        atexit.register(_pool.shutdown)
+    return _pool
+
+
+def image_to_string(img, config="--psm 6"):
+    """Drop-in replacement for pytesseract.image_to_string backed by the pool."""
+    return get_pool().image_to_string(img, config)
+
+
+def recognize(img, config="--psm 6"):
+    return get_pool().recognize(img, config)
+
+
+def submit(img, config="--psm 6"):
+    return get_pool().submit(img, config)
@@ -0,0 +1,166 @@
+import threading
+from collections import deque, namedtuple
+
+from metrics import get_metrics
+from screen_capture import ReplayFinished
+
+Frame = namedtuple("Frame", ["seq", "timestamp", "views"])
+
+# Put on a queue to tell the next stage that no more items will come
+_DONE = object()
+
+
+class LatestQueue:
+    """Bounded hand-off between stages.
+
+    With ``drop_oldest`` a full queue discards its oldest item instead of
+    blocking the producer, so a slow consumer always sees the newest frame;
+    every discarded item is counted in ``dropped``. Without it ``put`` blocks
+    until there is room (used when replaying at max speed, where no frame
+    may be lost).
+    """
+
+    def __init__(self, maxsize=1, drop_oldest=True):
+        self.items = deque()
+        self.maxsize = maxsize
+        self.drop_oldest = drop_oldest
+        self.dropped = 0
+        self.cond = threading.Condition()
+
+    def put(self, item):
+        with self.cond:
+            while len(self.items) >= self.maxsize and item is not _DONE:
+                if self.drop_oldest:
+                    self.items.popleft()
+                    self.dropped += 1
+                else:
+                    self.cond.wait()
+            self.items.append(item)
+            self.cond.notify_all()
+
+    def get(self, timeout=None):
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.items, timeout):
+                return None
+            item = self.items.popleft()
+            self.cond.notify_all()
+            return item
+
+    def __len__(self):
+        return len(self.items)
+
+
+class Pipeline:
+    """Capture → recognition → counting, each stage on its own thread.
+
+    ``recognize(frame)`` runs on the recognition thread (it may fan work out
+    to the OCR process pool) and returns a result for the frame.
+    ``count(frame, result)`` runs single-threaded on the caller's thread and
+    owns all game state. ``interval`` is the capture period in seconds, or a
+    callable returning it (e.g. a poll scheduler's next wake-up). Capture
+    never waits on OCR: when recognition falls behind, older frames are
+    dropped and ``stats()`` reports it.
+    """
+
+    def __init__(self, capture, recognize, count, interval=0.05, frame_queue_size=1, result_queue_size=16):
+        self.capture = capture
+        self.recognize = recognize
+        self.count = count
+        self.interval = interval
+
+        # Replaying at max speed must not lose frames: block instead of dropping
+        lossless = getattr(capture.source, "max_speed", False)
+        self.frames = LatestQueue(frame_queue_size, drop_oldest=not lossless)
+        self.results = LatestQueue(result_queue_size, drop_oldest=False)
+
+        self.stop_event = threading.Event()
+        self.captured = 0
+        self.recognized = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.error = None
+
+        self.threads = [
+            threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self._recognize_loop, name="recognize", daemon=True),
+        ]
+
+    # === STAGES ===
+    def _capture_loop(self):
+        metrics = get_metrics()
+        planned = 0.0
+        try:
+            while not self.stop_event.is_set():
+                with metrics.timer("capture"):
+                    views = self.capture.grab()
+                metrics.tick(self.capture.timestamp, planned)
+                dropped = self.frames.dropped
+                self.frames.put(Frame(self.captured, self.capture.timestamp, views))
+                if self.frames.dropped != dropped:
+                    metrics.incr("frames_dropped")
+                self.captured += 1
+                planned = self.interval() if callable(self.interval) else self.interval
+                self.capture.sleep(planned)
+        except ReplayFinished:
+            pass
+        except Exception as e:
+            self.error = e
+        self.frames.put(_DONE)
+
+    def _recognize_loop(self):
+        metrics = get_metrics()
+        while True:
+            frame = self.frames.get()
+            if frame is _DONE:
+                break
+            try:
+                with metrics.timer("recognize"):
+                    result = self.recognize(frame)
+            except Exception as e:
+                self.error = e
+                break
+            self.recognized += 1
+            self.last_lag = self.capture.now() - frame.timestamp
+            self.max_lag = max(self.max_lag, self.last_lag)
+            self.results.put((frame, result))
+        self.results.put(_DONE)
+
+    def run(self):
+        """Run until the source ends or CTRL+C; the counting stage runs here."""
+        metrics = get_metrics()
+        for t in self.threads:
+            t.start()
+        try:
+            while True:
+                item = self.results.get(timeout=0.5)
+                if item is None:
+                    continue
+                if item is _DONE:
+                    break
+                frame, result = item
+                with metrics.timer("state_update"):
+                    self.count(frame, result)
+        finally:
+            self.stop()
+        if self.error is not None:
+            raise self.error
+
+    def stop(self):
+        self.stop_event.set()
+        # Unblock a capture thread waiting on a full lossless queue
+        with self.frames.cond:
+            self.frames.items.clear()
+            self.frames.cond.notify_all()
+
+    def stats(self):
+        """Backpressure metrics: how far recognition is behind capture."""
+        return {
+            "captured": self.captured,
+            "recognized": self.recognized,
+            "dropped": self.frames.dropped,
+            "drop_rate": round(self.frames.dropped / self.captured, 3) if self.captured else 0.0,
+            "frame_queue": len(self.frames),
+            "result_queue": len(self.results),
+            "lag_s": round(self.last_lag, 3),
+            "max_lag_s": round(self.max_lag, 3),
+        }
@@ -0,0 +1,110 @@
+"""Per-region preprocessing declared as data and run into preallocated buffers.
+
+A region's steps are a tuple of ``(name, arg)`` pairs, applied in order to
+the grey crop the capture already produced:
+
+    ("threshold", 160)          binary threshold at a fixed level
+    ("otsu", None)              binary threshold at Otsu's level
+    ("adaptive", (11, 2))       adaptive (Gaussian) threshold: block size, C
+    ("invert", None)            light-on-dark to dark-on-light
+    ("rotate", "cw")            90° turn: "cw", "ccw" or "180"
+    ("upscale", 2)              integer resize factor
+    ("pad", 4)                  border of replicated edge pixels
+
+Every step writes into its own buffer, sized once from the region shape
+when the Preprocessor is built, through OpenCV's ``dst=`` outputs, so a
+tick allocates nothing. The returned image is that last buffer: it is
+overwritten by the next ``run`` of the same region, so callers that keep
+it (or hand it to another thread) must copy it. Build one
+RegionPreprocessors per thread that preprocesses.
+"""
+import cv2
+import numpy as np
+
+ROTATIONS = {"cw": cv2.ROTATE_90_CLOCKWISE, "ccw": cv2.ROTATE_90_COUNTERCLOCKWISE, "180": cv2.ROTATE_180}
+
+
+def _step(name, arg, shape):
+    """(function(src) -> dst buffer, output shape) for one declared step."""
+    h, w = shape
+    if name in ("threshold", "otsu", "adaptive", "invert"):
+        out = (h, w)
+    elif name == "rotate":
+        out = (h, w) if arg == "180" else (w, h)
+    elif name == "upscale":
+        out = (h * arg, w * arg)
+    elif name == "pad":
+        out = (h + 2 * arg, w + 2 * arg)
+    else:
+        raise ValueError(f"unknown preprocessing step {name!r}")
+    dst = np.zeros(out, np.uint8)
+
+    if name == "threshold":
+        def run(src):
+            return cv2.threshold(src, arg, 255, cv2.THRESH_BINARY, dst=dst)[1]
+    elif name == "otsu":
+        def run(src):
+            return cv2.threshold(src, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU, dst=dst)[1]
+    elif name == "adaptive":
+        block, c = arg
+        def run(src):
+            return cv2.adaptiveThreshold(src, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY,
+                                         block, c, dst=dst)
+    elif name == "invert":
+        def run(src):
+            return cv2.bitwise_not(src, dst=dst)
+    elif name == "rotate":
+        code = ROTATIONS[arg]
+        def run(src):
+            return cv2.rotate(src, code, dst=dst)
+    elif name == "upscale":
+        size = (out[1], out[0])
+        def run(src):
+            return cv2.resize(src, size, dst=dst, interpolation=cv2.INTER_LINEAR)
+    else:
+        def run(src):
+            return cv2.copyMakeBorder(src, arg, arg, arg, arg, cv2.BORDER_REPLICATE, dst=dst)
+    return run, out
+
+
+class Preprocessor:
+    """One region's steps, compiled against its (height, width)."""
+
+    def __init__(self, shape, steps=()):
+        self.shape = tuple(shape)
+        self.steps = tuple(steps)
+        # Only used when the capture clipped the region at its edge
+        self.padded = np.zeros(self.shape, np.uint8)
+        self.ops = []
+        out = self.shape
+        for name, arg in self.steps:
+            op, out = _step(name, arg, out)
+            self.ops.append(op)
+        self.out_shape = out
+
+    def run(self, gray):
+        if gray.shape != self.shape:
+            h, w = min(gray.shape[0], self.shape[0]), min(gray.shape[1], self.shape[1])
+            self.padded[...] = 0
+            self.padded[:h, :w] = gray[:h, :w]
+            gray = self.padded
+        for op in self.ops:
+            gray = op(gray)
+        return gray
+
+
+class RegionPreprocessors:
+    """A Preprocessor per region: ``regions`` label -> box, ``config`` label -> steps."""
+
+    def __init__(self, regions, config):
+        self.regions = {
+            label: Preprocessor((box[3] - box[1], box[2] - box[0]), config.get(label, ()))
+            for label, box in regions.items()
+        }
+
+    def run(self, label, gray):
+        """The recognizer input for ``label``; valid until the next run of ``label``."""
+        return self.regions[label].run(gray)
+
+    def output_shape(self, label):
+        return self.regions[label].out_shape
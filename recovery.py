@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import ocr_pool
+from metrics import get_metrics
+from ocr_cache import get_cache
+
+# One buffer to search: ROIs newest first, what they hold ("card"/"digits"),
+# and a predicate that says when a read is good enough to stop
+Scan = namedtuple("Scan", ["name", "frames", "kind", "accept"])
+Recovered = namedtuple("Recovered", ["tag", "found", "ocr_calls", "seconds"])
+
+
+class RecoveryEngine:
+    """Search ROI history for missed reads without blocking the tracker.
+
+    ``submit`` snapshots the frames to search (so the caller's ring buffers
+    may keep moving) and returns at once. A background thread dedupes each
+    scan by glyph key, keeps at most ``max_frames`` unique ROIs, serves
+    repeats from the OCR cache and sends the rest to the OCR pool in one
+    go. Reads are then taken newest first and the scan stops, cancelling
+    whatever is still queued, at the first one ``accept`` likes. A whole
+    job is bounded by ``max_frames`` per scan and by ``timeout`` seconds.
+
+    ``interpret(kind, text, img)`` turns raw OCR text into a read (with
+    any template fallback). ``prepare(name, img)``, if given, turns a
+    buffered ROI into the recognizer input (the live reader's
+    preprocessing) before it is keyed and copied. ``ocr_read(kind, text)``
+    is the read tesseract's text makes with no fallback: only a non-empty
+    read that ``interpret`` left as it was goes in the OCR cache (none do
+    without ``ocr_read``). Finished jobs are collected with ``poll`` on the
+    caller's thread, which is where the count gets reconciled.
+    """
+
+    def __init__(self, interpret, max_frames=8, timeout=2.0, prepare=None, ocr_read=None):
+        self.interpret = interpret
+        self.prepare = prepare
+        self.ocr_read = ocr_read
+        self.max_frames = max_frames
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recovery")
+        self.finished = deque()
+        self.pending = 0
+        self.lock = threading.Condition()
+
+    def submit(self, tag, scans):
+        """Queue a recovery job; ``tag`` comes back with its result."""
+        cache = get_cache()
+        snapshots = []
+        for scan in scans:
+            # Dedupe by glyph key (newest kept) and copy only the survivors
+            seen = {}
+            for img in scan.frames:
+                if self.prepare is not None:
+                    img = self.prepare(scan.name, img)
+                key = cache.key(img, scan.kind)
+                if key not in seen:
+                    seen[key] = img.copy()
+                    if len(seen) >= self.max_frames:
+                        break
+            get_metrics().incr("recovery_frames_deduped", len(scan.frames) - len(seen))
+            snapshots.append(scan._replace(frames=list(seen.items())))
+        with self.lock:
+            self.pending += 1
+        self.executor.submit(self._run, tag, snapshots)
+
+    def _run(self, tag, scans):
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        found = {}
+        ocr_calls = 0
+        try:
+            for scan in scans:
+                value, calls = self._scan(scan, deadline)
+                found[scan.name] = value
+                ocr_calls += calls
+        finally:
+            elapsed = time.perf_counter() - start
+            get_metrics().observe("recovery", elapsed)
+            with self.lock:
+                self.finished.append(Recovered(tag, found, ocr_calls, elapsed))
+                self.pending -= 1
+                self.lock.notify_all()
+
+    def _scan(self, scan, deadline):
+        cache = get_cache()
+        reads = [cache.get(key) for key, _ in scan.frames]
+        futures = {
+            i: ocr_pool.submit(img, config='--psm 6')
+            for i, ((_, img), read) in enumerate(zip(scan.frames, reads)) if read is None
+        }
+        try:
+            for i, (key, img) in enumerate(scan.frames):
+                if reads[i] is None:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        return None, len(futures)
+                    text = futures[i].result(timeout=remaining).text
+                    reads[i] = self.interpret(scan.kind, text, img)
+                    # Blanks and template guesses are not confirmed reads
+                    if reads[i] and self.ocr_read and reads[i] == self.ocr_read(scan.kind, text):
+                        cache.put(key, reads[i])
+                if scan.accept(reads[i]):
+                    if i + 1 < len(scan.frames):
+                        get_metrics().incr("recovery_early_stops")
+                    return reads[i], len(futures)
+            return None, len(futures)
+        except Exception as e:
+            print(f"❌ Recovery scan {scan.name} failed: {e!r}")
+            return None, len(futures)
+        finally:
+            for future in futures.values():
+                future.cancel()
+
+    def poll(self):
+        """Return the jobs that finished since the last call."""
+        done = []
+        with self.lock:
+            while self.finished:
+                done.append(self.finished.popleft())
+        return done
+
+    def busy(self):
+        with self.lock:
+            return self.pending > 0
+
+    def wait(self, timeout=None):
+        """Block until every queued job has finished (or ``timeout``)."""
+        with self.lock:
+            return self.lock.wait_for(lambda: self.pending == 0, timeout)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,52 @@
+import numpy as np
+
+
+class RoiRing:
+    """Fixed-depth history of one region, preallocated as a single block.
+
+    ``depth`` slots of the region's shape live in one contiguous uint8 array,
+    with a capture timestamp and the change detector's magnitude stored per
+    slot. ``append`` copies the ROI into the next slot in place, so a full
+    ring allocates nothing; readers get views into the block, which stay
+    valid until ``depth`` more appends have wrapped around them.
+    """
+
+    def __init__(self, shape, depth=64):
+        self.depth = depth
+        self.slots = np.zeros((depth,) + tuple(shape), dtype=np.uint8)
+        self.timestamps = np.zeros(depth, dtype=np.float64)
+        self.changes = np.zeros(depth, dtype=np.float32)
+        self.appended = 0
+
+    def append(self, img, timestamp, change=0.0):
+        slot = self.appended % self.depth
+        target = self.slots[slot]
+        if img.shape == target.shape:
+            target[...] = img
+        else:
+            # Region clipped at the capture edge: keep what fits, blank the rest
+            h, w = min(img.shape[0], target.shape[0]), min(img.shape[1], target.shape[1])
+            target[...] = 0
+            target[:h, :w] = img[:h, :w]
+        self.timestamps[slot] = timestamp
+        self.changes[slot] = change
+        self.appended += 1
+
+    def __len__(self):
+        return min(self.appended, self.depth)
+
+    def order(self):
+        """Slot indices from newest to oldest."""
+        newest = self.appended - 1
+        return [(newest - i) % self.depth for i in range(len(self))]
+
+    def latest(self, n=None):
+        """Views of the newest ``n`` (default: all) ROIs, newest first."""
+        return [self.slots[i] for i in self.order()[:n]]
+
+    def since(self, timestamp):
+        """Views of the ROIs captured at or after ``timestamp``, newest first."""
+        return [self.slots[i] for i in self.order() if self.timestamps[i] >= timestamp]
+
+    def clear(self):
+        self.appended = 0
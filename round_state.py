@@ -0,0 +1,119 @@
+"""Round boundaries from the signals the card tracker already reads.
+
+    cleared → dealing    a card shows
+    dealing → player     two cards
+    dealing → dealer     the counter or double card says the player is done
+    dealing → cleared    the lone card went away
+    player  → dealer     the double-down card shows, or the counter reads 21+
+    player  → settled    the cards are gone
+    dealer  → settled    the cards, or the counter, are gone
+    settled → dealing    cards again once the round's cards have left
+    settled → cleared    LATE_SECONDS after settling, table clear
+
+"Gone" means blank for BLANK_SECONDS, which absorbs single-poll flicker.
+The counter only ends a round once the player can no longer act, since
+it can blink while the player is still drawing, and a counter left over
+from the previous round is ignored until it changes.
+"""
+
+PHASES = ("cleared", "dealing", "player", "dealer", "settled")
+ACTIVE = frozenset({"dealing", "player", "dealer"})
+
+
+def counter_total(text):
+    """The counter read as an int, or None when it is blank or not a number."""
+    try:
+        return int(text)
+    except (TypeError, ValueError):
+        return None
+
+
+class RoundState:
+    """Round phase of one table, advanced once per counted frame."""
+
+    BLANK_SECONDS = 0.5  # blank this long means gone
+    LATE_SECONDS = 3.0  # a settled round still takes a counter correction this long
+
+    def __init__(self):
+        self.phase = "cleared"
+        self.since = None  # when the current phase began
+        self.started = None  # when the current (or last) round was dealt
+        self.cards_blank_since = None
+        self.counter_blank_since = None
+        self.counter_seen = False
+        self.stale_counter = None  # counter showing when the round was dealt
+        self.cards_gone = False  # cards blank for BLANK_SECONDS as of the last update
+        self.table_clear = False  # settled, and its cards have left the table
+
+    def _blank_for(self, since, now):
+        return 0.0 if since is None else now - since
+
+    def update(self, now, cards, counter="", double=False):
+        """Advance on one frame; returns the new phase when it changed, else None.
+
+        ``cards`` are the card reads on the table, ``counter`` the bj_counter
+        read ("" when blank), ``double`` whether the double-down card shows.
+        """
+        if cards:
+            self.cards_blank_since = None
+        elif self.cards_blank_since is None:
+            self.cards_blank_since = now
+        if counter != self.stale_counter:
+            self.stale_counter = None
+        fresh = counter if self.stale_counter is None else ""
+        if fresh:
+            self.counter_seen = True
+        if counter:
+            self.counter_blank_since = None
+        elif self.counter_blank_since is None:
+            self.counter_blank_since = now
+        cards_gone = not cards and self._blank_for(self.cards_blank_since, now) >= self.BLANK_SECONDS
+        self.cards_gone = cards_gone
+        counter_gone = (self.counter_seen and not counter
+                        and self._blank_for(self.counter_blank_since, now) >= self.BLANK_SECONDS)
+        total = counter_total(fresh)
+        done_acting = double or (total is not None and total >= 21)
+
+        phase = self.phase
+        if phase == "cleared":
+            if cards:
+                return self._enter("dealing", now, counter)
+        elif phase == "dealing":
+            if done_acting and cards:
+                return self._enter("dealer", now)
+            if len(cards) >= 2:
+                return self._enter("player", now)
+            if cards_gone:
+                return self._enter("cleared", now)
+        elif phase == "player":
+            if cards_gone:
+                return self._enter("settled", now)
+            if done_acting:
+                return self._enter("dealer", now)
+        elif phase == "dealer":
+            if cards_gone or counter_gone:
+                return self._enter("settled", now)
+        else:  # settled
+            if cards_gone:
+                self.table_clear = True
+            if cards and self.table_clear:
+                return self._enter("dealing", now, counter)
+            if self.table_clear and now - self.since >= self.LATE_SECONDS:
+                return self._enter("cleared", now)
+        return None
+
+    def _enter(self, phase, now, counter=""):
+        self.phase = phase
+        self.since = now
+        if phase == "dealing":
+            self.started = now
+            # A new round: the counter on screen still belongs to the last one
+            self.stale_counter = counter or None
+            self.counter_seen = False
+        if phase == "settled":
+            self.table_clear = self.cards_gone
+        return phase
+
+    @property
+    def active(self):
+        return self.phase in ACTIVE
@@ -0,0 +1,107 @@
+import threading
+
+
+class RegionPolicy:
+    """Polling rules for one region.
+
+    A region that just changed is polled every ``min_interval`` seconds;
+    each poll that finds it unchanged multiplies the interval by ``backoff``
+    up to ``max_interval``. ``phases`` maps a game phase to a
+    (min_interval, max_interval) override, e.g. poll the bj counter fast
+    only while a hand is in progress. ``ocr_per_sec`` caps how often the
+    region may be sent to OCR (None = unlimited).
+    """
+
+    def __init__(self, min_interval=0.05, max_interval=1.0, backoff=2.0, ocr_per_sec=None, phases=None):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.ocr_per_sec = ocr_per_sec
+        self.phases = phases or {}
+
+    def bounds(self, phase):
+        return self.phases.get(phase, (self.min_interval, self.max_interval))
+
+
+class PollScheduler:
+    """Per-region adaptive poll intervals and OCR budgets, driven by game phase.
+
+    Capture asks for ``next_wakeup``, recognition polls and spends OCR
+    budget, and counting sets the phase, each from its own thread: every
+    method holds ``lock``.
+    """
+
+    def __init__(self, policies, phase="idle"):
+        self.lock = threading.Lock()
+        self.policies = dict(policies)
+        self.phase = phase
+        self.interval = {label: p.bounds(phase)[0] for label, p in self.policies.items()}
+        self.next_due = {label: 0.0 for label in self.policies}
+        # Token bucket per region: (tokens, last refill time)
+        self.tokens = {label: (p.ocr_per_sec or 0, 0.0) for label, p in self.policies.items()}
+        self.skipped_ocr = 0
+
+    def set_phase(self, phase, now=None):
+        """Switch game phase; regions whose new max interval is shorter are pulled in."""
+        with self.lock:
+            if phase == self.phase:
+                return
+            self.phase = phase
+            for label, policy in self.policies.items():
+                low, high = policy.bounds(phase)
+                self.interval[label] = min(max(self.interval[label], low), high)
+                if now is not None:
+                    self.next_due[label] = min(self.next_due[label], now + self.interval[label])
+
+    def is_due(self, label, now):
+        with self.lock:
+            return now >= self.next_due[label]
+
+    def due(self, now):
+        with self.lock:
+            return [label for label in self.policies if now >= self.next_due[label]]
+
+    def mark_polled(self, label, now, changed):
+        """Record a poll: activity snaps back to fast polling, quiet backs off."""
+        policy = self.policies[label]
+        with self.lock:
+            low, high = policy.bounds(self.phase)
+            if changed:
+                self.interval[label] = low
+            else:
+                self.interval[label] = min(high, max(low, self.interval[label] * policy.backoff))
+            self.next_due[label] = now + self.interval[label]
+
+    def allow_ocr(self, label, now):
+        """Spend one OCR token for ``label``; False when its budget is used up."""
+        rate = self.policies[label].ocr_per_sec
+        if rate is None:
+            return True
+        with self.lock:
+            tokens, last = self.tokens[label]
+            tokens = min(rate, tokens + (now - last) * rate)
+            if tokens < 1:
+                self.tokens[label] = (tokens, now)
+                self.skipped_ocr += 1
+                return False
+            self.tokens[label] = (tokens - 1, now)
+            return True
+
+    def next_wakeup(self, now):
+        """Seconds until the earliest region is due again, and never less than the fastest poll interval.
+
+        A region only stops being due once recognition has polled it, so
+        while recognition is busy (on OCR) a due region would otherwise
+        have capture grab and drop frames back to back.
+        """
+        with self.lock:
+            fastest = min(policy.bounds(self.phase)[0] for policy in self.policies.values())
+            return max(fastest, min(self.next_due.values()) - now)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "phase": self.phase,
+                "intervals": {label: round(v, 3) for label, v in self.interval.items()},
+                "skipped_ocr": self.skipped_ocr,
+            }
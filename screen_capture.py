@@ -0,0 +1,314 @@
+import os
+import time
+
+import cv2
+import numpy as np
+
+
+def region_bbox(regions):
+    """Return the (left, top, right, bottom) box enclosing every region."""
+    lefts, tops, rights, bottoms = zip(*regions)
+    return (min(lefts), min(tops), max(rights), max(bottoms))
+
+
+def shift_region(region, dx, dy):
+    return (region[0] + dx, region[1] + dy, region[2] + dx, region[3] + dy)
+
+
+def region_monitor(region):
+    return {
+        "top": region[1],
+        "left": region[0],
+        "width": region[2] - region[0],
+        "height": region[3] - region[1],
+    }
+
+
+class ReplayFinished(Exception):
+    """Raised by a replay source once every recorded frame has been served."""
+
+
+# === FRAME SOURCES ===
+# A frame source returns (timestamp, grayscale frame) for a screen bbox and
+# owns the notion of time, so the OCR loops run unchanged on live capture
+# or on a recorded session. ``screen_box()`` is the whole area it can serve.
+
+class MssFrameSource:
+    """Live screen capture through mss; the screen is opened on the first grab."""
+
+    def __init__(self, sct=None):
+        self.sct = sct
+
+    def _screen(self):
+        if self.sct is None:
+            import mss
+            self.sct = mss.mss()
+        return self.sct
+
+    def grab(self, bbox):
+        shot = self._screen().grab(region_monitor(bbox))
+        bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+        return time.time(), cv2.cvtColor(bgra, cv2.COLOR_BGRA2GRAY)
+
+    def screen_box(self):
+        # monitors[0] is the virtual screen spanning every monitor
+        mon = self._screen().monitors[0]
+        return (mon["left"], mon["top"], mon["left"] + mon["width"], mon["top"] + mon["height"])
+
+    def now(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def close(self):
+        close = getattr(self.sct, "close", None)
+        if close:
+            close()
+
+
+class ReplayFrameSource:
+    """Replay a recorded session from a compressed .npz archive or a video file.
+
+    An archive holds ``frames`` (N, H, W) uint8 grayscale, ``timestamps`` (N,)
+    in seconds and ``origin`` (left, top) — the screen position of pixel (0, 0).
+    Video files are read with cv2.VideoCapture and use the container's
+    timestamps; pass ``origin`` if the video is not a full-screen recording.
+
+    In real-time mode the source paces itself against the recorded
+    timestamps and, like the live screen, skips frames the caller was too
+    slow to see. In ``max_speed`` mode every frame is served back to back,
+    ``sleep()`` returns immediately and the clock follows the recording.
+    """
+
+    def __init__(self, path, origin=None, max_speed=False):
+        self.path = path
+        self.max_speed = max_speed
+        self.index = -1
+        self.clock = None
+        self.started_at = None
+
+        if path.lower().endswith(".npz"):
+            with np.load(path) as archive:
+                self.frames = archive["frames"]
+                self.timestamps = archive["timestamps"].astype(np.float64)
+                stored_origin = tuple(int(v) for v in archive["origin"]) if "origin" in archive else (0, 0)
+            self.video = None
+        else:
+            self.frames = None
+            self.video = cv2.VideoCapture(path)
+            if not self.video.isOpened():
+                raise ValueError(f"Cannot open replay video: {path}")
+            self.timestamps = None
+            stored_origin = (0, 0)
+        self.origin = tuple(origin) if origin is not None else stored_origin
+        self.frame = None
+        self.frame_time = None
+
+    def _read_video_frame(self):
+        ok, img = self.video.read()
+        if not ok:
+            raise ReplayFinished(self.path)
+        self.frame_time = self.video.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        self.frame = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+    def _advance(self):
+        self.index += 1
+        if self.frames is None:
+            self._read_video_frame()
+            return
+        if self.index >= len(self.frames):
+            raise ReplayFinished(self.path)
+        self.frame = self.frames[self.index]
+        self.frame_time = float(self.timestamps[self.index])
+
+    def _next_frame(self):
+        if self.index < 0:
+            self._advance()
+            self.clock = self.frame_time
+            self.started_at = time.perf_counter() - self.frame_time
+            return
+        if self.max_speed:
+            self._advance()
+            self.clock = self.frame_time
+            return
+
+        # Real time: drop every frame whose timestamp has already passed
+        target = time.perf_counter() - self.started_at
+        self._advance()
+        while True:
+            upcoming = self._peek_time()
+            if upcoming is None or upcoming > target:
+                break
+            self._advance()
+        if self.frame_time > target:
+            time.sleep(self.frame_time - target)
+        self.clock = self.frame_time
+
+    def _peek_time(self):
+        if self.timestamps is not None:
+            nxt = self.index + 1
+            return float(self.timestamps[nxt]) if nxt < len(self.timestamps) else None
+        # Video timestamps are only known once a frame is decoded
+        return None
+
+    def grab(self, bbox):
+        self._next_frame()
+        left, top = bbox[0] - self.origin[0], bbox[1] - self.origin[1]
+        right, bottom = bbox[2] - self.origin[0], bbox[3] - self.origin[1]
+        return self.clock, self.frame[top:bottom, left:right]
+
+    def screen_box(self):
+        if self.frames is not None:
+            height, width = self.frames.shape[1:3]
+        else:
+            width = int(self.video.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(self.video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        return (self.origin[0], self.origin[1], self.origin[0] + width, self.origin[1] + height)
+
+    def now(self):
+        return self.clock if self.clock is not None else 0.0
+
+    def sleep(self, seconds):
+        if not self.max_speed:
+            time.sleep(seconds)
+
+    def close(self):
+        if self.video is not None:
+            self.video.release()
+
+
+class RecordingFrameSource:
+    """Wrap a source and save every frame it serves to a compressed .npz session."""
+
+    def __init__(self, source, path):
+        self.source = source
+        self.path = path
+        self.frames = []
+        self.timestamps = []
+        self.bbox = None
+
+    def grab(self, bbox):
+        timestamp, gray = self.source.grab(bbox)
+        if self.bbox is None:
+            self.bbox = bbox
+        if bbox == self.bbox:
+            self.frames.append(gray.copy())
+            self.timestamps.append(timestamp)
+        return timestamp, gray
+
+    def screen_box(self):
+        return self.source.screen_box()
+
+    def now(self):
+        return self.source.now()
+
+    def sleep(self, seconds):
+        self.source.sleep(seconds)
+
+    def close(self):
+        if self.frames:
+            np.savez_compressed(
+                self.path,
+                frames=np.stack(self.frames),
+                timestamps=np.asarray(self.timestamps, dtype=np.float64),
+                origin=np.asarray(self.bbox[:2], dtype=np.int32),
+            )
+            print(f"💾 Recorded {len(self.frames)} frames → {self.path}")
+        self.source.close()
+
+
+def open_frame_source(spec=None):
+    """Build the frame source named by ``spec`` or the environment.
+
+    ``BJ_FRAME_SOURCE``: ``mss`` (default), ``replay:<path>`` or
+    ``ring:<name>`` (frames published by multi_table's capture process).
+    ``BJ_REPLAY_SPEED``: ``max`` to replay as fast as the pipeline runs.
+    ``BJ_REPLAY_ORIGIN``: ``left,top`` screen offset of a replayed video.
+    ``BJ_RECORD``: path of an .npz file to record the live session into.
+    """
+    spec = spec or os.environ.get("BJ_FRAME_SOURCE", "mss")
+    if spec.startswith("replay:"):
+        origin = os.environ.get("BJ_REPLAY_ORIGIN")
+        source = ReplayFrameSource(
+            spec[len("replay:"):],
+            origin=tuple(int(v) for v in origin.split(",")) if origin else None,
+            max_speed=os.environ.get("BJ_REPLAY_SPEED", "").lower() == "max",
+        )
+    elif spec.startswith("ring:"):
+        from frame_ring import RingFrameSource
+        source = RingFrameSource(spec[len("ring:"):])
+    elif spec == "mss":
+        source = MssFrameSource()
+    else:
+        raise ValueError(f"Unknown frame source: {spec}")
+
+    record_path = os.environ.get("BJ_RECORD")
+    if record_path:
+        source = RecordingFrameSource(source, record_path)
+    return source
+
+
+class RegionCapture:
+    """Grab every configured region from one screen capture per tick.
+
+    The bounding box of all regions is grabbed and converted to grayscale
+    once; each region is then handed out as a NumPy view into that frame,
+    so all regions come from the same instant and capture cost does not
+    grow with the number of regions.
+
+    With a ``guard`` (calibration.AnchorGuard) the guard's anchor box is
+    captured too and checked every tick; when the table has moved, every
+    region is shifted to follow it before the views are handed out.
+    """
+
+    def __init__(self, regions, source=None, guard=None):
+        self.source = source if source is not None else open_frame_source()
+        self.guard = guard
+        self._place(dict(regions))
+        self.frame = None
+        self.timestamp = None
+
+    def _place(self, regions):
+        self.regions = regions
+        boxes = list(regions.values()) + ([self.guard.box] if self.guard else [])
+        self.bbox = region_bbox(boxes)
+
+        left, top = self.bbox[0], self.bbox[1]
+        self.slices = {
+            label: (slice(r[1] - top, r[3] - top), slice(r[0] - left, r[2] - left))
+            for label, r in self.regions.items()
+        }
+        if self.guard:
+            g = self.guard.box
+            self.guard_slice = (slice(g[1] - top, g[3] - top), slice(g[0] - left, g[2] - left))
+
+    def move(self, dx, dy):
+        """Shift every region (and the anchor) by (dx, dy) screen pixels; sizes stay the same."""
+        if self.guard:
+            self.guard.box = shift_region(self.guard.box, dx, dy)
+        self._place({label: shift_region(r, dx, dy) for label, r in self.regions.items()})
+
+    def grab(self):
+        """Capture a new frame and return {label: grayscale view}."""
+        # Sources return a fresh frame per tick, so views from earlier ticks stay valid.
+        self.timestamp, self.frame = self.source.grab(self.bbox)
+        if self.guard is not None:
+            shift = self.guard.check(self.frame[self.guard_slice])
+            if shift:
+                self.move(*shift)
+                self.timestamp, self.frame = self.source.grab(self.bbox)
+        return self.views()
+
+    def views(self):
+        """Return {label: view} into the most recently grabbed frame."""
+        return {label: self.frame[s] for label, s in self.slices.items()}
+
+    def now(self):
+        return self.source.now()
+
+    def sleep(self, seconds):
+        self.source.sleep(seconds)
+
+    def close(self):
+        self.source.close()
@@ -0,0 +1,307 @@
+"""Vectorized Monte Carlo shoe simulator for the Hi-Lo bet ramp.
+
+Deals whole batches of shoes as NumPy arrays and plays every shoe in the
+batch in lock-step, round by round, with a fixed basic strategy (hit /
+stand / double, no splits or surrender). The running count comes from a
+cumulative sum of Hi-Lo tags over each shoe. The true count and the bet
+use the same heuristics as the counters: ``max(0.5, decks - seen / 52)``
+decks remaining, ``get_true_count`` rounding and the ``suggest_bet``
+ramp. Batches run in a process pool and only per-true-count totals
+come back, so memory stays flat whatever the number of hands.
+
+    python shoe_simulator.py --hands 10000000 --decks 6 --penetration 0.75 --plot ramp.png
+"""
+import argparse
+import math
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from shoe_state import HI_LO
+
+# Blackjack value per shoe_state rank code (ace counted as 1; soft totals add 10)
+RANK_VALUES = np.array([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10], dtype=np.int8)
+
+# suggest_bet(): TC <= 1 → minimum, <= 2 → 2 units, <= 3 → 4 units, else max
+BET_RAMP = ((1, 1), (2, 2), (3, 4))
+
+# True counts are bucketed by floor(TC) and clipped to this range
+TC_MIN, TC_MAX = -6, 10
+
+Rules = namedtuple("Rules", ["decks", "penetration", "dealer_hits_soft_17", "blackjack_payout",
+                             "double_allowed"])
+Rules.__new__.__defaults__ = (6, 0.75, False, 1.5, True)
+
+# === BASIC STRATEGY TABLES (indexed by dealer up-card value 1..10, ace = 1) ===
+# Lowest hard total the player stands on
+HARD_STAND = np.array([0, 17, 13, 13, 12, 12, 12, 17, 17, 17, 17], dtype=np.int8)
+# Lowest soft total the player stands on
+SOFT_STAND = np.array([0, 19, 18, 18, 18, 18, 18, 18, 18, 19, 19], dtype=np.int8)
+# Hard totals doubled on two cards, per up-card
+DOUBLE_HARD = np.zeros((22, 11), dtype=bool)
+DOUBLE_HARD[11, 2:11] = True
+DOUBLE_HARD[10, 2:10] = True
+DOUBLE_HARD[9, 3:7] = True
+
+
+def bet_units(true_count, max_units=8):
+    """Vectorized suggest_bet(): bet size in units for each true count."""
+    conditions = [true_count <= limit for limit, _ in BET_RAMP]
+    choices = [units for _, units in BET_RAMP]
+    return np.select(conditions, choices, default=max_units).astype(np.float64)
+
+
+def best_total(hard, soft):
+    """Hand total counting one ace as 11 when that does not bust."""
+    return np.where(soft & (hard + 10 <= 21), hard + 10, hard)
+
+
+def simulate_batch(n_shoes, rules, max_units, seed):
+    """Play ``n_shoes`` shoes and return per-TC-bucket sums.
+
+    Returns an array of shape (4, buckets): hands, total bet, total win
+    and total squared win, all in betting units.
+    """
+    rng = np.random.default_rng(seed)
+    shoe_len = 52 * rules.decks
+    deck = np.repeat(np.arange(13, dtype=np.int8), 4 * rules.decks)
+    shoes = rng.permuted(np.broadcast_to(deck, (n_shoes, shoe_len)), axis=1)
+
+    # Running count after each card; rc_before[ptr] is the count before card ptr
+    rc = np.cumsum(HI_LO.astype(np.int8)[shoes], axis=1, dtype=np.int16)
+    rc_before = np.concatenate([np.zeros((n_shoes, 1), np.int16), rc], axis=1)
+
+    cut = int(shoe_len * rules.penetration)
+    rows = np.arange(n_shoes)
+    ptr = np.zeros(n_shoes, dtype=np.int32)
+    buckets = TC_MAX - TC_MIN + 1
+    sums = np.zeros((4, buckets), dtype=np.float64)
+
+    def draw(mask):
+        cards = shoes[rows, np.minimum(ptr, shoe_len - 1)]
+        ptr[mask] += 1
+        return RANK_VALUES[cards].astype(np.int16)
+
+    while True:
+        live = ptr < cut
+        if not live.any():
+            break
+
+        # === Bet from the count before the round
+        running = rc_before[rows, ptr]
+        decks_remaining = np.maximum(0.5, rules.decks - ptr / 52.0)
+        true_count = np.round(running / decks_remaining, 2)
+        bet = bet_units(true_count, max_units)
+
+        # === Initial deal: player, dealer up, player, dealer hole
+        p1 = draw(live)
+        up = draw(live)
+        p2 = draw(live)
+        hole = draw(live)
+        p_hard = p1 + p2
+        p_soft = (p1 == 1) | (p2 == 1)
+        d_hard = up + hole
+        d_soft = (up == 1) | (hole == 1)
+
+        p_bj = best_total(p_hard, p_soft) == 21
+        d_bj = best_total(d_hard, d_soft) == 21
+        outcome = np.zeros(n_shoes, dtype=np.float64)
+        outcome[p_bj & ~d_bj] = rules.blackjack_payout
+        outcome[d_bj & ~p_bj] = -1.0
+        settled = p_bj | d_bj | ~live
+
+        # === Doubles: one card, stake x2
+        stake = np.ones(n_shoes, dtype=np.float64)
+        if rules.double_allowed:
+            doubling = ~settled & ~p_soft & DOUBLE_HARD[np.minimum(p_hard, 21), up]
+            card = draw(doubling)
+            p_hard = np.where(doubling, p_hard + card, p_hard)
+            p_soft = p_soft | (doubling & (card == 1))
+            stake[doubling] = 2.0
+        else:
+            doubling = np.zeros(n_shoes, dtype=bool)
+
+        # === Player hits until the strategy stands or the hand busts
+        acting = ~settled & ~doubling
+        while acting.any():
+            total = best_total(p_hard, p_soft)
+            is_soft = p_soft & (p_hard + 10 <= 21)
+            stand_at = np.where(is_soft, SOFT_STAND[up], HARD_STAND[up])
+            hit = acting & (total < stand_at)
+            if not hit.any():
+                break
+            card = draw(hit)
+            p_hard = np.where(hit, p_hard + card, p_hard)
+            p_soft = p_soft | (hit & (card == 1))
+            acting = hit & (p_hard <= 21)
+
+        p_total = best_total(p_hard, p_soft)
+        p_bust = ~settled & (p_hard > 21)
+        outcome[p_bust] = -1.0
+        settled = settled | p_bust
+
+        # === Dealer draws to 17 (optionally hitting soft 17)
+        drawing = ~settled
+        while True:
+            total = best_total(d_hard, d_soft)
+            soft17 = (total == 17) & d_soft & (d_hard + 10 == 17)
+            hit = drawing & ((total < 17) | (rules.dealer_hits_soft_17 & soft17))
+            if not hit.any():
+                break
+            card = draw(hit)
+            d_hard = np.where(hit, d_hard + card, d_hard)
+            d_soft = d_soft | (hit & (card == 1))
+
+        d_total = best_total(d_hard, d_soft)
+        open_hands = ~settled
+        outcome[open_hands & (d_total > 21)] = 1.0
+        versus = open_hands & (d_total <= 21)
+        outcome[versus] = np.sign(p_total[versus] - d_total[versus])
+
+        # === Accumulate per TC bucket
+        win = outcome * stake * bet
+        idx = np.clip(np.floor(true_count), TC_MIN, TC_MAX).astype(np.intp) - TC_MIN
+        idx, bet_l, win_l = idx[live], bet[live], win[live]
+        sums[0] += np.bincount(idx, minlength=buckets)
+        sums[1] += np.bincount(idx, weights=bet_l, minlength=buckets)
+        sums[2] += np.bincount(idx, weights=win_l, minlength=buckets)
+        sums[3] += np.bincount(idx, weights=win_l * win_l, minlength=buckets)
+
+    return sums
+
+
+def risk_of_ruin(ev, variance, bankroll):
+    """Classic gambler's-ruin approximation exp(-2·EV·B/σ²) per hand."""
+    if ev <= 0 or variance <= 0:
+        return 1.0
+    return math.exp(-2.0 * ev * bankroll / variance)
+
+
+def summarize(sums, bankroll):
+    """Turn per-bucket sums into a DataFrame of EV, variance and risk of ruin."""
+    hands, bets, wins, wins_sq = sums
+    total_hands = hands.sum()
+    rows = []
+    for i in range(len(hands)):
+        n = hands[i]
+        if not n:
+            continue
+        ev = wins[i] / n
+        variance = wins_sq[i] / n - ev * ev
+        rows.append({
+            "true_count": i + TC_MIN,
+            "hands": int(n),
+            "freq": n / total_hands,
+            "avg_bet": bets[i] / n,
+            "ev_per_hand": ev,
+            "edge": wins[i] / bets[i] if bets[i] else 0.0,
+            "variance": variance,
+            "sd": math.sqrt(max(variance, 0.0)),
+            "ror": risk_of_ruin(ev, variance, bankroll),
+        })
+    df = pd.DataFrame(rows).set_index("true_count")
+
+    ev = wins.sum() / total_hands
+    variance = wins_sq.sum() / total_hands - ev * ev
+    summary = {
+        "hands": int(total_hands),
+        "ev_per_hand": ev,
+        "edge": wins.sum() / bets.sum(),
+        "avg_bet": bets.sum() / total_hands,
+        "sd": math.sqrt(max(variance, 0.0)),
+        "ror": risk_of_ruin(ev, variance, bankroll),
+    }
+    return df, summary
+
+
+def simulate(hands=1_000_000, rules=Rules(), max_units=8, bankroll=1000, workers=None,
+             batch_shoes=20_000, seed=None):
+    """Simulate at least ``hands`` hands; returns (per-TC DataFrame, summary dict)."""
+    rounds_per_shoe = 52 * rules.decks * rules.penetration / 5.4  # ~5.4 cards per heads-up round
+    n_shoes = max(1, math.ceil(hands / rounds_per_shoe))
+    n_batches = max(1, math.ceil(n_shoes / batch_shoes))
+    seeds = np.random.SeedSequence(seed).spawn(n_batches)
+    sizes = [batch_shoes] * (n_batches - 1) + [n_shoes - batch_shoes * (n_batches - 1)]
+
+    start = time.perf_counter()
+    sums = np.zeros((4, TC_MAX - TC_MIN + 1))
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or n_batches == 1:
+        for size, s in zip(sizes, seeds):
+            sums += simulate_batch(size, rules, max_units, s)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for part in pool.map(simulate_batch, sizes, [rules] * n_batches, [max_units] * n_batches, seeds):
+                sums += part
+    elapsed = time.perf_counter() - start
+
+    df, summary = summarize(sums, bankroll)
+    summary["shoes"] = n_shoes
+    summary["seconds"] = elapsed
+    summary["hands_per_sec"] = summary["hands"] / elapsed if elapsed else None
+    return df, summary
+
+
+def plot_results(df, path=None):
+    """Bar chart of edge and hand frequency per true count (matplotlib)."""
+    import matplotlib
+    if path:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, (ax_edge, ax_freq) = plt.subplots(2, 1, sharex=True, figsize=(8, 6))
+    ax_edge.bar(df.index, df["edge"] * 100, color=["tab:red" if e < 0 else "tab:green" for e in df["edge"]])
+    ax_edge.set_ylabel("Edge per unit bet (%)")
+    ax_edge.axhline(0, color="black", linewidth=0.8)
+    ax_freq.bar(df.index, df["freq"] * 100, color="tab:blue")
+    ax_freq.set_ylabel("Hands (%)")
+    ax_freq.set_xlabel("True count")
+    fig.suptitle("Hi-Lo bet ramp by true count")
+    fig.tight_layout()
+    if path:
+        fig.savefig(path)
+        print(f"💾 Plot → {path}")
+    else:
+        plt.show()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo evaluation of the Hi-Lo bet ramp.")
+    parser.add_argument("--hands", type=int, default=1_000_000)
+    parser.add_argument("--decks", type=int, default=6)
+    parser.add_argument("--penetration", type=float, default=0.75)
+    parser.add_argument("--h17", action="store_true", help="dealer hits soft 17")
+    parser.add_argument("--bj-payout", type=float, default=1.5)
+    parser.add_argument("--no-double", action="store_true")
+    parser.add_argument("--max-bet", type=int, default=8, help="units bet at the top of the ramp")
+    parser.add_argument("--bankroll", type=float, default=1000, help="bankroll in units for risk of ruin")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--csv", help="write the per-TC table to this CSV")
+    parser.add_argument("--plot", help="save a plot to this image file")
+    args = parser.parse_args()
+
+    rules = Rules(args.decks, args.penetration, args.h17, args.bj_payout, not args.no_double)
+    print(f"🎲 Simulating {args.hands:,} hands — {rules}")
+    df, summary = simulate(args.hands, rules, args.max_bet, args.bankroll, args.workers, seed=args.seed)
+
+    with pd.option_context("display.float_format", "{:.4f}".format, "display.width", 120):
+        print(df)
+    print(f"\n📊 Hands: {summary['hands']:,} in {summary['seconds']:.1f}s "
+          f"({summary['hands_per_sec']:,.0f}/s)")
+    print(f"💰 EV/hand: {summary['ev_per_hand']:+.4f} units | Edge: {summary['edge'] * 100:+.3f}% "
+          f"| SD: {summary['sd']:.3f} | RoR: {summary['ror']:.2%}")
+
+    if args.csv:
+        df.to_csv(args.csv)
+        print(f"💾 Table → {args.csv}")
+    if args.plot:
+        plot_results(df, args.plot)
+
+
+if __name__ == "__main__":
+    main()
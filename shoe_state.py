@@ -0,0 +1,165 @@
+"""Compact shoe state with several card-counting systems updated in one pass.
+
+Cards are stored as integer rank codes (A=0, 2..9=1..8, 10/J/Q/K=9..12).
+The whole shoe is one small int32 array:
+``[cards_seen, <one count per system>, <cards remaining per rank>]``.
+Dealing a card adds one precomputed row of ``DELTA`` to it, so a card costs
+the same whatever the number of systems, and a batch costs one sum. Because
+the state is a flat array, a checkpoint is just its bytes.
+"""
+import numpy as np
+
+RANK_LABELS = ("A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K")
+RANK_CODES = {label: code for code, label in enumerate(RANK_LABELS)}
+RANK_CODES["T"] = RANK_CODES["10"]
+
+# Card tags per system, in RANK_LABELS order
+SYSTEMS = ("hi_lo", "ko", "hi_opt2", "omega2", "zen")
+SYSTEM_NAMES = {"hi_lo": "Hi-Lo", "ko": "KO", "hi_opt2": "Hi-Opt II", "omega2": "Omega II", "zen": "Zen"}
+COUNT_TABLE = np.array([
+    #  A  2  3  4  5  6  7  8  9  T  J  Q  K
+    [-1, 1, 1, 1, 1, 1, 0, 0, 0, -1, -1, -1, -1],  # Hi-Lo
+    [-1, 1, 1, 1, 1, 1, 1, 0, 0, -1, -1, -1, -1],  # KO
+    [0, 1, 1, 2, 2, 1, 1, 0, 0, -2, -2, -2, -2],   # Hi-Opt II
+    [0, 1, 1, 2, 2, 2, 1, 0, -1, -2, -2, -2, -2],  # Omega II
+    [-1, 1, 1, 2, 2, 2, 1, 0, 0, -2, -2, -2, -2],  # Zen
+], dtype=np.int32).T
+
+# Layout of the state array
+SEEN = 0
+COUNTS = slice(1, 1 + len(SYSTEMS))
+REMAINING = slice(1 + len(SYSTEMS), 1 + len(SYSTEMS) + len(RANK_LABELS))
+STATE_SIZE = REMAINING.stop
+
+# Row per rank code: what dealing that card adds to the state
+DELTA = np.zeros((len(RANK_LABELS), STATE_SIZE), dtype=np.int32)
+DELTA[:, SEEN] = 1
+DELTA[:, COUNTS] = COUNT_TABLE
+DELTA[:, REMAINING] = -np.eye(len(RANK_LABELS), dtype=np.int32)
+
+HI_LO = COUNT_TABLE[:, SYSTEMS.index("hi_lo")]
+_HI_LO_BY_LABEL = {label: int(HI_LO[code]) for label, code in RANK_CODES.items()}
+_HI_LO_BY_CODE = HI_LO.tolist()
+
+# Batches up to this size are applied row by row
+SMALL_BATCH = 8
+
+
+def rank_code(card):
+    """Rank code for a label ('A', '10', 'K', ...) or code; None if unknown."""
+    if isinstance(card, (int, np.integer)):
+        return int(card) if 0 <= card < len(RANK_LABELS) else None
+    return RANK_CODES.get(card.upper())
+
+
+def get_card_value(card):
+    """Hi-Lo tag of a card label; unknown labels count 0."""
+    return _HI_LO_BY_LABEL.get(card.upper(), 0)
+
+
+def get_true_count(running_count, decks_remaining):
+    return round(running_count / decks_remaining, 2) if decks_remaining > 0 else 0
+
+
+class ShoeState:
+    """Running counts, cards seen and per-rank composition of one shoe."""
+
+    def __init__(self, decks=6):
+        self.decks = decks
+        self.state = np.zeros(STATE_SIZE, dtype=np.int32)
+        self.reset()
+
+    def reset(self):
+        """Fresh shoe: full composition, counts at their initial values."""
+        self.state[:] = 0
+        self.state[REMAINING] = round(4 * self.decks)
+        # KO is unbalanced: start at its initial running count so the pivot is 0
+        self.state[1 + SYSTEMS.index("ko")] = round(4 - 4 * self.decks)
+
+    # === UPDATES ===
+    def deal(self, cards):
+        """Remove one card or an iterable of cards from the shoe.
+
+        Accepts labels or rank codes; unknown labels are skipped. Returns the
+        Hi-Lo delta of the cards that were applied.
+        """
+        if isinstance(cards, (str, int, np.integer)):
+            code = rank_code(cards)
+            if code is None:
+                return 0
+            self.state += DELTA[code]
+            return _HI_LO_BY_CODE[code]
+        codes = [c for c in map(rank_code, cards) if c is not None]
+        if not codes:
+            return 0
+        if len(codes) <= SMALL_BATCH:
+            # A few row adds beat the fancy-index + reduce overhead
+            for code in codes:
+                self.state += DELTA[code]
+            return sum(_HI_LO_BY_CODE[code] for code in codes)
+        self.state += DELTA[codes].sum(axis=0)
+        return int(HI_LO[codes].sum())
+
+    def undeal(self, cards):
+        """Put cards back into the shoe (undo ``deal``); returns the Hi-Lo delta removed."""
+        if isinstance(cards, (str, int, np.integer)):
+            cards = [cards]
+        codes = [c for c in map(rank_code, cards) if c is not None]
+        for code in codes:
+            self.state -= DELTA[code]
+        return sum(_HI_LO_BY_CODE[code] for code in codes)
+
+    def deal_codes(self, codes):
+        """Batch update from an array of rank codes (no validation)."""
+        self.state += DELTA[np.asarray(codes)].sum(axis=0)
+
+    # === CHECKPOINTS ===
+    def checkpoint(self):
+        """Snapshot of the whole shoe as bytes (a few dozen bytes)."""
+        return self.state.tobytes()
+
+    def restore(self, snapshot):
+        self.state[:] = np.frombuffer(snapshot, dtype=np.int32)
+
+    # === READOUTS ===
+    @property
+    def running_count(self):
+        return int(self.state[1 + SYSTEMS.index("hi_lo")])
+
+    @property
+    def cards_seen(self):
+        return int(self.state[SEEN])
+
+    @property
+    def remaining(self):
+        """Cards left per rank code (a view; do not modify)."""
+        return self.state[REMAINING]
+
+    @property
+    def cards_remaining(self):
+        return int(self.state[REMAINING].sum())
+
+    @property
+    def decks_remaining(self):
+        """Exact decks left in the shoe, from the per-rank composition."""
+        return self.cards_remaining / 52
+
+    @property
+    def penetration(self):
+        """Fraction of the shoe dealt so far."""
+        return self.cards_seen / (52 * self.decks) if self.decks else 0.0
+
+    def count(self, system="hi_lo"):
+        return int(self.state[1 + SYSTEMS.index(system)])
+
+    def counts(self):
+        """Running count of every system, keyed by system id."""
+        return dict(zip(SYSTEMS, self.state[COUNTS].tolist()))
+
+    def true_count(self, system="hi_lo"):
+        """Count per deck remaining, floored at half a deck like the counters."""
+        return get_true_count(self.count(system), max(0.5, self.decks_remaining))
+
+    def summary(self):
+        """One-line readout of the secondary systems."""
+        return " | ".join(f"{SYSTEM_NAMES[s]}: {v:+}" for s, v in self.counts().items() if s != "hi_lo")
@@ -0,0 +1,250 @@
+import hashlib
+import os
+import struct
+import zipfile
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# Every glyph (template or ROI) is compared at this (width, height)
+GLYPH_SIZE = (24, 32)
+GLYPH_DIM = GLYPH_SIZE[0] * GLYPH_SIZE[1]
+
+Match = namedtuple("Match", ["label", "score", "margin"])
+
+# Precompiled glyph vectors of every template, one bank per subdirectory
+BUNDLE_NAME = "bundle.npz"
+BUNDLE_BANKS = {"cards": "", "digits": "digits"}
+
+
+def ink_mask(gray):
+    """Binarize with Otsu so the glyph ("ink") is 1 whatever its polarity."""
+    _, binary = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    # Glyphs cover less of the ROI than the card background
+    if binary.mean() > 0.5:
+        binary = 1 - binary
+    return binary
+
+
+def normalize_glyph(gray, size=GLYPH_SIZE):
+    """Return a zero-mean, unit-norm float32 vector of the glyph in ``gray``.
+
+    The ROI is binarized, cropped to its ink bounding box and resized to
+    ``size``, so templates and ROIs of any size compare directly. Returns
+    None for blank or flat ROIs.
+    """
+    if gray is None or gray.size == 0 or gray.min() == gray.max():
+        return None
+    mask = ink_mask(gray)
+    points = cv2.findNonZero(mask)
+    if points is None:
+        return None
+    x, y, w, h = cv2.boundingRect(points)
+    glyph = cv2.resize(mask[y:y + h, x:x + w].astype(np.float32), size, interpolation=cv2.INTER_AREA)
+    vec = glyph.ravel()
+    vec -= vec.mean()
+    norm = np.linalg.norm(vec)
+    if norm == 0:
+        return None
+    return vec / norm
+
+
+def split_glyphs(gray, min_width=2):
+    """Split a multi-digit ROI into per-glyph crops, left to right."""
+    mask = ink_mask(gray)
+    columns = mask.any(axis=0)
+    glyphs = []
+    start = None
+    for x, on in enumerate(np.append(columns, False)):
+        if on and start is None:
+            start = x
+        elif not on and start is not None:
+            if x - start >= min_width:
+                glyphs.append(gray[:, start:x])
+            start = None
+    return glyphs
+
+
+def load_templates(directory):
+    """(label, gray) for every PNG in ``directory``; ``K_alt.png`` is labelled ``K``."""
+    templates = []
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            if not name.lower().endswith(".png"):
+                continue
+            img = cv2.imread(os.path.join(directory, name), cv2.IMREAD_GRAYSCALE)
+            if img is not None:
+                templates.append((os.path.splitext(name)[0].split("_")[0], img))
+    return templates
+
+
+# === TEMPLATE BUNDLE ===
+def template_fingerprint(template_dir):
+    """Hash of every template PNG's name, size and mtime."""
+    entries = []
+    for sub in BUNDLE_BANKS.values():
+        directory = os.path.join(template_dir, sub)
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            if name.lower().endswith(".png"):
+                st = os.stat(os.path.join(directory, name))
+                entries.append(f"{sub}/{name}:{st.st_size}:{st.st_mtime_ns}")
+    return hashlib.sha1("\n".join(entries).encode()).hexdigest()
+
+
+def compile_bundle(template_dir, fingerprint):
+    """Normalize every template once: {name: array} in bundle layout."""
+    arrays = {"fingerprint": np.array([fingerprint])}
+    for bank, sub in BUNDLE_BANKS.items():
+        labels, vectors = [], []
+        for label, img in load_templates(os.path.join(template_dir, sub)):
+            vec = normalize_glyph(img)
+            if vec is not None:
+                labels.append(label)
+                vectors.append(vec)
+        arrays[f"{bank}_labels"] = np.array(labels, dtype="U8")
+        arrays[f"{bank}_vectors"] = np.stack(vectors) if vectors else np.zeros((0, GLYPH_DIM), np.float32)
+    return arrays
+
+
+def mmap_npz(path):
+    """Memory-map every member of an uncompressed .npz; None if it cannot be mapped."""
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                return None
+            # Skip the zip local header to reach the .npy member
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = struct.unpack("<HH", f.read(4))
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                read_header = np.lib.format.read_array_header_1_0
+            else:
+                read_header = np.lib.format.read_array_header_2_0
+            shape, fortran, dtype = read_header(f)
+            if dtype.hasobject:
+                return None
+            name = info.filename[:-len(".npy")]
+            if 0 in shape:
+                arrays[name] = np.zeros(shape, dtype)
+            else:
+                arrays[name] = np.memmap(path, dtype, "r", f.tell(), shape, "F" if fortran else "C")
+    return arrays
+
+
+def load_bundle(template_dir):
+    """{bank: (labels, vectors)} from ``template_dir``/bundle.npz.
+
+    The bundle is memory-mapped, so start-up reads no PNGs and normalizes
+    nothing. It is recompiled whenever the template PNGs' fingerprint
+    changes, and kept in memory only if it cannot be written.
+    """
+    path = os.path.join(template_dir, BUNDLE_NAME)
+    fingerprint = template_fingerprint(template_dir)
+    arrays = None
+    if os.path.exists(path):
+        try:
+            arrays = mmap_npz(path)
+        except (OSError, ValueError, zipfile.BadZipFile):
+            arrays = None
+    if arrays is None or str(arrays["fingerprint"][0]) != fingerprint:
+        arrays = compile_bundle(template_dir, fingerprint)
+        try:
+            tmp = path + ".tmp.npz"
+            np.savez(tmp, **arrays)  # uncompressed, so members can be memory-mapped
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"⚠️ Template bundle not saved ({e}); compiled in memory")
+    return {bank: ([str(l) for l in arrays[f"{bank}_labels"]], arrays[f"{bank}_vectors"])
+            for bank in BUNDLE_BANKS}
+
+
+class TemplateBank:
+    """Pre-normalized templates scored against many ROIs in one matrix product.
+
+    Templates are loaded once from a directory of PNGs; the label is the file
+    name up to the first underscore, so ``K.png`` and ``K_alt.png`` are two
+    font variants of ``K``. Labels are kept sorted so ties resolve the same
+    way every run.
+    """
+
+    def __init__(self, templates):
+        labels = []
+        vectors = []
+        for label, img in sorted(templates, key=lambda t: t[0]):
+            vec = normalize_glyph(img)
+            if vec is None:
+                continue
+            labels.append(label)
+            vectors.append(vec)
+        self._index(labels, np.stack(vectors) if vectors else np.zeros((0, GLYPH_DIM), np.float32))
+
+    def _index(self, labels, matrix):
+        self.labels = sorted(set(labels))
+        # Index into self.labels for every template row of self.matrix
+        self.template_labels = np.array([self.labels.index(l) for l in labels], dtype=np.intp)
+        self.matrix = matrix
+
+    @classmethod
+    def from_dir(cls, directory):
+        return cls(load_templates(directory))
+
+    @classmethod
+    def from_vectors(cls, labels, vectors):
+        """Build from pre-normalized vectors (a template bundle bank)."""
+        bank = cls.__new__(cls)
+        bank._index(list(labels), vectors)
+        return bank
+
+    def __len__(self):
+        return len(self.template_labels)
+
+    def score_many(self, rois):
+        """Return an (n_rois, n_labels) array of best scores per label."""
+        scores = np.full((len(rois), len(self.labels)), -1.0, dtype=np.float32)
+        vectors = [normalize_glyph(r) for r in rois]
+        valid = [i for i, v in enumerate(vectors) if v is not None]
+        if not valid or not len(self):
+            return scores
+        per_template = np.stack([vectors[i] for i in valid]) @ self.matrix.T
+        for j in range(len(self.labels)):
+            scores[valid, j] = per_template[:, self.template_labels == j].max(axis=1)
+        return scores
+
+    def match_many(self, rois, threshold=0.8):
+        """Return one Match (or None below ``threshold``) per ROI.
+
+        ``margin`` is the gap between the best and second-best label, a
+        measure of how ambiguous the read was.
+        """
+        if not len(rois):
+            return []
+        scores = self.score_many(rois)
+        results = []
+        for row in scores:
+            if not len(row):
+                results.append(None)
+                continue
+            order = np.argsort(-row, kind="stable")
+            best = float(row[order[0]])
+            runner_up = float(row[order[1]]) if len(order) > 1 else -1.0
+            if best < threshold:
+                results.append(None)
+            else:
+                results.append(Match(self.labels[order[0]], best, best - runner_up))
+        return results
+
+    def match(self, roi, threshold=0.8):
+        return self.match_many([roi], threshold)[0]
+
+    def read_digits(self, roi, threshold=0.8):
+        """Read a multi-digit ROI by matching every glyph in one batch."""
+        glyphs = split_glyphs(roi)
+        matches = self.match_many(glyphs, threshold)
+        if not matches or any(m is None for m in matches):
+            return ""
+        return "".join(m.label for m in matches)
@@ -0,0 +1,46 @@
+from confirmation import ACCEPT_CONFUSABLE, Confirmer, accept_threshold, stability
+
+
+def test_sure_read_confirms_on_its_first_frame():
+    confirmer = Confirmer(["card_1"])
+    assert confirmer.observe("card_1", "K", 0.9, now=0.0)
+
+
+def test_confusable_rank_needs_a_surer_read():
+    confirmer = Confirmer(["card_1"])
+    assert accept_threshold("A") == accept_threshold(("4", "K")) == ACCEPT_CONFUSABLE
+    assert not confirmer.observe("card_1", "A", 0.9, now=0.0)
+
+
+def test_stale_reads_never_vote():
+    confirmer = Confirmer(["card_1"])
+    confirmer.observe("card_1", "A", 0.0, now=0.0)
+    for i in range(1, 20):
+        assert not confirmer.observe("card_1", "A", 0.0, now=i * 0.05, fresh=False)
+
+
+def test_agreeing_fresh_recognitions_confirm():
+    confirmer = Confirmer(["card_1"])
+    assert not confirmer.observe("card_1", "A", 0.5, now=0.0)
+    assert confirmer.observe("card_1", "A", 0.6, now=0.05)
+    assert confirmer.latency("card_1", 0.05) == 0.05
+
+
+def test_disagreeing_recognitions_start_over():
+    confirmer = Confirmer(["card_1"])
+    for i, read in enumerate(["A", "4", "A", "4"]):
+        assert not confirmer.observe("card_1", read, 0.6, now=i * 0.05)
+
+
+def test_a_region_that_just_moved_weighs_less():
+    assert stability(0.0) < stability(0.05) < stability(1.0) == 1.0
+
+
+def test_only_reads_seconded_by_another_recognizer_are_harvestable():
+    confirmer = Confirmer(["card_1"])
+    confirmer.observe("card_1", "Q", 0.95, now=0.0, source="classifier")
+    assert confirmer.confirmed("card_1") and not confirmer.harvestable("card_1")
+    confirmer.observe("card_1", "Q", 0.95, now=0.05, source="classifier")
+    assert not confirmer.harvestable("card_1")
+    confirmer.observe("card_1", "Q", 0.7, now=0.1, source="ocr")
+    assert confirmer.harvestable("card_1")
@@ -0,0 +1,31 @@
+import numpy as np
+
+from glyph_classifier import GlyphClassifier
+
+
+def glyph(seed):
+    img = np.full((40, 30), 255, np.uint8)
+    rng = np.random.default_rng(seed)
+    img[rng.integers(0, 40, 60), rng.integers(0, 30, 60)] = 0
+    return img
+
+
+def test_merge_keeps_every_process_harvest(tmp_path):
+    path = str(tmp_path / "cards.npz")
+    first, second = GlyphClassifier(path=path), GlyphClassifier(path=path)
+    assert first.harvest(glyph(1), "K")
+    assert second.harvest(glyph(2), "Q")
+
+    parent = GlyphClassifier(path=path)
+    for worker in (first, second):
+        parent.merge(*worker.harvested_samples())
+    parent.save()
+
+    labels, _ = GlyphClassifier(path=path).harvested_samples()
+    assert sorted(labels) == ["K", "Q"]
+
+
+def test_merge_skips_known_samples():
+    classifier = GlyphClassifier()
+    assert classifier.harvest(glyph(1), "K")
+    assert classifier.merge(*classifier.harvested_samples()) == 0
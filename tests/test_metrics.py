@@ -0,0 +1,39 @@
+import threading
+
+from metrics import Metrics
+
+
+def test_counters_and_snapshots_are_safe_across_threads():
+    metrics = Metrics()
+    errors = []
+
+    def record(i):
+        for j in range(20000):
+            metrics.incr("calls")
+            metrics.incr(f"key_{i}_{j % 50}")
+            metrics.observe(f"stage_{j % 50}", 0.001)
+
+    def read():
+        try:
+            for _ in range(200):
+                metrics.snapshot()
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=record, args=(i,)) for i in range(4)] + [threading.Thread(target=read)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    snapshot = metrics.snapshot()
+    assert not errors
+    assert snapshot["counters"]["calls"] == 80000
+    assert sum(stage["count"] for stage in snapshot["stages"].values()) == 80000
+
+
+def test_timer_records_its_stage():
+    metrics = Metrics()
+    with metrics.timer("ocr"):
+        pass
+    assert metrics.snapshot()["stages"]["ocr"]["count"] == 1
@@ -0,0 +1,44 @@
+import json
+
+import numpy as np
+
+from ocr_cache import OcrCache
+
+
+def glyph(seed):
+    return np.random.default_rng(seed).integers(0, 256, (30, 40), dtype=np.uint8)
+
+
+def test_evict_forgets_one_read():
+    cache = OcrCache()
+    key = cache.key(glyph(1), "card")
+    cache.put(key, "K")
+    assert cache.evict(key)
+    assert cache.get(key) is None
+    assert not cache.evict(key)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_by_kind():
+    cache = OcrCache()
+    card = cache.key(glyph(1), "card")
+    digits = cache.key(glyph(1), "digits")
+    cache.put(card, "K")
+    cache.put(digits, "21")
+    assert cache.invalidate("card") == 1
+    assert cache.get(card) is None
+    assert cache.get(digits) == "21"
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_invalidated_reads_stay_gone_once_saved(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = OcrCache(path=path)
+    cache.put(cache.key(glyph(1), "card"), "4")
+    cache.put(cache.key(glyph(2), "hand"), ["K", "5"])
+    cache.invalidate("card")
+    cache.save()
+    with open(path) as f:
+        assert [key.partition(":")[0] for key, _ in json.load(f)] == ["hand"]
+    assert OcrCache(path=path).kinds() == {"hand": 1}
@@ -0,0 +1,96 @@
+from round_state import RoundState, counter_total
+
+POLL = 0.125  # exact in binary, so BLANK_SECONDS is a whole number of polls
+
+
+def play(state, frames, start=0.0):
+    """Feed (cards, counter, double) frames one POLL apart; returns the phase after each."""
+    phases = []
+    for i, (cards, counter, double) in enumerate(frames):
+        state.update(start + i * POLL, cards, counter, double)
+        phases.append(state.phase)
+    return phases
+
+
+def frames(cards, n, counter="", double=False):
+    return [(cards, counter, double)] * n
+
+
+def test_counter_total():
+    assert counter_total("21") == 21
+    assert counter_total("") is None
+    assert counter_total("2l") is None
+
+
+def test_round_deals_plays_and_settles_when_cards_leave():
+    state = RoundState()
+    phases = play(state, [(["10"], "", False), (["10", "6"], "", False)] + frames([], 6))
+    assert phases[:2] == ["dealing", "player"]
+    assert phases[-1] == "settled"
+    assert state.table_clear
+    assert state.started == 0.0
+
+
+def test_single_blank_poll_does_not_end_the_round():
+    state = RoundState()
+    hand = frames(["10", "6"], 2)
+    assert play(state, hand + frames([], 1) + hand)[-1] == "player"
+
+
+def test_blank_poll_after_settling_does_not_start_a_new_round():
+    # 10,6,9 settles on the counter; one blank poll; the same cards again
+    state = RoundState()
+    play(state, frames(["10", "6"], 1) + frames(["10", "6"], 1, "16") + frames(["10", "6", "9"], 1, "25")
+         + frames(["10", "6", "9"], 6))
+    assert state.phase == "settled"
+    assert not state.table_clear
+    assert play(state, frames([], 1) + frames(["10", "6", "9"], 2), start=2.0)[-1] == "settled"
+
+
+def test_cards_after_the_table_cleared_start_a_new_round():
+    state = RoundState()
+    play(state, frames(["10", "6"], 2) + frames([], 6))
+    assert state.phase == "settled" and state.table_clear
+    assert play(state, frames(["9"], 1), start=2.0) == ["dealing"]
+    assert state.started == 2.0
+
+
+def test_settled_round_clears_after_late_seconds():
+    state = RoundState()
+    late = int(RoundState.LATE_SECONDS / POLL) + 2
+    assert play(state, frames(["10", "6"], 2) + frames([], 6 + late))[-1] == "cleared"
+
+
+def test_lone_card_that_goes_away_returns_to_cleared():
+    state = RoundState()
+    phases = play(state, frames(["A"], 1) + frames([], 6))
+    assert phases[0] == "dealing"
+    assert phases[-1] == "cleared"
+
+
+def test_double_down_or_21_hands_over_to_the_dealer():
+    state = RoundState()
+    assert play(state, frames(["5", "6"], 1) + frames(["5", "6"], 1, "11", True))[-1] == "dealer"
+    state = RoundState()
+    assert play(state, frames(["10", "6"], 1) + frames(["10", "6", "5"], 1, "21"))[-1] == "dealer"
+
+
+def test_counter_blink_while_the_player_acts_does_not_settle():
+    state = RoundState()
+    assert play(state, frames(["10", "6"], 2, "16") + frames(["10", "6"], 8))[-1] == "player"
+
+
+def test_dealer_round_settles_when_the_counter_goes():
+    state = RoundState()
+    play(state, frames(["10", "6"], 1) + frames(["10", "6", "5"], 1, "21") + frames(["10", "6", "5"], 6))
+    assert state.phase == "settled"
+    assert not state.table_clear
+
+
+def test_counter_left_from_the_last_round_is_ignored_until_it_changes():
+    state = RoundState()
+    play(state, frames(["10", "6"], 2) + frames([], 6, "22"))
+    assert state.phase == "settled"
+    # The next round is dealt while the old bust total still shows
+    assert play(state, frames(["9", "5"], 2, "22"), start=2.0) == ["dealing", "player"]
+    assert play(state, frames(["9", "5", "7"], 1, "21"), start=2.25) == ["dealer"]